@@ -0,0 +1,381 @@
+"""
+Benchmark offline do crawler, do scraper e do envio ao Supabase.
+
+Sobe os servidores locais de `benchmarks/servers.py` (o corpus servido
+como vários sites, via proxy HTTP, e um PostgREST falso) e executa de
+ponta a ponta:
+
+* ``parse``   – `parse_page` sobre o corpus, sem rede;
+* ``scrape``  – `scrape_url` sobre URLs dos sites locais (com `fetch_pool`);
+* ``crawl``   – `WebCrawler` (best-first) a partir do blog, contando as
+  vagas encontradas por página baixada;
+* ``crawl_bfs`` – o mesmo crawl com todas as URLs com a mesma prioridade
+  (busca em largura), como referência para o ``crawl``;
+* ``upsert_job`` / ``upsert_batch`` – envio das vagas raspadas, uma a uma
+  e em lote (`BatchUpserter`).
+
+Para cada etapa são medidos a vazão, as latências p50/p99 e o pico de
+memória residente (`resource.getrusage`).  O resultado é um JSON, gravado
+em `--output`, que pode ser comparado com uma execução anterior via
+`--baseline`.
+
+Uso:
+    python benchmarks/run_benchmarks.py --output artifacts/benchmark.json
+    python benchmarks/run_benchmarks.py --baseline artifacts/benchmark.json --latency 0.02
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Garante que a raiz do repositório esteja no sys.path para importar src e benchmarks
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from benchmarks.servers import KINDS, SITES, FakePostgrest, SiteServer, kind_of, load_fixtures, page_url, render_page
+
+STAGES = ("parse", "scrape", "crawl", "crawl_bfs", "upsert_job", "upsert_batch")
+CRAWL_SEED = page_url("blog", 0)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil `q` (0–100) pelo método do posto mais próximo."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def peak_rss_kb() -> Dict[str, int]:
+    """Pico de memória residente do processo e dos filhos (pool de parse), em KiB."""
+    scale = 1024 if sys.platform == "darwin" else 1  # no macOS ru_maxrss vem em bytes
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+
+def summarize(items: int, seconds: float, latencies: List[float], **extra: Any) -> Dict[str, Any]:
+    """Monta o resultado de uma etapa (latências em milissegundos)."""
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    result = {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput": round(items / seconds, 2) if seconds > 0 else None,
+        "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+        "p99_ms": round(p99 * 1000, 3) if p99 is not None else None,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    result.update(extra)
+    return result
+
+
+def scrape_urls(count: int) -> List[str]:
+    """URLs distribuídas igualmente entre os sites locais."""
+    hosts = list(SITES)
+    return [page_url(hosts[i % len(hosts)], i // len(hosts)) for i in range(count)]
+
+
+def bench_parse(site: SiteServer, iterations: int) -> Dict[str, Any]:
+    from src.page_parser import parse_page
+
+    templates = load_fixtures()
+    pages = [
+        (page_url(name, 1), render_page(templates[kind.fixture], name, 1, site.pages_per_host, site.links_per_page))
+        for name, kind in KINDS.items()
+    ]
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for url, html in pages:
+            t0 = time.perf_counter()
+            parse_page(url, html)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    size = sum(len(html.encode("utf-8")) for _, html in pages) * iterations
+    return summarize(len(latencies), elapsed, latencies, mb_per_s=round(size / elapsed / 1e6, 2))
+
+
+def bench_scrape(count: int, concurrency: int, per_host: int) -> Dict[str, Any]:
+    from src.fetch_pool import run_concurrently
+    from src.scraper import scrape_url
+
+    latencies = []
+
+    def timed_scrape(url):
+        t0 = time.perf_counter()
+        try:
+            return scrape_url(url)
+        finally:
+            latencies.append(time.perf_counter() - t0)
+
+    jobs, errors = [], 0
+    started = time.perf_counter()
+    for _, job, exc in run_concurrently(scrape_urls(count), timed_scrape,
+                                        concurrency=concurrency, per_host=per_host, ordered=False):
+        if exc is None:
+            jobs.append(job)
+        else:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    result = summarize(len(jobs), elapsed, latencies, errors=errors,
+                       concurrency=concurrency, per_host=per_host)
+    result["jobs"] = jobs
+    return result
+
+
+def is_job_page(url: str, page: Dict[str, Any]) -> bool:
+    """Página de vaga: formulário/ATS ou com um JobPosting no JSON-LD."""
+    parts = urlsplit(url)
+    kind = kind_of(parts.hostname or "", parts.path or "/")
+    if kind is not None and KINDS[kind].is_job:
+        return True
+    return any(isinstance(item, dict) and item.get("@type") == "JobPosting" for item in page["json_ld"])
+
+
+class FlatScorer:
+    """Mesma prioridade para todos os links: a fronteira vira uma busca em largura."""
+
+    def score(self, url, anchor="", depth=0):
+        return 0.0
+
+
+def bench_crawl(max_pages: int, num_threads: int, parse_processes: int, best_first: bool = True) -> Dict[str, Any]:
+    from src.robots import RobotsCache
+    from src.web_crawler import WebCrawler
+
+    latencies = []
+    parsed = []
+    jobs = []
+    parsed_lock = threading.Lock()
+
+    class BenchCrawler(WebCrawler):
+        def fetch_page(self, url, depth=0):
+            t0 = time.perf_counter()
+            try:
+                return super().fetch_page(url, depth)
+            finally:
+                latencies.append(time.perf_counter() - t0)
+
+    def on_page(url, page, changed):
+        with parsed_lock:
+            parsed.append(url)
+            if is_job_page(url, page):
+                jobs.append(url)
+
+    crawler = BenchCrawler(
+        [CRAWL_SEED],
+        max_pages=max_pages,
+        num_threads=num_threads,
+        user_agent="PMRadarBench/1.0",
+        robots_cache=RobotsCache(path=None),
+        parse_processes=parse_processes,
+        scorer=None if best_first else FlatScorer(),
+        on_page=on_page,
+    )
+    started = time.perf_counter()
+    crawler.start()
+    elapsed = time.perf_counter() - started
+    return summarize(len(parsed), elapsed, latencies, fetches=len(latencies), visited=len(crawler.visited),
+                     jobs_found=len(jobs), jobs_per_page=round(len(jobs) / len(latencies), 3) if latencies else None,
+                     num_threads=num_threads, parse_processes=parse_processes)
+
+
+def bench_upsert_job(jobs: List[Dict[str, Any]], postgrest: FakePostgrest) -> Dict[str, Any]:
+    from src.supabase_client import upsert_job
+
+    requests_before = postgrest.requests
+    latencies = []
+    started = time.perf_counter()
+    for job in jobs:
+        t0 = time.perf_counter()
+        upsert_job(job)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return summarize(len(jobs), elapsed, latencies, requests=postgrest.requests - requests_before)
+
+
+def bench_upsert_batch(jobs: List[Dict[str, Any]], postgrest: FakePostgrest, max_rows: int) -> Dict[str, Any]:
+    from src.supabase_client import BatchUpserter
+
+    requests_before = postgrest.requests
+    # A latência de `add` é quase zero, exceto quando o lote é enviado
+    latencies = []
+    started = time.perf_counter()
+    upserter = BatchUpserter(max_rows=max_rows)
+    for job in jobs:
+        t0 = time.perf_counter()
+        upserter.add(job)
+        latencies.append(time.perf_counter() - t0)
+    report = upserter.close()
+    elapsed = time.perf_counter() - started
+    return summarize(len(jobs), elapsed, latencies, requests=postgrest.requests - requests_before,
+                     batches=report.batches, failed=report.failed, max_rows=max_rows)
+
+
+def upsert_rows(jobs: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """Repete as vagas raspadas (com URLs distintas) até `count` linhas."""
+    if not jobs:
+        return []
+    rows = []
+    for i in range(count):
+        job = dict(jobs[i % len(jobs)])
+        job["url"] = f"{job['url']}?bench={i}"
+        job["scraped_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        rows.append(job)
+    return rows
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """Compara vazão e p99 de cada etapa com uma execução anterior.
+
+    Uma etapa é marcada como regressão quando a vazão (ou a taxa de vagas
+    por página do crawl) cai, ou o p99 sobe, mais do que `tolerance`
+    (fração) em relação à linha de base.
+    """
+    comparison = {}
+    for stage, result in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        entry = {}
+        for key in ("throughput", "p99_ms", "jobs_per_page"):
+            if result.get(key) and base.get(key):
+                entry[f"{key}_ratio"] = round(result[key] / base[key], 3)
+        entry["regression"] = (
+            entry.get("throughput_ratio", 1.0) < 1 - tolerance
+            or entry.get("p99_ms_ratio", 1.0) > 1 + tolerance
+            or entry.get("jobs_per_page_ratio", 1.0) < 1 - tolerance
+        )
+        comparison[stage] = entry
+    return comparison
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do crawler, scraper e upsert")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Etapas separadas por vírgula (padrão: {','.join(STAGES)})")
+    parser.add_argument("--output", help="Arquivo JSON com os resultados (além da saída padrão)")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Variação tolerada antes de marcar regressão (padrão: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Sai com código 1 se alguma etapa regredir em relação à linha de base")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência de cada resposta dos sites, em segundos")
+    parser.add_argument("--crawl-delay", type=int, default=0, help="Crawl-delay anunciado no robots.txt")
+    parser.add_argument("--pages-per-host", type=int, default=200)
+    parser.add_argument("--links-per-page", type=int, default=8)
+    parser.add_argument("--parse-iterations", type=int, default=200)
+    parser.add_argument("--scrape-urls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--crawl-pages", type=int, default=200)
+    parser.add_argument("--crawl-threads", type=int, default=8)
+    parser.add_argument("--parse-processes", type=int, default=0)
+    parser.add_argument("--upsert-single", type=int, default=50, help="Vagas enviadas com upsert_job")
+    parser.add_argument("--upsert-rows", type=int, default=2000, help="Vagas enviadas em lote")
+    parser.add_argument("--batch-rows", type=int, default=500)
+    parser.add_argument("--upsert-latency", type=float, default=0.0,
+                        help="Latência de cada resposta do PostgREST falso, em segundos")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        print(f"Etapas desconhecidas: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    # O crawler configura logging em INFO; no benchmark só interessam avisos
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)s] %(message)s")
+
+    site = SiteServer(args.latency, args.crawl_delay, args.pages_per_host, args.links_per_page).start()
+    postgrest = FakePostgrest(args.upsert_latency).start()
+    # Precisa ser definido antes de importar src: os módulos leem o ambiente na importação
+    os.environ.update({
+        "HTTP_PROXY": site.proxy_url,
+        "http_proxy": site.proxy_url,
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+        "HTTP_CACHE": "0",
+        "SUPABASE_URL": postgrest.url,
+        "SUPABASE_ANON_KEY": "benchmark",
+        "SUPABASE_TABLE": "job_postings",
+    })
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": vars(args),
+        },
+        "stages": {},
+    }
+    jobs: List[Dict[str, Any]] = []
+    try:
+        if "parse" in stages:
+            results["stages"]["parse"] = bench_parse(site, args.parse_iterations)
+        if "scrape" in stages or "upsert_job" in stages or "upsert_batch" in stages:
+            scrape = bench_scrape(args.scrape_urls, args.concurrency, args.per_host)
+            jobs = scrape.pop("jobs")
+            if "scrape" in stages:
+                results["stages"]["scrape"] = scrape
+        if "crawl" in stages:
+            results["stages"]["crawl"] = bench_crawl(args.crawl_pages, args.crawl_threads, args.parse_processes)
+        if "crawl_bfs" in stages:
+            results["stages"]["crawl_bfs"] = bench_crawl(
+                args.crawl_pages, args.crawl_threads, args.parse_processes, best_first=False
+            )
+        if "upsert_job" in stages:
+            results["stages"]["upsert_job"] = bench_upsert_job(upsert_rows(jobs, args.upsert_single), postgrest)
+        if "upsert_batch" in stages:
+            results["stages"]["upsert_batch"] = bench_upsert_batch(
+                upsert_rows(jobs, args.upsert_rows), postgrest, args.batch_rows
+            )
+    finally:
+        site.stop()
+        postgrest.stop()
+    results["peak_rss_kb"] = peak_rss_kb()
+    # Detalhamento por etapa interna (download, parse, extração, upsert...) de src.metrics
+    from src.metrics import get_metrics
+    results["metrics"] = get_metrics().summary()
+
+    regressed = False
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        results["comparison"] = compare(results, baseline, args.tolerance)
+        regressed = any(entry["regression"] for entry in results["comparison"].values())
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Servidores locais usados pelos benchmarks, sem acesso à rede.
+
+* `SiteServer` – serve o corpus de `benchmarks/fixtures` como se fossem
+  vários sites (Google Forms, Tally, Typeform, um site institucional com
+  blog e página de carreiras e um quadro de vagas).  Funciona como proxy
+  HTTP: com `HTTP_PROXY` apontando para ele, `requests` envia a URL
+  absoluta e o site é escolhido pelo host, de modo que o scraper e o
+  crawler veem os domínios reais (e o despacho por domínio e a educação
+  por host funcionam normalmente).  Cada resposta
+  pode ter uma latência artificial e o robots.txt anuncia um crawl-delay
+  configurável.
+* `FakePostgrest` – imita o endpoint REST do Supabase, aceitando upserts
+  em lote e contando requisições e linhas recebidas.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+class PageKind(NamedTuple):
+    """Um tipo de página do corpus servido pelo `SiteServer`."""
+
+    host: str
+    fixture: str
+    path: str      # caminho da n-ésima página
+    anchor: str    # texto das âncoras que apontam para este tipo
+    is_job: bool   # formulário ou página de vaga
+
+
+KINDS: Dict[str, PageKind] = {
+    "gforms": PageKind("docs.google.com", "gforms.html", "/forms/d/{n}/viewform", "Candidate-se pelo formulário", True),
+    "tally": PageKind("tally.so", "tally.html", "/r/w{n}", "Formulário de inscrição", True),
+    "typeform": PageKind("form.typeform.com", "typeform.html", "/to/f{n}", "Inscreva-se", True),
+    "blog": PageKind("www.example.com", "generic.html", "/blog/{n}", "Leia mais", False),
+    "careers": PageKind("www.example.com", "job_board.html", "/careers/{n}", "Vaga de Product Manager", True),
+    "jobs": PageKind("jobs.example.com", "job_board.html", "/jobs/{n}", "Vaga de Product Manager", True),
+}
+# Tipo usado para cada host/prefixo de caminho ao responder
+_ROUTES = {(kind.host, kind.path.split("{", 1)[0]): name for name, kind in KINDS.items()}
+# host -> tipo principal do site
+SITES: Dict[str, str] = {"docs.google.com": "gforms", "tally.so": "tally", "form.typeform.com": "typeform",
+                         "www.example.com": "blog", "jobs.example.com": "jobs"}
+JOB_KINDS = tuple(name for name, kind in KINDS.items() if kind.is_job and name != "careers")
+
+_NUMBER = re.compile(r"(\d+)")
+
+
+def load_fixtures() -> Dict[str, str]:
+    """Lê os modelos HTML do corpus, indexados pelo nome do arquivo."""
+    return {path.name: path.read_text(encoding="utf-8") for path in FIXTURES_DIR.glob("*.html")}
+
+
+def page_url(kind: str, n: int) -> str:
+    """URL da n-ésima página do tipo `kind` (ou do tipo principal do host `kind`)."""
+    page = KINDS[SITES.get(kind, kind)]
+    return f"http://{page.host}{page.path.format(n=n)}"
+
+
+def kind_of(host: str, path: str) -> Optional[str]:
+    """Tipo da página servida em `host` + `path` (None se o host não existir)."""
+    for (route_host, prefix), name in _ROUTES.items():
+        if host == route_host and path.startswith(prefix):
+            return name
+    return SITES.get(host)
+
+
+def link_targets(kind: str, n: int, pages_per_host: int, links_per_page: int) -> List[Tuple[str, int]]:
+    """Links de uma página, como pares ``(tipo, número)``.
+
+    O blog é a armadilha: quase todos os seus links levam a outros posts e
+    só um leva à página de carreiras do mesmo site.  As páginas de vagas
+    apontam para outras vagas, para um post do blog e para um formulário ou
+    quadro de vagas de outro host.  O grafo é finito, com `pages_per_host`
+    páginas por tipo.
+    """
+    if kind == "blog":
+        targets = [("blog", (n + i) % pages_per_host) for i in range(1, links_per_page)]
+        targets.append(("careers", n % pages_per_host))
+        return targets
+    targets = [(kind, (n + i) % pages_per_host) for i in range(1, links_per_page - 1)]
+    targets.append(("blog", (n * 7) % pages_per_host))
+    others = [name for name in JOB_KINDS if name != kind]
+    targets.append((others[n % len(others)], n % pages_per_host))
+    return targets
+
+
+def render_page(template: str, kind: str, n: int, pages_per_host: int, links_per_page: int) -> str:
+    """Preenche um modelo do corpus com o número da página e seus links."""
+    anchors = "\n".join(
+        f'<a href="{page_url(target, m)}">{KINDS[target].anchor} {m}</a>'
+        for target, m in link_targets(kind, n, pages_per_host, links_per_page)
+    )
+    return template.replace("{links}", anchors).replace("{n}", str(n))
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas; sem TCP_NODELAY uma conexão
+    # reaproveitada esperaria o ACK atrasado do cliente (~40ms) a cada resposta
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SiteServer:
+    """Servidor HTTP local que serve o corpus como vários sites.
+
+    Args:
+        latency: Atraso, em segundos, antes de cada resposta.
+        crawl_delay: Crawl-delay anunciado no robots.txt (inteiro, como o
+            `RobotFileParser` espera).
+        pages_per_host: Número de páginas distintas de cada site.
+        links_per_page: Número de links em cada página.
+    """
+
+    def __init__(self, latency: float = 0.0, crawl_delay: int = 0,
+                 pages_per_host: int = 200, links_per_page: int = 8):
+        self.latency = latency
+        self.crawl_delay = crawl_delay
+        self.pages_per_host = pages_per_host
+        self.links_per_page = links_per_page
+        self.templates = load_fixtures()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _QuietServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def proxy_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _make_handler(self):
+        site = self
+
+        class Handler(_Handler):
+            def do_GET(self):
+                with site._lock:
+                    site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                status, body = site.respond(self.path, self.headers.get("Host", ""))
+                content_type = "text/plain" if self.path.endswith("/robots.txt") else "text/html; charset=utf-8"
+                self._send(status, body.encode("utf-8"), content_type)
+
+        return Handler
+
+    def respond(self, target: str, host_header: str) -> Tuple[int, str]:
+        """Monta a resposta para a URL absoluta (proxy) ou o caminho pedido."""
+        parts = urlsplit(target)
+        host = (parts.hostname or host_header.split(":")[0]).lower()
+        path = parts.path or "/"
+        kind = kind_of(host, path)
+        if kind is None:
+            return 404, "not found"
+        if path == "/robots.txt":
+            return 200, f"User-agent: *\nCrawl-delay: {self.crawl_delay}\nDisallow: /private\n"
+        match = _NUMBER.search(path)
+        n = int(match.group(1)) % self.pages_per_host if match else 0
+        template = self.templates[KINDS[kind].fixture]
+        return 200, render_page(template, kind, n, self.pages_per_host, self.links_per_page)
+
+    def start(self) -> "SiteServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakePostgrest:
+    """Imita o endpoint `/rest/v1/<tabela>` do PostgREST para upserts.
+
+    Args:
+        latency: Atraso, em segundos, antes de cada resposta.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._server = _QuietServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(_Handler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if not self.path.startswith("/rest/v1/"):
+                    self._send(404, b'{"message":"not found"}', "application/json")
+                    return
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self._send(400, b'{"message":"invalid json"}', "application/json")
+                    return
+                rows = payload if isinstance(payload, list) else [payload]
+                with fake._lock:
+                    fake.requests += 1
+                    fake.rows += len(rows)
+                self._send(201, b"", "application/json")
+
+        return Handler
+
+    def start(self) -> "FakePostgrest":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,8 +1,17 @@
-import os, json, logging
+import os, json, logging, uuid, datetime
 from pathlib import Path
 import sys
 # Ensure repository root is in sys.path for src import
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+from src.checkpoint import CHECKPOINT_PATH, CrawlCheckpoint
+from src.host_health import get_default_health
+from src.http_cache import get_default_cache
+from src.link_scoring import LinkScorer
+from src.metrics import get_metrics
+from src.result_sink import JsonlSink
+from src.robots import RobotsCache
+from src.sitemaps import SitemapDiscovery, SitemapState
+from src.transport import USER_AGENT
 from src.web_crawler import WebCrawler
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
@@ -22,105 +31,154 @@ def main():
 
     max_pages = int(os.getenv("MAX_PAGES", "20"))
     num_threads = int(os.getenv("NUM_THREADS", "4"))
-    user_agent = os.getenv("USER_AGENT", "PMRadarCrawler/0.1 (+https://founderspm.com.br)")
-
-    class SavingCrawler(WebCrawler):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            self.results = []
-
-        def process_url(self, url):
-            from bs4 import BeautifulSoup
-            from urllib.parse import urlparse, urljoin
-            import requests, time
-
-            domain = urlparse(url).netloc
-            if domain not in self.robots_parsers:
-                with self.visited_lock:
-                    if domain not in self.robots_parsers:
-                        self.fetch_robots(domain)
-
-            rp = self.robots_parsers.get(domain)
-            if rp and not rp.can_fetch(self.user_agent, url):
-                logging.info(f"URL bloqueada por robots.txt: {url}")
-                return
-
-            if domain in self.last_fetch_time:
-                elapsed = time.time() - self.last_fetch_time[domain]
-                delay = self.crawl_delay.get(domain, 1)
-                if elapsed < delay:
-                    time.sleep(delay - elapsed)
-
-            logging.info(f"Buscando: {url}")
-            headers = {"User-Agent": self.user_agent}
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-            except Exception as e:
-                logging.warning(f"Falha ao requisitar {url}: {e}")
-                return
-
-            self.last_fetch_time[domain] = time.time()
-            if response.status_code != 200:
-                logging.warning(f"Status {response.status_code}: {url}")
-                return
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            data = self.extract_structured_data(soup)
-            self.results.append({"url": url, **data})
-
-            for tag_a in soup.find_all('a', href=True):
-                new_url = urljoin(url, tag_a['href']).split('#')[0]
-                if not new_url.startswith("http"):
-                    continue
-                with self.visited_lock:
-                    if new_url in self.visited:
-                        continue
-                    if len(self.visited) >= self.max_pages:
-                        self.stop_event.set()
-                        return
-                    self.visited.add(new_url)
-                    self.queue.put(new_url)
-
-    crawler = SavingCrawler(seeds, max_pages=max_pages, num_threads=num_threads, user_agent=user_agent)
-    crawler.start()
-
-    out_dir = Path("artifacts")
-    out_dir.mkdir(exist_ok=True)
-    (out_dir / "crawler_results.json").write_text(json.dumps(crawler.results, ensure_ascii=False, indent=2))
-    print(f"✅ Resultados salvos em {out_dir / 'crawler_results.json'}")
-    print(f"ℹ️  Seeds: {seeds} | max_pages={max_pages} | num_threads={num_threads} | user_agent={user_agent}")
+    # Definido pelo transporte compartilhado (variável USER_AGENT)
+    user_agent = USER_AGENT
+    # "exact" (padrão) ou "bloom" para crawls muito grandes
+    visited_mode = os.getenv("VISITED_MODE", "exact")
+    # Checkpoint periódico; com --resume (ou RESUME=1) continua o último crawl
+    resume = "--resume" in sys.argv[1:] or os.getenv("RESUME", "").lower() in ("1", "true", "yes")
+    checkpoint = CrawlCheckpoint(os.getenv("CHECKPOINT_PATH", CHECKPOINT_PATH))
+    checkpoint_interval = float(os.getenv("CHECKPOINT_INTERVAL", "60"))
+    max_runtime = float(os.getenv("MAX_RUNTIME")) if os.getenv("MAX_RUNTIME") else None
+    # Processos dedicados ao parse do HTML (padrão: um por núcleo, menos o
+    # das threads de I/O); 0 faz o parse nas próprias threads de I/O
+    parse_processes = int(os.getenv("PARSE_PROCESSES", str(max(0, (os.cpu_count() or 1) - 1))))
+    # Descoberta de URLs: "links" (padrão), "sitemaps" (só sitemaps e feeds) ou "both"
+    discovery_mode = os.getenv("DISCOVERY", "links").strip().lower() or "links"
+    if discovery_mode not in ("links", "sitemaps", "both"):
+        raise SystemExit(f"DISCOVERY inválido: {discovery_mode} (use links, sitemaps ou both)")
+    discovery = None
+    if discovery_mode != "links":
+        sitemap_urls = [u.strip() for u in os.getenv("SITEMAP_URLS", "").split(",") if u.strip()]
+        discovery = SitemapDiscovery(state=SitemapState(), extra_urls=sitemap_urls)
+    # PIPELINE=1: as páginas de vagas descobertas passam pelos extratores e
+    # vão ao Supabase como vagas, em paralelo com o crawl (em vez dos dados
+    # estruturados brutos de cada página)
+    pipeline_mode = os.getenv("PIPELINE", "").lower() in ("1", "true", "yes")
+    scorer = LinkScorer.from_env()
+
+    # Resultados gravados em JSON Lines à medida que as páginas são processadas
+    compression = os.getenv("RESULTS_COMPRESSION", "").lower() or None
+    rotate_mb = os.getenv("RESULTS_ROTATE_MB")
+    sink = JsonlSink(
+        "artifacts/crawler_results.jsonl",
+        compression=compression,
+        rotate_bytes=int(float(rotate_mb) * 1024 * 1024) if rotate_mb else None,
+        append=resume,
+    )
 
-    # Envia resultados para o Supabase, se configurado
+    # Envia resultados para o Supabase, se configurado, no mesmo fluxo
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = (
         os.getenv("SUPABASE_ANON_KEY")
         or os.getenv("UPABASE_ANON_KEY")
         or os.getenv("SUPABASE_SERVICE_ROLE")
     )
-
+    upserter = None
+    delta = None
+    pipeline = None
     if supabase_url and supabase_key:
         try:
-            from src.supabase_client import upsert_job
+            from src.delta_sync import DeltaSync
+            from src.supabase_client import BatchUpserter
+            upserter = BatchUpserter()
+            # Só páginas cujo conteúdo mudou desde o último envio são reenviadas
+            delta = DeltaSync()
+            if pipeline_mode:
+                from src.dedupe import DEDUPE_ENABLED, DuplicateIndex
+                from src.pipeline import JobPipeline
+                pipeline = JobPipeline(upserter, deduper=DuplicateIndex() if DEDUPE_ENABLED else None,
+                                       delta=delta, scorer=scorer).start()
         except Exception as e:
-            logging.error(f"Erro ao importar supabase_client: {e}")
-            upsert_job = None
-        if upsert_job:
-            import uuid, datetime
-            for entry in crawler.results:
-                record = {
-                    "id": str(uuid.uuid4()),
-                    "url": entry.get("url"),
-                    "json_ld": json.dumps(entry.get("json_ld", []), ensure_ascii=False),
-                    "microdata": json.dumps(entry.get("microdata", []), ensure_ascii=False),
-                    "scraped_at": datetime.datetime.utcnow().isoformat() + "Z"
-                }
-                try:
-                    upsert_job(record)
-                    logging.info(f"Registro inserido no Supabase: {entry.get('url')}")
-                except Exception as e:
-                    logging.error(f"Falha ao inserir registro {entry.get('url')} no Supabase: {e}")
+            logging.error(f"Erro ao inicializar supabase_client: {e}")
     else:
-        logging.warning("Supabase não configurado (SUPABASE_URL ou chave de acesso ausentes). Resultados não foram enviados.")
+        logging.warning("Supabase não configurado (SUPABASE_URL ou chave de acesso ausentes). Resultados não serão enviados.")
+
+    def on_page(url, page, changed):
+        data = {"json_ld": page["json_ld"], "microdata": page["microdata"]}
+        if changed:
+            sink.write({"url": url, **data})
+        if pipeline is not None:
+            # Bloqueia se a extração ou o envio estiverem atrasados
+            pipeline.on_page(url, page, changed)
+        elif not changed:
+            # Página inalterada (304) e já enviada: só é marcada como vista
+            if delta is not None:
+                delta.mark_seen(url)
+        elif upserter is not None:
+            row = {
+                "id": str(uuid.uuid4()),
+                "url": url,
+                "json_ld": json.dumps(data["json_ld"], ensure_ascii=False),
+                "microdata": json.dumps(data["microdata"], ensure_ascii=False),
+                "scraped_at": datetime.datetime.utcnow().isoformat() + "Z"
+            }
+            if delta is None or delta.check(row):
+                upserter.add(row)
+
+    def flush_results():
+        # Chamado antes de cada checkpoint: o checkpoint só é gravado depois
+        # que os resultados das páginas já visitadas estão em disco/no Supabase
+        sink.flush()
+        if pipeline is not None:
+            pipeline.flush()
+        elif upserter is not None:
+            upserter.flush()
+
+    crawler = WebCrawler(seeds, max_pages=max_pages, num_threads=num_threads,
+                         http_cache=get_default_cache(), robots_cache=RobotsCache(),
+                         visited_mode=visited_mode, checkpoint=checkpoint,
+                         checkpoint_interval=checkpoint_interval, resume=resume,
+                         max_runtime=max_runtime, parse_processes=parse_processes,
+                         scorer=scorer, discovery=discovery,
+                         crawl_links=discovery_mode != "sitemaps", on_page=on_page,
+                         before_checkpoint=flush_results, host_health=get_default_health(),
+                         resend=delta.needs_resend if delta is not None else None)
+    try:
+        crawler.start()
+    finally:
+        sink.close()
+        if discovery is not None:
+            discovery.state.close()
+
+    files = ", ".join(str(path) for path in sink.files) or "nenhum arquivo"
+    print(f"✅ {sink.records} resultado(s) salvos em {files}")
+    print(f"ℹ️  Seeds: {seeds} | max_pages={max_pages} | num_threads={num_threads} | user_agent={user_agent} | resume={resume} | discovery={discovery_mode} | pipeline={pipeline_mode}")
+
+    if upserter is not None:
+        if pipeline is not None:
+            # Esvazia as filas; o último lote, a deduplicação e o manifesto são gravados aqui
+            report = pipeline.close()
+            stats = pipeline.stats
+            logging.info(f"Pipeline: {stats['submitted']} página(s) de vagas, {stats['collected']} vaga(s) coletada(s), "
+                         f"{stats['unchanged']} inalterada(s), {stats['duplicates']} duplicada(s), {stats['failed']} falha(s)")
+        else:
+            report = upserter.close()
+        logging.info(f"{report.sent} registro(s) inserido(s) no Supabase em {report.requests} requisição(ões)")
+        for failure in report.failures:
+            urls = ", ".join(str(row.get("url")) for row in failure.rows)
+            logging.error(f"Falha ao inserir {len(failure.rows)} registro(s) no Supabase ({failure.error}): {urls}")
+        if delta is not None:
+            if pipeline is None:
+                delta.commit(report.failed_urls)
+            logging.info(f"{delta.unchanged} registro(s) inalterado(s) não reenviado(s)")
+            touch = delta.touch_unchanged()
+            if touch is not None:
+                logging.info(f"{touch.sent} registro(s) inalterado(s) marcado(s) como vistos")
+                for failure in touch.failures:
+                    logging.error(f"Falha ao marcar {len(failure.rows)} registro(s) como vistos: {failure.error}")
+
+    # Métricas por etapa e por host (JSON e, opcionalmente, Prometheus)
+    metrics = get_metrics()
+    if metrics.enabled:
+        metrics_path = os.getenv("METRICS_PATH", "artifacts/crawler_metrics.json")
+        metrics.write_json(metrics_path)
+        prom_path = os.getenv("METRICS_PROM_PATH")
+        if prom_path:
+            metrics.write_prometheus(prom_path)
+        for stage, summary in metrics.summary()["stages"].items():
+            logging.info(f"{stage}: {summary['count']}x, total {summary['sum']:.2f}s, p50 {summary['p50'] * 1000:.0f}ms, p99 {summary['p99'] * 1000:.0f}ms")
+        print(f"📈 Métricas salvas em {metrics_path}")
 
 if __name__ == "__main__":
     main()
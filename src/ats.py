@@ -0,0 +1,187 @@
+"""
+Adaptadores para as APIs JSON públicas de quadros de vagas de ATS.
+
+Greenhouse, Lever, Workable e Ashby publicam, para cada empresa, um
+endpoint JSON com todas as vagas abertas.  Em vez de baixar e raspar o
+HTML de cada vaga, o adaptador transforma a URL do quadro (ou de qualquer
+vaga dele) no endereço da API e devolve todas as vagas de uma vez, já
+estruturadas: título, empresa, local, descrição e link.
+
+As respostas passam pelo cache HTTP: um quadro que não mudou desde a
+última coleta responde 304 e as vagas são lidas do JSON guardado, como uma
+página comum.
+
+Configuração (variáveis de ambiente):
+
+* `ATS_MAX_BYTES` – tamanho máximo de cada resposta da API (padrão: 20 MiB).
+* `ATS_MAX_PAGES` – páginas lidas por quadro nas APIs paginadas (padrão: 50).
+"""
+import html
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from .host_health import get_default_health
+from .http_cache import cached_get, get_default_cache
+from .utils import strip_html
+
+ATS_MAX_BYTES = int(os.getenv("ATS_MAX_BYTES", str(20 * 1024 * 1024)))
+ATS_MAX_PAGES = int(os.getenv("ATS_MAX_PAGES", "50"))
+ATS_TIMEOUT = 30
+
+JSON_CONTENT_TYPES = ("application/json", "text/json", "text/plain")
+
+
+class BoardAdapter:
+    """Converte a URL de um quadro de vagas em chamadas à API JSON do ATS.
+
+    Subclasses definem `hosts`, `board_token` e `jobs`.
+    """
+
+    # Nome gravado no campo `source` das vagas
+    name = ""
+    # Hosts das páginas públicas do quadro
+    hosts: Tuple[str, ...] = ()
+
+    def board_token(self, url: str) -> Optional[str]:
+        """Identificador da empresa no ATS (None se a URL não for de um quadro)."""
+        segments = [s for s in urlsplit(url).path.split("/") if s]
+        return segments[0] if segments else None
+
+    def board_url(self, token: str) -> str:
+        """URL pública canônica do quadro."""
+        return f"https://{self.hosts[0]}/{quote(token)}"
+
+    def jobs(self, token: str, get_json: Callable[[str], Any]) -> Iterator[Dict[str, Any]]:
+        """Produz as vagas do quadro; `get_json(url)` baixa uma página da API."""
+        raise NotImplementedError
+
+    def fetch(self, token: str) -> List[Dict[str, Any]]:
+        """Baixa todas as vagas abertas do quadro.
+
+        Raises:
+            HostUnavailable se a API estiver com o disjuntor aberto.
+            ValueError se a resposta não for o JSON esperado.
+            requests.RequestException em falhas de rede.
+        """
+        cache = get_default_cache()
+        health = get_default_health()
+
+        def get_json(url: str) -> Any:
+            resp = cached_get(url, headers={"Accept": "application/json"},
+                              timeout=ATS_TIMEOUT, cache=cache, max_bytes=ATS_MAX_BYTES,
+                              accept_types=JSON_CONTENT_TYPES, health=health)
+            if not resp.from_cache:
+                resp.response.raise_for_status()
+            return json.loads(resp.text)
+
+        # Vagas com e sem local têm colunas diferentes e vão em lotes
+        # separados; agrupadas, o quadro não fragmenta os lotes do upsert
+        return sorted(self.jobs(token, get_json), key=lambda job: "location" not in job)
+
+    @staticmethod
+    def record(title: Optional[str], company: Optional[str], location: Optional[str],
+               description: Optional[str], url: Optional[str], source: str) -> Dict[str, Any]:
+        """Monta a vaga; `location` só é incluída quando o ATS informa o local."""
+        job = {
+            "title": (title or "").strip() or "Vaga",
+            "company": company,
+            "description": description or "",
+            "url": url,
+            "source": source,
+        }
+        if location:
+            job["location"] = location
+        return job
+
+
+class GreenhouseAdapter(BoardAdapter):
+    """`boards.greenhouse.io/<empresa>` -> `boards-api.greenhouse.io/v1/boards/<empresa>/jobs`."""
+
+    name = "Greenhouse"
+    hosts = ("boards.greenhouse.io", "job-boards.greenhouse.io")
+
+    def board_token(self, url: str) -> Optional[str]:
+        parts = urlsplit(url)
+        if parts.path.startswith("/embed/"):
+            # Quadro embutido: /embed/job_board?for=<empresa>
+            return parse_qs(parts.query).get("for", [None])[0]
+        return super().board_token(url)
+
+    def jobs(self, token, get_json):
+        data = get_json(f"https://boards-api.greenhouse.io/v1/boards/{quote(token)}/jobs?content=true")
+        for job in data.get("jobs", []):
+            # O conteúdo vem como HTML escapado (&lt;p&gt;...)
+            content = strip_html(html.unescape(job.get("content") or ""))
+            yield self.record(job.get("title"), job.get("company_name") or token,
+                              (job.get("location") or {}).get("name"), content,
+                              job.get("absolute_url"), self.name)
+
+
+class LeverAdapter(BoardAdapter):
+    """`jobs.lever.co/<empresa>` -> `api.lever.co/v0/postings/<empresa>`, paginada por `skip`/`limit`."""
+
+    name = "Lever"
+    hosts = ("jobs.lever.co",)
+    api = "https://api.lever.co"
+    page_size = 100
+
+    def jobs(self, token, get_json):
+        for page in range(ATS_MAX_PAGES):
+            postings = get_json(f"{self.api}/v0/postings/{quote(token)}?mode=json"
+                                f"&skip={page * self.page_size}&limit={self.page_size}")
+            if not isinstance(postings, list):
+                raise ValueError(f"Resposta inesperada da API do Lever para {token}")
+            for posting in postings:
+                categories = posting.get("categories") or {}
+                description = posting.get("descriptionPlain") or strip_html(posting.get("description") or "")
+                yield self.record(posting.get("text"), token, categories.get("location"), description,
+                                  posting.get("hostedUrl"), self.name)
+            if len(postings) < self.page_size:
+                break
+
+
+class LeverEuAdapter(LeverAdapter):
+    """Quadros do Lever hospedados na UE, servidos por uma API própria."""
+
+    hosts = ("jobs.eu.lever.co",)
+    api = "https://api.eu.lever.co"
+
+
+class WorkableAdapter(BoardAdapter):
+    """`apply.workable.com/<conta>` -> `apply.workable.com/api/v1/widget/accounts/<conta>?details=true`."""
+
+    name = "Workable"
+    hosts = ("apply.workable.com",)
+
+    def jobs(self, token, get_json):
+        data = get_json(f"https://apply.workable.com/api/v1/widget/accounts/{quote(token)}?details=true")
+        company = data.get("name") or token
+        for job in data.get("jobs", []):
+            location = ", ".join(p for p in (job.get("city"), job.get("state"), job.get("country")) if p)
+            if job.get("telecommuting"):
+                location = f"{location} (remoto)" if location else "Remoto"
+            yield self.record(job.get("title"), company, location, strip_html(job.get("description") or ""),
+                              job.get("url") or job.get("shortlink"), self.name)
+
+
+class AshbyAdapter(BoardAdapter):
+    """`jobs.ashbyhq.com/<empresa>` -> `api.ashbyhq.com/posting-api/job-board/<empresa>`."""
+
+    name = "Ashby"
+    hosts = ("jobs.ashbyhq.com",)
+
+    def jobs(self, token, get_json):
+        data = get_json(f"https://api.ashbyhq.com/posting-api/job-board/{quote(token)}")
+        for job in data.get("jobs", []):
+            if job.get("isListed") is False:
+                continue
+            description = job.get("descriptionPlain") or strip_html(job.get("descriptionHtml") or "")
+            yield self.record(job.get("title"), token, job.get("location"), description,
+                              job.get("jobUrl"), self.name)
+
+
+ADAPTERS: Tuple[BoardAdapter, ...] = (
+    GreenhouseAdapter(), LeverAdapter(), LeverEuAdapter(), WorkableAdapter(), AshbyAdapter(),
+)
@@ -0,0 +1,130 @@
+"""
+Checkpoint do estado de um crawl em SQLite, para retomar execuções.
+
+Guarda a fronteira (URLs pendentes, inclusive as que estavam sendo
+baixadas, com prioridade e profundidade), as impressões digitais das URLs
+visitadas e o estado de cortesia de cada host (crawl-delay e horário da
+última requisição).  Cada gravação substitui a anterior numa única
+transação, então um crash no meio da escrita preserva o checkpoint antigo.
+"""
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CHECKPOINT_PATH = ".cache/crawl_checkpoint.sqlite3"
+
+
+@dataclass
+class CrawlState:
+    """Estado serializável de um `WebCrawler`."""
+
+    # (host, url, prioridade, profundidade)
+    frontier: List[Tuple[str, str, float, int]] = field(default_factory=list)
+    visited: bytes = b""
+    visited_meta: Dict[str, object] = field(default_factory=dict)
+    crawl_delay: Dict[str, float] = field(default_factory=dict)
+    last_fetch_time: Dict[str, float] = field(default_factory=dict)
+    next_allowed: Dict[str, float] = field(default_factory=dict)
+    saved_at: float = 0.0
+
+
+class CrawlCheckpoint:
+    """Lê e grava o `CrawlState` num arquivo SQLite."""
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return Path(self.path).exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path)
+        db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY,
+                host TEXT NOT NULL,
+                url TEXT NOT NULL,
+                priority REAL NOT NULL,
+                depth INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS visited (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT PRIMARY KEY,
+                crawl_delay REAL,
+                last_fetch REAL,
+                next_allowed REAL
+            );
+            """
+        )
+        return db
+
+    def save(self, state: CrawlState) -> None:
+        """Substitui o checkpoint atual pelo estado informado."""
+        state.saved_at = time.time()
+        hosts = set(state.crawl_delay) | set(state.last_fetch_time) | set(state.next_allowed)
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    db.execute("DELETE FROM meta")
+                    db.execute("DELETE FROM frontier")
+                    db.execute("DELETE FROM visited")
+                    db.execute("DELETE FROM hosts")
+                    db.executemany(
+                        "INSERT INTO meta VALUES (?, ?)",
+                        [("visited", json.dumps(state.visited_meta)),
+                         ("saved_at", json.dumps(state.saved_at))],
+                    )
+                    db.executemany(
+                        "INSERT INTO frontier (host, url, priority, depth) VALUES (?, ?, ?, ?)",
+                        state.frontier,
+                    )
+                    db.execute("INSERT INTO visited VALUES (0, ?)", (state.visited,))
+                    db.executemany(
+                        "INSERT INTO hosts VALUES (?, ?, ?, ?)",
+                        [
+                            (host, state.crawl_delay.get(host), state.last_fetch_time.get(host),
+                             state.next_allowed.get(host))
+                            for host in hosts
+                        ],
+                    )
+            finally:
+                db.close()
+
+    def load(self) -> Optional[CrawlState]:
+        """Lê o último checkpoint gravado (None se não houver)."""
+        if not self.exists():
+            return None
+        with self._lock:
+            db = self._connect()
+            try:
+                meta = dict(db.execute("SELECT key, value FROM meta"))
+                if not meta:
+                    return None
+                state = CrawlState(
+                    visited_meta=json.loads(meta.get("visited", "{}")),
+                    saved_at=json.loads(meta.get("saved_at", "0")),
+                )
+                state.frontier = db.execute(
+                    "SELECT host, url, priority, depth FROM frontier ORDER BY seq"
+                ).fetchall()
+                row = db.execute("SELECT data FROM visited WHERE id = 0").fetchone()
+                state.visited = row[0] if row else b""
+                for host, delay, last_fetch, next_allowed in db.execute("SELECT * FROM hosts"):
+                    if delay is not None:
+                        state.crawl_delay[host] = delay
+                    if last_fetch is not None:
+                        state.last_fetch_time[host] = last_fetch
+                    if next_allowed is not None:
+                        state.next_allowed[host] = next_allowed
+                return state
+            finally:
+                db.close()
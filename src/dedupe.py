@@ -0,0 +1,390 @@
+"""
+Detecção de vagas quase duplicadas entre fontes diferentes.
+
+A mesma vaga costuma aparecer num Google Forms, num Typeform e na página
+de carreiras da empresa, cada uma com a sua URL.  Entre o scraping e o
+upsert, cada vaga recebe uma impressão digital SimHash de 64 bits do
+título e da descrição normalizados; vagas cujas impressões diferem em
+poucos bits são candidatas a duplicata.
+
+Como a descrição pesa mais que o título na impressão, vagas diferentes da
+mesma empresa (com o mesmo texto institucional) ficam próximas.  Por isso
+uma candidata só é considerada a mesma vaga se vier de outra fonte (campo
+`source`: duas vagas do mesmo site são vagas distintas) e se os títulos
+forem parecidos (similaridade de Jaccard das palavras de ao menos
+`DEDUPE_MIN_TITLE_SIMILARITY`).
+
+As impressões das vagas canônicas ficam num índice LSH em memória: os 64
+bits são divididos em faixas e duas impressões a até `DEDUPE_MAX_DISTANCE`
+bits de distância compartilham ao menos uma faixa inteira (com faixas
+suficientes), então só os candidatos dessas faixas são comparados.  O
+índice é persistido em SQLite entre execuções.
+
+A canônica de um grupo de duplicatas é a menor URL dele, qualquer que
+seja a ordem em que as páginas chegam, e é a única enviada ao Supabase;
+as demais são anotadas como URLs alternativas dela (`alternate_urls`).
+Quando chega uma URL menor que a canônica atual, ela assume o grupo: a
+antiga vira alternativa e a linha dela deve sair da tabela
+(`demoted`/`delete_rows`).  Essas remoções ficam pendentes no índice até
+darem certo.
+
+O índice só grava (`save`) as vagas cujo envio foi aceito: linhas que
+falharam, ou que apontam para uma canônica que falhou, são reavaliadas na
+próxima execução.
+
+Configuração (variáveis de ambiente):
+
+* `DEDUPE` – `0` desativa a deduplicação (padrão: ativada).
+* `DEDUPE_PATH` – arquivo do índice (padrão: `.cache/dedupe.sqlite3`).
+* `DEDUPE_MAX_DISTANCE` – distância de Hamming máxima entre duplicatas
+  (padrão: 8; textos curtos como anúncios de vagas variam mais que
+  páginas inteiras).
+* `DEDUPE_MIN_TOKENS` – vagas com menos palavras que isso nunca são
+  consideradas duplicatas, para que páginas quase vazias (formulários
+  carregados por JavaScript) não colidam (padrão: 20).
+* `DEDUPE_MIN_TITLE_SIMILARITY` – similaridade mínima entre os títulos de
+  duas duplicatas, de 0 a 1 (padrão: 0.6).
+* `DEDUPE_TTL` – dias sem ver uma vaga até ela sair do índice (padrão: 60).
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+DEDUPE_ENABLED = os.getenv("DEDUPE", "1").lower() not in ("0", "false", "no")
+DEDUPE_PATH = os.getenv("DEDUPE_PATH", ".cache/dedupe.sqlite3")
+DEDUPE_MAX_DISTANCE = int(os.getenv("DEDUPE_MAX_DISTANCE", "8"))
+DEDUPE_MIN_TOKENS = int(os.getenv("DEDUPE_MIN_TOKENS", "20"))
+DEDUPE_MIN_TITLE_SIMILARITY = float(os.getenv("DEDUPE_MIN_TITLE_SIMILARITY", "0.6"))
+DEDUPE_TTL = float(os.getenv("DEDUPE_TTL", "60")) * 24 * 3600
+
+FINGERPRINT_BITS = 64
+# Palavras consecutivas em cada característica do SimHash
+SHINGLE_SIZE = 2
+# Peso das características do título em relação às da descrição
+TITLE_WEIGHT = 2
+
+_WORDS = re.compile(r"\w+")
+_MASK = (1 << FINGERPRINT_BITS) - 1
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Palavras em minúsculas e sem acentos."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORDS.findall(text)
+
+
+def _shingles(tokens: List[str]) -> List[str]:
+    if len(tokens) < SHINGLE_SIZE:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(weighted_features: List[Tuple[str, int]]) -> int:
+    """SimHash de 64 bits de uma lista de ``(característica, peso)``."""
+    counts = [0] * FINGERPRINT_BITS
+    for feature, weight in weighted_features:
+        h = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            if h >> bit & 1:
+                counts[bit] += weight
+            else:
+                counts[bit] -= weight
+    value = 0
+    for bit, count in enumerate(counts):
+        if count > 0:
+            value |= 1 << bit
+    return value
+
+
+def posting_fingerprint(job: Mapping[str, Any]) -> Tuple[int, int]:
+    """Impressão digital de uma vaga e o número de palavras usadas nela."""
+    title = normalize_tokens(str(job.get("title") or ""))
+    description = normalize_tokens(str(job.get("description") or ""))
+    features = [(s, TITLE_WEIGHT) for s in _shingles(title)] + [(s, 1) for s in _shingles(description)]
+    return simhash(features), len(title) + len(description)
+
+
+def posting_source(job: Mapping[str, Any]) -> str:
+    """Fonte da vaga: o campo `source` ou, sem ele, o host da URL."""
+    return str(job.get("source") or urlsplit(str(job.get("url") or "")).netloc).lower()
+
+
+def title_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Similaridade de Jaccard entre as palavras de dois títulos (0 se algum for vazio)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(value: int) -> int:
+    """SQLite guarda inteiros de 64 bits com sinal."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class _Posting(NamedTuple):
+    fingerprint: int
+    canonical: str
+    seen_at: float
+    source: str
+    # Palavras normalizadas do título
+    title: FrozenSet[str]
+
+
+class DuplicateIndex:
+    """Índice LSH de impressões SimHash das vagas canônicas, persistido em SQLite.
+
+    Args:
+        path: Arquivo SQLite; None mantém o índice só em memória.
+        max_distance: Distância de Hamming máxima entre duplicatas.
+        min_tokens: Número mínimo de palavras para participar da deduplicação.
+        ttl: Segundos sem ver uma vaga até ela sair do índice.
+        min_title_similarity: Similaridade mínima entre os títulos de duas
+            duplicatas.
+    """
+
+    def __init__(self, path: Optional[str] = DEDUPE_PATH, max_distance: int = DEDUPE_MAX_DISTANCE,
+                 min_tokens: int = DEDUPE_MIN_TOKENS, ttl: float = DEDUPE_TTL,
+                 min_title_similarity: float = DEDUPE_MIN_TITLE_SIMILARITY):
+        self.path = path
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self.min_title_similarity = min_title_similarity
+        # Com max_distance + 1 faixas, duplicatas dentro do limite concordam
+        # em ao menos uma faixa inteira (princípio da casa dos pombos)
+        bands = min(max_distance + 1, FINGERPRINT_BITS)
+        sizes = [FINGERPRINT_BITS // bands + (1 if i < FINGERPRINT_BITS % bands else 0) for i in range(bands)]
+        # (deslocamento, máscara) de cada faixa
+        self._bands = [(sum(sizes[:i]), (1 << size) - 1) for i, size in enumerate(sizes)]
+        self._lock = threading.Lock()
+        self._postings: Dict[str, _Posting] = {}
+        self._alternates: Dict[str, Set[str]] = {}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._dirty: Set[str] = set()
+        self._changed_canonicals: Set[str] = set()
+        # Antigas canônicas cujas linhas ainda precisam sair da tabela
+        self._demoted: Set[str] = set()
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path)
+        db.execute(
+            """CREATE TABLE IF NOT EXISTS postings (
+                   url TEXT PRIMARY KEY,
+                   fingerprint INTEGER NOT NULL,
+                   canonical TEXT NOT NULL,
+                   seen_at REAL NOT NULL,
+                   source TEXT NOT NULL,
+                   title TEXT NOT NULL
+               )"""
+        )
+        db.execute("CREATE TABLE IF NOT EXISTS demoted (url TEXT PRIMARY KEY)")
+        return db
+
+    def _load(self) -> None:
+        if not self.path or not Path(self.path).exists():
+            return
+        db = self._connect()
+        try:
+            with db:
+                db.execute("DELETE FROM postings WHERE seen_at < ?", (time.time() - self.ttl,))
+            rows = db.execute("SELECT url, fingerprint, canonical, seen_at, source, title FROM postings").fetchall()
+            demoted = [url for url, in db.execute("SELECT url FROM demoted")]
+        finally:
+            db.close()
+        for url, fingerprint, canonical, seen_at, source, title in rows:
+            self._postings[url] = _Posting(fingerprint & _MASK, canonical, seen_at, source, frozenset(title.split()))
+        for url, posting in self._postings.items():
+            if posting.canonical == url:
+                self._index(url, posting.fingerprint)
+            elif posting.canonical in self._postings:
+                self._alternates.setdefault(posting.canonical, set()).add(url)
+            else:
+                # A canônica expirou: a alternativa passa a ser canônica
+                self._postings[url] = posting._replace(canonical=url)
+                self._index(url, posting.fingerprint)
+                self._dirty.add(url)
+        # Só continuam pendentes as que seguem alternativas (a troca pode não ter sido gravada)
+        self._demoted = {url for url in demoted if url in self._postings and self._postings[url].canonical != url}
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        return [(band, fingerprint >> shift & mask) for band, (shift, mask) in enumerate(self._bands)]
+
+    def _index(self, url: str, fingerprint: int) -> None:
+        for key in self._band_keys(fingerprint):
+            self._buckets.setdefault(key, set()).add(url)
+
+    def _unindex(self, url: str, fingerprint: int) -> None:
+        for key in self._band_keys(fingerprint):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(url)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _closest(self, posting: _Posting, exclude: str) -> Optional[str]:
+        best = None
+        seen = set()
+        for key in self._band_keys(posting.fingerprint):
+            for candidate in self._buckets.get(key, ()):
+                if candidate == exclude or candidate in seen:
+                    continue
+                seen.add(candidate)
+                other = self._postings[candidate]
+                # Vagas da mesma fonte são vagas distintas, mesmo com o texto institucional em comum
+                if other.source == posting.source:
+                    continue
+                distance = hamming(posting.fingerprint, other.fingerprint)
+                if distance > self.max_distance:
+                    continue
+                if title_similarity(posting.title, other.title) < self.min_title_similarity:
+                    continue
+                # Empates vão para a menor URL, para o resultado não depender da ordem dos conjuntos
+                if best is None or (distance, candidate) < best:
+                    best = (distance, candidate)
+        return best[1] if best else None
+
+    def _merge(self, old: str, new: str) -> None:
+        """Transforma a canônica `old` e suas alternativas em alternativas de `new`."""
+        self._unindex(old, self._postings[old].fingerprint)
+        moved = self._alternates.pop(old, set()) | {old}
+        moved.discard(new)
+        for url in moved:
+            self._postings[url] = self._postings[url]._replace(canonical=new)
+            self._dirty.add(url)
+        self._alternates.setdefault(new, set()).update(moved)
+        self._changed_canonicals.discard(old)
+        self._changed_canonicals.add(new)
+        self._demoted.add(old)
+
+    def check(self, job: Mapping[str, Any]) -> Optional[str]:
+        """Registra a vaga e diz se ela é duplicata de outra.
+
+        Só vagas de fontes diferentes e com títulos parecidos são comparadas.
+        A canônica de um grupo é sempre a menor URL: se a vaga tem URL menor
+        que a canônica do grupo em que cai, ela passa a ser a canônica, e a
+        antiga entra em `demoted`.
+
+        Returns:
+            A URL canônica, se a vaga for quase duplicata de outra já vista;
+            None se ela for (ou passar a ser) canônica e deva ser enviada.
+        """
+        url = job.get("url")
+        if not url:
+            return None
+        fingerprint, tokens = posting_fingerprint(job)
+        title = frozenset(normalize_tokens(str(job.get("title") or "")))
+        posting = _Posting(fingerprint, url, time.time(), posting_source(job), title)
+        with self._lock:
+            self._dirty.add(url)
+            previous = self._postings.get(url)
+            if previous is not None and previous.canonical == url:
+                self._unindex(url, previous.fingerprint)
+            canonical = self._closest(posting, url) if tokens >= self.min_tokens else None
+            if previous is not None and previous.canonical not in (url, canonical):
+                # Deixou de ser alternativa da canônica anterior
+                old = self._alternates.get(previous.canonical)
+                if old is not None:
+                    old.discard(url)
+                    self._changed_canonicals.add(previous.canonical)
+            if canonical is None or url < canonical:
+                self._postings[url] = posting
+                self._index(url, fingerprint)
+                self._demoted.discard(url)
+                if canonical is not None:
+                    # URL menor que a do grupo: a vaga assume as outras
+                    self._merge(canonical, url)
+                return None
+            if previous is not None and previous.canonical == url:
+                # Uma canônica que encontrou um grupo de URL menor passa a fazer parte dele
+                self._postings[url] = posting
+                self._merge(url, canonical)
+            self._postings[url] = posting._replace(canonical=canonical)
+            # A vaga segue publicada: a canônica não deve expirar
+            self._postings[canonical] = self._postings[canonical]._replace(seen_at=posting.seen_at)
+            self._dirty.add(canonical)
+            alternates = self._alternates.setdefault(canonical, set())
+            if url not in alternates:
+                alternates.add(url)
+                self._changed_canonicals.add(canonical)
+            return canonical
+
+    def alternate_updates(self) -> List[Dict[str, Any]]:
+        """Linhas ``{url, alternate_urls}`` das canônicas cujas alternativas mudaram.
+
+        Enviadas depois das vagas, atualizam só essa coluna das linhas
+        existentes (o upsert com `merge-duplicates` não toca nas demais).
+        """
+        with self._lock:
+            changed, self._changed_canonicals = self._changed_canonicals, set()
+            return [
+                {"url": canonical, "alternate_urls": sorted(self._alternates.get(canonical, ()))}
+                for canonical in sorted(changed)
+                if canonical in self._postings and self._postings[canonical].canonical == canonical
+            ]
+
+    def demoted(self, failed_urls: Iterable[Optional[str]] = ()) -> List[str]:
+        """Antigas canônicas cujas linhas devem ser removidas da tabela.
+
+        Ficam de fora as que pertencem a uma canônica cujo envio falhou: a
+        linha antiga continua sendo a única da vaga no Supabase.
+        """
+        failed = set(failed_urls)
+        with self._lock:
+            return sorted(url for url in self._demoted if self._postings[url].canonical not in failed)
+
+    def save(self, failed_urls: Iterable[Optional[str]] = (), removed: Iterable[str] = ()) -> None:
+        """Grava no SQLite as vagas registradas ou alteradas desde o último `save`.
+
+        Args:
+            failed_urls: URLs cujo envio ao Supabase falhou.  Elas, e as
+                alternativas de canônicas entre elas, não são gravadas e
+                voltam a ser avaliadas na próxima execução.
+            removed: Antigas canônicas (de `demoted`) já removidas da
+                tabela; as demais continuam pendentes.
+        """
+        failed = set(failed_urls)
+        with self._lock:
+            self._demoted.difference_update(removed)
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                (url, _to_signed(posting.fingerprint), posting.canonical, posting.seen_at, posting.source,
+                 " ".join(sorted(posting.title)))
+                for url, posting in ((url, self._postings.get(url)) for url in dirty)
+                if posting is not None and url not in failed and posting.canonical not in failed
+            ]
+            demoted = sorted(self._demoted)
+        if not self.path:
+            return
+        db = self._connect()
+        try:
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO postings (url, fingerprint, canonical, seen_at, source, title) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                db.execute("DELETE FROM demoted")
+                db.executemany("INSERT INTO demoted (url) VALUES (?)", [(url,) for url in demoted])
+        finally:
+            db.close()
+
+    def __len__(self) -> int:
+        return len(self._postings)
@@ -0,0 +1,219 @@
+"""
+Sincronização incremental: só vagas novas ou alteradas são reenviadas.
+
+Cada execução reescrevia todas as linhas com um `scraped_at` novo, mesmo
+quando título e descrição eram idênticos aos da coleta anterior.  Aqui
+cada registro recebe um hash do conteúdo (sem os campos voláteis, como
+`scraped_at` e `id`), comparado com o último hash enviado:
+
+* `manifest` (padrão) – os hashes ficam num arquivo SQLite local,
+  atualizado só com as linhas que o Supabase aceitou;
+* `table` – os hashes são lidos da coluna `content_hash` da tabela, num
+  único select no início, e enviados junto com cada linha;
+* `off` – tudo é enviado, como antes.
+
+As linhas inalteradas podem receber um "toque" barato: um PATCH em lote
+(`url=in.(...)`) que só atualiza a coluna `last_seen_at`.
+
+No modo `manifest` também ficam guardadas as URLs cujo último envio
+falhou.  Uma página que responde 304 só volta a ser extraída quando
+`needs_resend(url)` é verdadeiro; as demais são apenas marcadas como vistas
+(`mark_seen`), sem parse.  Nos modos `table` e `off` não há esse registro e
+toda página 304 é extraída de novo.
+
+Configuração (variáveis de ambiente):
+
+* `SYNC_MODE` – `manifest`, `table` ou `off`.
+* `SYNC_MANIFEST_PATH` – arquivo do manifesto (padrão:
+  `.cache/sync_manifest.sqlite3`).
+* `SYNC_TOUCH` – `0` não atualiza nada nas linhas inalteradas (padrão: 1).
+* `SYNC_TOUCH_COLUMN` – coluna do toque (padrão: `last_seen_at`).
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+SYNC_MODE = os.getenv("SYNC_MODE", "manifest").lower()
+SYNC_MANIFEST_PATH = os.getenv("SYNC_MANIFEST_PATH", ".cache/sync_manifest.sqlite3")
+SYNC_TOUCH = os.getenv("SYNC_TOUCH", "1").lower() not in ("0", "false", "no")
+SYNC_TOUCH_COLUMN = os.getenv("SYNC_TOUCH_COLUMN", "last_seen_at")
+
+SYNC_MANIFEST = "manifest"
+SYNC_TABLE = "table"
+SYNC_OFF = "off"
+
+# Campos que mudam a cada coleta e não fazem parte do conteúdo
+VOLATILE_FIELDS = frozenset({"id", "scraped_at", "last_seen_at", "content_hash"})
+HASH_COLUMN = "content_hash"
+
+
+def content_hash(record: Mapping[str, Any]) -> str:
+    """Hash estável do conteúdo do registro (chaves ordenadas, sem campos voláteis)."""
+    content = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    encoded = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class DeltaSync:
+    """Decide quais registros precisam ser enviados e guarda os hashes enviados.
+
+    Seguro para uso por várias threads.
+
+    Args:
+        mode: `SYNC_MANIFEST`, `SYNC_TABLE` ou `SYNC_OFF`.
+        path: Arquivo do manifesto (modo `manifest`).
+        touch: Se verdadeiro, as linhas inalteradas são marcadas com
+            `touch_column` por `touch_unchanged`.
+        touch_column: Coluna atualizada no toque.
+    """
+
+    def __init__(self, mode: str = SYNC_MODE, path: str = SYNC_MANIFEST_PATH,
+                 touch: bool = SYNC_TOUCH, touch_column: str = SYNC_TOUCH_COLUMN):
+        if mode not in (SYNC_MANIFEST, SYNC_TABLE, SYNC_OFF):
+            raise ValueError(f"SYNC_MODE inválido: {mode} (use manifest, table ou off)")
+        self.mode = mode
+        self.path = path
+        self.touch = touch
+        self.touch_column = touch_column
+        self._lock = threading.Lock()
+        # url -> hash já gravado no Supabase
+        self._known: Dict[str, str] = {}
+        # url -> hash enviado nesta execução, confirmado em `commit`
+        self._staged: Dict[str, str] = {}
+        # URLs cujo último envio falhou (reenviadas mesmo com a página em 304)
+        self._failed: Set[str] = set()
+        self._unchanged: List[str] = []
+        self.unchanged = 0
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS records (url TEXT PRIMARY KEY, hash TEXT NOT NULL, synced_at REAL NOT NULL)"
+        )
+        db.execute("CREATE TABLE IF NOT EXISTS failed (url TEXT PRIMARY KEY, failed_at REAL NOT NULL)")
+        return db
+
+    def _load(self) -> None:
+        if self.mode == SYNC_MANIFEST and Path(self.path).exists():
+            db = self._connect()
+            try:
+                self._known = dict(db.execute("SELECT url, hash FROM records"))
+                self._failed = {url for url, in db.execute("SELECT url FROM failed")}
+            finally:
+                db.close()
+        elif self.mode == SYNC_TABLE:
+            # Importado sob demanda: o cliente só é necessário no modo table/toque
+            from .supabase_client import fetch_column
+            try:
+                self._known = {url: h for url, h in fetch_column(HASH_COLUMN).items() if h}
+            except Exception as e:
+                # Sem os hashes da tabela tudo é enviado, como sem a sincronização
+                logging.warning("Não foi possível ler %s da tabela: %s", HASH_COLUMN, e)
+        if self._known:
+            logging.info("Sincronização incremental (%s): %d hash(es) conhecidos.", self.mode, len(self._known))
+
+    def check(self, record: Dict[str, Any]) -> bool:
+        """Retorna True se o registro é novo ou mudou e deve ser enviado.
+
+        No modo `table` o hash é gravado no próprio registro (`content_hash`).
+        """
+        url = record.get("url")
+        if self.mode == SYNC_OFF or not url:
+            return True
+        digest = content_hash(record)
+        if self.mode == SYNC_TABLE:
+            record[HASH_COLUMN] = digest
+        with self._lock:
+            if self._known.get(url) == digest:
+                self.unchanged += 1
+                if self.touch:
+                    self._unchanged.append(url)
+                return False
+            self._staged[url] = digest
+        return True
+
+    def needs_resend(self, url: str) -> bool:
+        """Diz se uma página inalterada (304) deve ser extraída e comparada de novo.
+
+        No modo `manifest`, só se o último envio da URL falhou; nos demais
+        não há como saber, e a resposta é sempre True.
+        """
+        if self.mode != SYNC_MANIFEST:
+            return True
+        with self._lock:
+            return url in self._failed
+
+    def mark_seen(self, url: str) -> None:
+        """Conta como inalterada uma URL já sincronizada cuja página não mudou (sem extraí-la)."""
+        with self._lock:
+            if url not in self._known:
+                return
+            self.unchanged += 1
+            if self.touch:
+                self._unchanged.append(url)
+
+    def touch_unchanged(self) -> Optional[Any]:
+        """Marca as linhas inalteradas com a data atual (PATCH em lote).
+
+        Returns:
+            O `UpsertReport` dos PATCHes, ou None se não houve toque.
+        """
+        with self._lock:
+            urls, self._unchanged = self._unchanged, []
+        if not urls:
+            return None
+        from .supabase_client import touch_rows
+        return touch_rows(urls, {self.touch_column: datetime.now(timezone.utc).isoformat()})
+
+    def commit(self, failed_urls: Iterable[Optional[str]] = ()) -> None:
+        """Confirma os hashes enviados e grava o manifesto.
+
+        Os hashes das linhas que falharam não são confirmados; as URLs delas
+        ficam registradas para `needs_resend`.
+        """
+        failed = set(failed_urls)
+        with self._lock:
+            staged, self._staged = self._staged, {}
+            synced = {url: digest for url, digest in staged.items() if url not in failed}
+            unsent = [url for url in staged if url in failed]
+            self._known.update(synced)
+            self._failed.difference_update(synced)
+            self._failed.update(unsent)
+        if self.mode != SYNC_MANIFEST or not staged:
+            return
+        now = time.time()
+        db = self._connect()
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?)",
+                               [(url, digest, now) for url, digest in synced.items()])
+                db.executemany("DELETE FROM failed WHERE url = ?", [(url,) for url in synced])
+                db.executemany("INSERT OR REPLACE INTO failed VALUES (?, ?)", [(url, now) for url in unsent])
+        finally:
+            db.close()
+
+    def forget(self, urls: Iterable[str]) -> None:
+        """Esquece os hashes de linhas removidas da tabela, para que voltem a ser enviadas se reaparecerem."""
+        urls = list(urls)
+        with self._lock:
+            for url in urls:
+                self._known.pop(url, None)
+                self._failed.discard(url)
+        if self.mode != SYNC_MANIFEST or not urls:
+            return
+        db = self._connect()
+        try:
+            with db:
+                db.executemany("DELETE FROM records WHERE url = ?", [(url,) for url in urls])
+                db.executemany("DELETE FROM failed WHERE url = ?", [(url,) for url in urls])
+        finally:
+            db.close()
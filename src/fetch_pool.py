@@ -0,0 +1,107 @@
+"""
+Execução concorrente do scraping com limites globais e por host.
+
+Um conjunto fixo de threads processa as URLs, mas nunca mais de
+`per_host` requisições simultâneas para o mesmo domínio.  Assim um host
+lento (um Typeform que demora 30s, por exemplo) ocupa no máximo
+`per_host` workers, enquanto os demais seguem processando URLs de outros
+domínios.  A leitura das URLs é preguiçosa e limitada a uma janela, de
+modo que a memória não cresce com o tamanho da lista.
+
+No modo ordenado (padrão) a janela só anda quando o resultado mais antigo
+é entregue: uma URL lenta segura a entrega de todas as seguintes, e
+quando a janela enche de URLs já prontas (ou do mesmo host, limitadas
+por `per_host`) nenhuma URL nova é lida.  Em listas com hosts misturados
+use `ordered=False` (`--unordered` no `main`), que só para quando há
+`concurrency` requisições em andamento.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+# (url, resultado, exceção) entregue ao consumidor
+Result = Tuple[str, Any, Optional[BaseException]]
+
+
+def host_of(url: str) -> str:
+    """Retorna o host (em minúsculas) usado para agrupar as requisições."""
+    return urlparse(url).netloc.lower()
+
+
+def run_concurrently(
+    urls: Iterable[str],
+    func: Callable[[str], Any],
+    concurrency: int = 4,
+    per_host: int = 2,
+    ordered: bool = True,
+    window: Optional[int] = None,
+) -> Iterator[Result]:
+    """Aplica `func` a cada URL em paralelo e entrega os resultados.
+
+    Args:
+        urls: Iterável de URLs (consumido sob demanda).
+        func: Função executada para cada URL (por exemplo, `scrape_url`).
+        concurrency: Número máximo de requisições em andamento no total.
+        per_host: Número máximo de requisições simultâneas por host.
+        ordered: Se verdadeiro, os resultados saem na ordem de entrada, e
+            uma URL lenta bloqueia a janela (veja a nota do módulo);
+            caso contrário, saem assim que ficam prontos.
+        window: Quantidade máxima de URLs lidas e ainda não entregues
+            (padrão: ``4 * concurrency``).
+    Yields:
+        Tuplas ``(url, resultado, exceção)``; exatamente um dos dois
+        últimos campos é relevante.
+    """
+    concurrency = max(1, concurrency)
+    per_host = max(1, per_host)
+    window = max(window or concurrency * 4, concurrency)
+
+    source = iter(urls)
+    exhausted = False
+    read = 0
+    next_index = 0
+    waiting = 0
+    pending: Dict[str, Deque[Tuple[int, str]]] = {}
+    active: Dict[str, int] = {}
+    futures: Dict[Future, Tuple[int, str, str]] = {}
+    finished: Dict[int, Result] = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            while not exhausted and waiting + len(futures) + len(finished) < window:
+                try:
+                    url = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.setdefault(host_of(url), deque()).append((read, url))
+                read += 1
+                waiting += 1
+
+            for host in list(pending):
+                backlog = pending[host]
+                while backlog and len(futures) < concurrency and active.get(host, 0) < per_host:
+                    index, url = backlog.popleft()
+                    waiting -= 1
+                    futures[pool.submit(func, url)] = (index, url, host)
+                    active[host] = active.get(host, 0) + 1
+                if not backlog:
+                    del pending[host]
+
+            if not futures:
+                break
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, url, host = futures.pop(future)
+                active[host] -= 1
+                error = future.exception()
+                result = (url, None if error else future.result(), error)
+                if ordered:
+                    finished[index] = result
+                else:
+                    yield result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
@@ -0,0 +1,180 @@
+"""
+Fronteira do crawler com escalonamento educado por host.
+
+Cada host tem sua própria fila de prioridade de URLs, e um min-heap guarda
+o próximo instante em que cada host pode ser acessado.  Um worker sempre
+recebe uma URL de um host já liberado; enquanto um host aguarda o
+crawl-delay, os workers seguem atendendo outros domínios em vez de dormir.
+
+A busca é "best-first": entre os hosts liberados, é servido o que tem a URL
+de maior prioridade, e dentro de cada host as URLs saem em ordem de
+prioridade (empates em ordem de chegada, então com prioridade constante o
+comportamento é o de uma fila FIFO).
+
+Um host fica "ocupado" desde a entrega de uma URL até a chamada de
+`release`, de modo que nunca há duas requisições simultâneas para o mesmo
+domínio e o intervalo entre elas é respeitado exatamente.
+
+Hosts cujo robots.txt ainda está sendo resolvido ficam "estacionados": suas
+URLs são guardadas, mas não entregues, até a chamada de `unpark`.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# Item de uma fila de host: (-prioridade, sequência, url, profundidade)
+_Entry = Tuple[float, int, str, int]
+
+
+class Frontier:
+    """Conjunto de filas de prioridade por host com um heap de horários liberados."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[_Entry]] = {}
+        # Hosts aguardando o horário liberado: (horário, seq, host)
+        self._heap: List[Tuple[float, int, str]] = []
+        # Hosts já liberados, pela melhor prioridade: (-prioridade, seq, host, ficha)
+        self._ready: List[Tuple[float, int, str, int]] = []
+        # Ficha do agendamento atual de cada host; entradas com ficha antiga são descartadas
+        self._tokens: Dict[str, int] = {}
+        self._next_allowed: Dict[str, float] = {}
+        self._busy: Dict[str, _Entry] = {}
+        self._parked: Set[str] = set()
+        self._seq = itertools.count()
+        self._pending = 0
+        self._held = 0
+        self._closed = False
+
+    def put(self, host: str, url: str, priority: float = 0.0, depth: int = 0) -> None:
+        """Enfileira uma URL para o host (maior `priority` sai primeiro)."""
+        with self._cond:
+            queue = self._queues.get(host)
+            if queue is None:
+                queue = self._queues[host] = []
+            best = -queue[0][0] if queue else None
+            heapq.heappush(queue, (-priority, next(self._seq), url, depth))
+            self._pending += 1
+            if host not in self._busy and host not in self._parked:
+                if best is None:
+                    self._schedule_locked(host)
+                elif priority > best and self._tokens.get(host, 0) > 0:
+                    # O host já está liberado: reposiciona-o com a nova melhor prioridade
+                    self._push_ready_locked(host)
+            self._cond.notify()
+
+    def get(self) -> Optional[Tuple[str, str, int]]:
+        """Bloqueia até haver uma URL de um host liberado.
+
+        Returns:
+            Tupla ``(host, url, profundidade)`` com a URL de maior
+            prioridade entre os hosts liberados, ou None quando a fronteira
+            foi fechada ou esvaziou (nenhuma URL pendente, nenhum host em
+            processamento ou estacionado e nenhum trabalho retido com `hold`).
+        """
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, host = heapq.heappop(self._heap)
+                    if self._tokens.get(host) == 0:
+                        self._push_ready_locked(host)
+                while self._ready:
+                    _, _, host, token = heapq.heappop(self._ready)
+                    if self._tokens.get(host) != token:
+                        continue
+                    del self._tokens[host]
+                    entry = heapq.heappop(self._queues[host])
+                    self._busy[host] = entry
+                    self._pending -= 1
+                    return host, entry[2], entry[3]
+                if self._heap:
+                    wait = self._heap[0][0] - now
+                elif not self._busy and not self._parked and not self._held:
+                    return None
+                else:
+                    wait = None
+                self._cond.wait(wait)
+            return None
+
+    def release(self, host: str, not_before: float = 0.0) -> None:
+        """Devolve o host, que só volta a ser servido a partir de `not_before`."""
+        with self._cond:
+            self._busy.pop(host, None)
+            self._next_allowed[host] = max(self._next_allowed.get(host, 0.0), not_before)
+            if not self._queues.get(host):
+                self._queues.pop(host, None)
+            elif host not in self._parked:
+                self._schedule_locked(host)
+            self._cond.notify_all()
+
+    def park(self, host: str) -> None:
+        """Retém as URLs do host (já enfileiradas ou futuras) até `unpark`."""
+        with self._cond:
+            if host in self._parked:
+                return
+            self._parked.add(host)
+            if self._tokens.pop(host, None) is not None:
+                self._heap = [item for item in self._heap if item[2] != host]
+                heapq.heapify(self._heap)
+
+    def unpark(self, host: str) -> None:
+        """Libera um host estacionado para voltar a ser servido."""
+        with self._cond:
+            if host not in self._parked:
+                return
+            self._parked.discard(host)
+            if self._queues.get(host) and host not in self._busy:
+                self._schedule_locked(host)
+            self._cond.notify_all()
+
+    def hold(self) -> None:
+        """Mantém a fronteira aberta enquanto há trabalho fora dela (um parse
+        pendente ou a leitura de sitemaps, que ainda podem enfileirar URLs)."""
+        with self._cond:
+            self._held += 1
+
+    def unhold(self) -> None:
+        with self._cond:
+            self._held -= 1
+            self._cond.notify_all()
+
+    def set_not_before(self, host: str, not_before: float) -> None:
+        """Define o instante a partir do qual o host pode ser servido (ao retomar um crawl)."""
+        with self._cond:
+            self._next_allowed[host] = max(self._next_allowed.get(host, 0.0), not_before)
+
+    def snapshot(self) -> Tuple[List[Tuple[str, str, float, int]], Dict[str, float]]:
+        """Retorna as URLs pendentes (incluindo as em processamento), como tuplas
+        ``(host, url, prioridade, profundidade)``, e os horários liberados."""
+        with self._cond:
+            urls = [(host, url, -neg, depth) for host, (neg, _, url, depth) in self._busy.items()]
+            for host, queue in self._queues.items():
+                urls.extend((host, url, -neg, depth) for neg, _, url, depth in sorted(queue))
+            return urls, dict(self._next_allowed)
+
+    def close(self) -> None:
+        """Acorda todos os workers bloqueados em `get`, que retornam None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return self._pending
+
+    def _schedule_locked(self, host: str) -> None:
+        # Ficha 0: aguardando o horário liberado; positiva: já liberado
+        ready_at = self._next_allowed.get(host, 0.0)
+        if ready_at <= time.time():
+            self._push_ready_locked(host)
+        else:
+            self._tokens[host] = 0
+            heapq.heappush(self._heap, (ready_at, next(self._seq), host))
+
+    def _push_ready_locked(self, host: str) -> None:
+        token = next(self._seq) + 1
+        self._tokens[host] = token
+        heapq.heappush(self._ready, (self._queues[host][0][0], token, host, token))
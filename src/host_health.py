@@ -0,0 +1,350 @@
+"""
+Saúde por host: novas tentativas, timeouts adaptativos e disjuntor.
+
+Sem memória de falhas, um host fora do ar ou limitando requisições faz
+cada uma das suas URLs gastar um timeout inteiro.  `HostHealth` acompanha
+cada host e é compartilhado pelo scraper (`fetch_html`, adaptadores de
+ATS) e pelo `WebCrawler`, via `cached_get(..., health=...)`:
+
+* erros transitórios (rede, timeout, 429/5xx) são repetidos com backoff
+  exponencial com jitter; um `Retry-After` em 429/503 é respeitado;
+* o timeout de cada host acompanha a latência observada (média e desvio
+  suavizados, como o RTO do TCP), entre `FETCH_TIMEOUT_MIN` e o timeout
+  pedido pelo chamador, e dobra a cada timeout estourado;
+* após `CIRCUIT_FAILURES` falhas seguidas o disjuntor do host abre: as
+  requisições falham na hora com `HostUnavailable` até o fim da espera
+  (`CIRCUIT_COOLDOWN`, dobrada a cada nova abertura), quando uma única
+  requisição de teste decide se ele fecha.  Só contam como nova abertura a
+  passagem de fechado para aberto e a falha da requisição de teste: falhas
+  de requisições que já estavam em andamento quando o disjuntor abriu são
+  ignoradas.  Depois de `CIRCUIT_MAX_TRIPS` aberturas o host é dado como
+  morto até o fim da execução.
+
+O crawler não dorme esperando um host: a URL volta para a fronteira e o
+host só é servido de novo quando liberado (ou a URL é descartada, se o
+host estiver morto).
+
+Configuração (variáveis de ambiente):
+
+* `HOST_HEALTH` – `0` desativa (padrão: ativado).
+* `FETCH_MAX_RETRIES` – novas tentativas por requisição (padrão: 2).
+* `FETCH_RETRY_BACKOFF` – espera base do backoff, em segundos (padrão: 1).
+* `FETCH_MAX_WAIT` – espera máxima (backoff ou `Retry-After`) aceita antes
+  de desistir do host na hora (padrão: 30s).
+* `FETCH_TIMEOUT_MIN` – menor timeout adaptativo (padrão: 5s).
+* `CIRCUIT_FAILURES` – falhas seguidas que abrem o disjuntor (padrão: 5).
+* `CIRCUIT_COOLDOWN` – segundos com o disjuntor aberto (padrão: 60).
+* `CIRCUIT_MAX_TRIPS` – aberturas até o host ser dado como morto (padrão: 3).
+"""
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from .metrics import get_metrics
+
+HOST_HEALTH_ENABLED = os.getenv("HOST_HEALTH", "1").lower() not in ("0", "false", "no")
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "2"))
+FETCH_RETRY_BACKOFF = float(os.getenv("FETCH_RETRY_BACKOFF", "1.0"))
+FETCH_MAX_WAIT = float(os.getenv("FETCH_MAX_WAIT", "30"))
+FETCH_TIMEOUT_MIN = float(os.getenv("FETCH_TIMEOUT_MIN", "5"))
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "5"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", "60"))
+CIRCUIT_MAX_TRIPS = int(os.getenv("CIRCUIT_MAX_TRIPS", "3"))
+
+# Respostas que indicam um problema passageiro do host
+TRANSIENT_STATUS = frozenset({429, 500, 502, 503, 504})
+# Exceções de rede que valem uma nova tentativa
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+# Teto do backoff exponencial sem Retry-After
+RETRY_MAX_BACKOFF = 60.0
+# Fator máximo aplicado ao timeout depois de timeouts seguidos
+TIMEOUT_MAX_SCALE = 8
+
+
+class HostUnavailable(Exception):
+    """O host está com o disjuntor aberto (ou pediu para esperar mais que o aceitável)."""
+
+    def __init__(self, host: str, until: float, dead: bool = False):
+        wait = max(0.0, until - time.time())
+        reason = "fora do ar" if dead else f"indisponível por mais {wait:.0f}s"
+        super().__init__(f"Host {reason}: {host}")
+        self.host = host
+        self.until = until
+        self.dead = dead
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Espera pedida em `Retry-After` (segundos ou data HTTP), ou None."""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(response: Any) -> bool:
+    """Diz se uma resposta (qualquer objeto com `status_code`) merece nova tentativa."""
+    return getattr(response, "status_code", None) in TRANSIENT_STATUS
+
+
+@dataclass
+class _HostState:
+    # Latência suavizada e sua variação (segundos); None até a primeira amostra
+    srtt: Optional[float] = None
+    rttvar: float = 0.0
+    timeout_scale: float = 1.0
+    failures: int = 0
+    # Só volta a ser acessado a partir daqui (backoff ou Retry-After)
+    backoff_until: float = 0.0
+    open_until: float = 0.0
+    trips: int = 0
+    probing: bool = False
+    # Avança a cada abertura do disjuntor e a cada requisição de teste; o
+    # resultado de uma requisição de uma geração anterior não mexe nele
+    generation: int = 0
+
+
+class HostHealth:
+    """Estado de saúde de cada host, seguro para uso por várias threads.
+
+    Args:
+        max_retries: Novas tentativas padrão de `call`.
+        backoff: Espera base do backoff exponencial.
+        max_wait: Espera máxima padrão de `call` antes de `HostUnavailable`.
+        min_timeout: Menor timeout adaptativo.
+        failure_threshold: Falhas seguidas que abrem o disjuntor.
+        cooldown: Segundos da primeira abertura do disjuntor.
+        max_trips: Aberturas até o host ser dado como morto.
+    """
+
+    def __init__(self, max_retries: int = FETCH_MAX_RETRIES, backoff: float = FETCH_RETRY_BACKOFF,
+                 max_wait: float = FETCH_MAX_WAIT, min_timeout: float = FETCH_TIMEOUT_MIN,
+                 failure_threshold: int = CIRCUIT_FAILURES, cooldown: float = CIRCUIT_COOLDOWN,
+                 max_trips: int = CIRCUIT_MAX_TRIPS):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.min_timeout = min_timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+        self.metrics = get_metrics()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def is_dead(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state.trips >= self.max_trips
+
+    def available_at(self, host: str) -> float:
+        """Instante a partir do qual o host pode receber uma requisição."""
+        with self._lock:
+            state = self._hosts.get(host)
+            return max(state.backoff_until, state.open_until) if state is not None else 0.0
+
+    def timeout(self, host: str, ceiling: float) -> float:
+        """Timeout da próxima requisição ao host, limitado a `ceiling`."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.srtt is None:
+                return ceiling
+            adaptive = (state.srtt + 4 * state.rttvar) * state.timeout_scale
+        return min(ceiling, max(self.min_timeout, adaptive))
+
+    def acquire(self, host: str) -> int:
+        """Verifica o disjuntor antes de uma requisição.
+
+        Com o disjuntor fechado nada acontece; aberto, falha na hora.  Passada
+        a espera, uma única requisição de teste é liberada e as demais falham
+        até o resultado dela (`record_success` ou `record_failure`).
+
+        Returns:
+            A geração do disjuntor, a ser passada ao registrar o resultado.
+        Raises:
+            HostUnavailable se o host não puder ser acessado agora.
+        """
+        now = time.time()
+        with self._lock:
+            state = self._state(host)
+            if state.trips >= self.max_trips:
+                raise HostUnavailable(host, now, dead=True)
+            if state.failures < self.failure_threshold:
+                return state.generation
+            if now < state.open_until or state.probing:
+                raise HostUnavailable(host, max(state.open_until, now + self.backoff))
+            state.probing = True
+            state.generation += 1
+            return state.generation
+
+    def _is_stale(self, state: _HostState, generation: Optional[int]) -> bool:
+        return generation is not None and generation != state.generation
+
+    def release(self, host: str, generation: Optional[int] = None) -> None:
+        """Libera a requisição de teste sem registrar resultado (erro não relacionado ao host)."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None and not self._is_stale(state, generation):
+                state.probing = False
+
+    def record_success(self, host: str, elapsed: Optional[float] = None, generation: Optional[int] = None) -> None:
+        """Registra uma resposta do host; `elapsed` atualiza a latência suavizada.
+
+        Uma resposta de uma requisição anterior à última abertura não fecha o
+        disjuntor (só a requisição de teste decide); ela só entra na latência.
+        """
+        with self._lock:
+            state = self._state(host)
+            if state.failures >= self.failure_threshold:
+                if self._is_stale(state, generation):
+                    self._observe_latency(state, elapsed)
+                    return
+                logging.info("Disjuntor fechado para %s.", host)
+            state.failures = 0
+            state.trips = 0
+            state.probing = False
+            state.timeout_scale = 1.0
+            state.backoff_until = 0.0
+            self._observe_latency(state, elapsed)
+
+    @staticmethod
+    def _observe_latency(state: _HostState, elapsed: Optional[float]) -> None:
+        if elapsed is None:
+            return
+        if state.srtt is None:
+            state.srtt, state.rttvar = elapsed, elapsed / 2
+        else:
+            state.rttvar = 0.75 * state.rttvar + 0.25 * abs(state.srtt - elapsed)
+            state.srtt = 0.875 * state.srtt + 0.125 * elapsed
+
+    def record_failure(self, host: str, retry_after: Optional[float] = None, timed_out: bool = False,
+                       generation: Optional[int] = None) -> float:
+        """Registra uma falha transitória e agenda o backoff do host.
+
+        O disjuntor abre quando as falhas seguidas chegam ao limite (com ele
+        fechado) ou quando a requisição de teste falha.  Falhas de requisições
+        de uma geração anterior (em andamento quando ele abriu) são ignoradas.
+
+        Args:
+            generation: Valor retornado por `acquire` para a requisição.
+        Returns:
+            O instante a partir do qual o host pode ser tentado de novo.
+        """
+        now = time.time()
+        with self._lock:
+            state = self._state(host)
+            if self._is_stale(state, generation):
+                return max(state.backoff_until, state.open_until)
+            state.failures += 1
+            state.probing = False
+            if timed_out:
+                state.timeout_scale = min(state.timeout_scale * 2, TIMEOUT_MAX_SCALE)
+            delay = retry_after if retry_after is not None else self.retry_delay(state.failures - 1)
+            state.backoff_until = max(state.backoff_until, now + delay)
+            if state.failures >= self.failure_threshold:
+                # Fechado -> aberto, ou a requisição de teste falhou
+                state.open_until = now + self.cooldown * 2 ** state.trips
+                state.trips += 1
+                state.generation += 1
+                self.metrics.incr("circuit_open", host=host)
+                logging.warning("Disjuntor aberto para %s após %d falha(s) seguidas (%d/%d).",
+                                host, state.failures, state.trips, self.max_trips)
+            return max(state.backoff_until, state.open_until)
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter para a tentativa `attempt` (a partir de 0)."""
+        return min(RETRY_MAX_BACKOFF, self.backoff * 2 ** attempt) * (0.5 + random.random())
+
+    def call(self, url: str, fetch: Callable[[float], Any], retries: Optional[int] = None,
+             ceiling: float = 30, max_wait: Optional[float] = None) -> Any:
+        """Executa `fetch(timeout)` para a URL aplicando backoff, timeouts e disjuntor.
+
+        Args:
+            url: URL pedida (define o host).
+            fetch: Função que faz a requisição com o timeout dado e retorna
+                um objeto com `status_code` (e, opcionalmente, `response`).
+            retries: Novas tentativas em erros transitórios (padrão: `max_retries`).
+            ceiling: Timeout máximo, em segundos.
+            max_wait: Espera máxima antes de cada tentativa; acima disso
+                `HostUnavailable` é lançada (padrão: `max_wait`; 0 nunca dorme).
+        Returns:
+            O resultado de `fetch`; após esgotar as tentativas, a última
+            resposta transitória (429/5xx) é retornada.
+        Raises:
+            HostUnavailable se o host estiver com o disjuntor aberto ou
+            pedir uma espera acima de `max_wait`.
+            A última exceção de rede, se todas as tentativas falharem.
+        """
+        host = urlsplit(url).netloc.lower()
+        retries = self.max_retries if retries is None else retries
+        max_wait = self.max_wait if max_wait is None else max_wait
+        attempt = 0
+        while True:
+            until = self.available_at(host)
+            wait = until - time.time()
+            if wait > 0:
+                if wait > max_wait:
+                    raise HostUnavailable(host, until, dead=self.is_dead(host))
+                time.sleep(wait)
+            generation = self.acquire(host)
+            start = time.perf_counter()
+            try:
+                result = fetch(self.timeout(host, ceiling))
+            except TRANSIENT_ERRORS as e:
+                self.record_failure(host, timed_out=isinstance(e, requests.Timeout), generation=generation)
+                if attempt >= retries:
+                    raise
+                logging.info("Falha transitória em %s (%s); nova tentativa.", url, e)
+            except Exception:
+                # Erro que não diz nada sobre a saúde do host (conteúdo recusado, URL inválida...)
+                self.release(host, generation)
+                raise
+            else:
+                response = getattr(result, "response", None)
+                if not is_transient(result):
+                    # Respostas servidas do cache sem requisição não entram na latência
+                    self.record_success(host, time.perf_counter() - start if response is not None else None,
+                                        generation)
+                    return result
+                headers = response.headers if response is not None else {}
+                self.record_failure(host, retry_after=retry_after_seconds(headers), generation=generation)
+                if attempt >= retries:
+                    return result
+                logging.info("%s respondeu %s; nova tentativa.", url, result.status_code)
+            attempt += 1
+            self.metrics.incr("fetch_retries", host=host)
+
+
+_default_health: Optional[HostHealth] = None
+_default_lock = threading.Lock()
+
+
+def get_default_health() -> Optional[HostHealth]:
+    """Retorna o `HostHealth` compartilhado do processo, ou None se estiver desativado."""
+    global _default_health
+    if not HOST_HEALTH_ENABLED:
+        return None
+    with _default_lock:
+        if _default_health is None:
+            _default_health = HostHealth()
+        return _default_health
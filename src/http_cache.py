@@ -0,0 +1,433 @@
+"""
+Cache HTTP persistente com requisições condicionais (ETag / Last-Modified).
+
+O scraper roda a cada 12 horas praticamente sobre as mesmas URLs.  Este
+módulo guarda em disco (SQLite) o corpo de cada página junto com os
+validadores `ETag` e `Last-Modified`.  Na coleta seguinte a página é
+pedida com `If-None-Match` / `If-Modified-Since`; numa resposta 304 o corpo
+guardado é devolvido (`from_cache`).  O cache economiza o download, mas
+não decide o que é reenviado ao Supabase: o chamador pergunta à
+sincronização incremental (`DeltaSync.needs_resend`) se o último envio da
+URL falhou.  Só nesse caso o corpo guardado volta a passar pela extração;
+nos demais a página é tratada como inalterada (`NotModified`) e a linha só
+é marcada como vista.
+
+Configuração (variáveis de ambiente):
+
+* `HTTP_CACHE` – `0` desativa o cache (padrão: ativado).
+* `HTTP_CACHE_PATH` – arquivo SQLite (padrão: `.cache/http_cache.sqlite3`).
+* `HTTP_CACHE_MAX_MB` – tamanho máximo dos corpos guardados; as entradas
+  menos usadas recentemente são removidas primeiro (padrão: 200).
+* `HTTP_CACHE_MAX_AGE` – segundos durante os quais uma entrada é
+  considerada fresca e servida sem nenhuma requisição (padrão: 0, ou
+  seja, sempre revalida).
+* `HTTP_CACHE_TTL` – idade máxima, em segundos, de uma entrada; entradas
+  mais antigas são descartadas e a página é baixada por completo
+  (padrão: 30 dias).
+* `FETCH_MAX_BYTES` – tamanho máximo do corpo baixado (padrão: 5 MiB).
+
+O download é feito em streaming: respostas cujo `Content-Type` não é HTML,
+ou cujo `Content-Length` passa do limite, são descartadas logo após os
+cabeçalhos (`UnsupportedContent`); corpos sem tamanho declarado são
+truncados no limite.  O texto é decodificado pelo charset do cabeçalho,
+pelo BOM ou pela tag `<meta charset>`, sem detecção estatística.
+
+Com `health` (um `HostHealth`), `cached_get` repete erros transitórios,
+ajusta o timeout à latência do host e respeita o disjuntor dele.
+"""
+import codecs
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from . import transport
+from .host_health import HostHealth
+from .metrics import get_metrics
+from .utils import canonicalize_url
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE", "1").lower() not in ("0", "false", "no")
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", ".cache/http_cache.sqlite3")
+HTTP_CACHE_MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "200")) * 1024 * 1024)
+HTTP_CACHE_MAX_AGE = float(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(30 * 24 * 3600)))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Tipos aceitos por padrão; respostas sem Content-Type também são aceitas
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_SIZE = 64 * 1024
+# Corpos descartados até este tamanho são lidos até o fim, para a conexão voltar ao pool
+DISCARD_MAX_BYTES = 64 * 1024
+# Trecho inicial do corpo onde se procura a declaração de charset
+SNIFF_BYTES = 4096
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class NotModified(Exception):
+    """A página não mudou desde a última coleta (resposta 304 ou entrada fresca)."""
+
+    def __init__(self, url: str):
+        super().__init__(f"Página inalterada: {url}")
+        self.url = url
+
+
+class UnsupportedContent(Exception):
+    """A resposta foi descartada antes do download (tipo não-HTML ou tamanho acima do limite)."""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"Conteúdo ignorado ({reason}): {url}")
+        self.url = url
+        self.reason = reason
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: str
+    fetched_at: float
+
+
+@dataclass
+class CachedResponse:
+    """Resultado de `cached_get`.
+
+    `from_cache` indica que o corpo veio do cache (304 ou entrada fresca);
+    `response` é a resposta HTTP original, ausente quando nenhuma
+    requisição foi feita.
+    """
+
+    status_code: int
+    text: str
+    from_cache: bool
+    response: Optional[requests.Response] = None
+
+
+def cache_key(url: str) -> str:
+    """Chave do cache: a URL canônica (ver `utils.canonicalize_url`)."""
+    return canonicalize_url(url)
+
+
+class HttpCache:
+    """Armazena corpos e validadores HTTP num arquivo SQLite.
+
+    Seguro para uso por várias threads (todas as operações passam por um
+    lock).  A remoção por tamanho segue a ordem LRU, pelo último acesso.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 max_age: float = HTTP_CACHE_MAX_AGE, ttl: float = HTTP_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.ttl = ttl
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                   key TEXT PRIMARY KEY,
+                   etag TEXT,
+                   last_modified TEXT,
+                   body TEXT NOT NULL,
+                   size INTEGER NOT NULL,
+                   fetched_at REAL NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._db.execute("DELETE FROM entries WHERE fetched_at < ?", (time.time() - ttl,))
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Retorna a entrada da URL (se existir e não tiver expirado)."""
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[3] < now - self.ttl:
+                self._delete_locked(key)
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return CacheEntry(url, row[0], row[1], row[2], row[3])
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return self.max_age > 0 and time.time() - entry.fetched_at < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """Cabeçalhos de revalidação para a entrada (vazio se não houver validadores)."""
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url: str, headers: Mapping[str, str], body: str) -> None:
+        """Guarda a resposta, desde que ela traga algum validador."""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control:
+            return
+        key = cache_key(url)
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._delete_locked(key)
+            self._db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, body, size, now, now),
+            )
+            self._size += size
+            self._evict_locked()
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Marca a entrada como revalidada (após um 304)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET fetched_at = ?, last_access = ? WHERE key = ?",
+                (now, now, cache_key(url)),
+            )
+            self._db.commit()
+
+    def _delete_locked(self, key: str) -> None:
+        row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._size -= row[0]
+
+    def _evict_locked(self) -> None:
+        while self._size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._size -= size
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _header_charset(content_type: str) -> Optional[str]:
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            return value.strip().strip("\"'")
+    return None
+
+
+def detect_charset(body: bytes, content_type: str = "") -> str:
+    """Escolhe a codificação do corpo: BOM, cabeçalho, `<meta charset>` ou UTF-8."""
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return encoding
+    candidates = [_header_charset(content_type)]
+    match = _META_CHARSET.search(body[:SNIFF_BYTES])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    for charset in candidates:
+        if not charset:
+            continue
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def decode_body(body: bytes, content_type: str = "") -> str:
+    """Decodifica o corpo; bytes inválidos são substituídos, nunca geram erro."""
+    return body.decode(detect_charset(body, content_type), errors="replace")
+
+
+def read_body(response: requests.Response, max_bytes: int) -> Tuple[bytes, bool]:
+    """Lê o corpo em blocos até `max_bytes`.
+
+    Returns:
+        Tupla ``(corpo, truncado)``.  Quando o limite é atingido a conexão
+        é fechada sem ler o restante.
+    """
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                return b"".join(chunks)[:max_bytes], True
+    finally:
+        response.close()
+    return b"".join(chunks), False
+
+
+def discard_response(response: requests.Response, max_bytes: int = DISCARD_MAX_BYTES) -> None:
+    """Descarta o corpo de uma resposta não usada (304 ou rejeitada) e a fecha.
+
+    `close()` numa resposta em streaming ainda não lida fecha o socket; por
+    isso corpos pequenos (até `max_bytes`) são lidos até o fim e a conexão
+    volta ao pool do transporte.  Corpos maiores encerram a conexão.
+    """
+    length = response.headers.get("Content-Length")
+    try:
+        if not (length and length.isdigit() and int(length) > max_bytes):
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    break
+    except requests.RequestException:
+        pass
+    finally:
+        response.close()
+
+
+def check_response(url: str, response: requests.Response, max_bytes: int,
+                   accept_types: Optional[Sequence[str]]) -> None:
+    """Valida os cabeçalhos antes de baixar o corpo.
+
+    Raises:
+        UnsupportedContent se o tipo não for aceito ou o tamanho declarado
+        passar de `max_bytes`.
+    """
+    content_type = response.headers.get("Content-Type", "")
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if accept_types and media_type and media_type not in accept_types:
+        discard_response(response)
+        raise UnsupportedContent(url, f"tipo {media_type}")
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        discard_response(response)
+        raise UnsupportedContent(url, f"{int(length)} bytes")
+
+
+_default_cache: Optional[HttpCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[HttpCache]:
+    """Retorna o cache configurado pelo ambiente, ou None se estiver desativado."""
+    global _default_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
+
+
+def cached_get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30,
+               cache: Optional[HttpCache] = None, max_bytes: int = FETCH_MAX_BYTES,
+               accept_types: Optional[Sequence[str]] = HTML_CONTENT_TYPES,
+               health: Optional[HostHealth] = None, retries: Optional[int] = None,
+               max_wait: Optional[float] = None) -> CachedResponse:
+    """Faz um GET condicional usando o cache, se houver.
+
+    Args:
+        url: Página a ser baixada.
+        headers: Cabeçalhos extras da requisição.
+        timeout: Timeout da requisição em segundos (o máximo, com `health`).
+        cache: Instância de `HttpCache`; sem ela é um GET comum.
+        max_bytes: Tamanho máximo do corpo; corpos maiores sem
+            `Content-Length` são truncados.
+        accept_types: Tipos de mídia aceitos em respostas 200; None aceita
+            qualquer tipo.
+        health: `HostHealth` opcional que aplica novas tentativas, timeout
+            adaptativo e disjuntor por host.
+        retries: Novas tentativas em erros transitórios (com `health`).
+        max_wait: Espera máxima por um host em backoff (com `health`).
+    Returns:
+        `CachedResponse` com o corpo da página.
+    Raises:
+        UnsupportedContent se o tipo ou o tamanho declarado não forem aceitos.
+        HostUnavailable se o disjuntor do host estiver aberto (com `health`).
+        requests.RequestException em falhas de rede.
+    """
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        get_metrics().incr("fetch_cache_fresh", host=urlsplit(url).netloc)
+        return CachedResponse(200, entry.body, True)
+
+    def fetch(request_timeout: float) -> CachedResponse:
+        return _get(url, headers, request_timeout, cache, entry, max_bytes, accept_types)
+
+    if health is None:
+        return fetch(timeout)
+    return health.call(url, fetch, retries=retries, ceiling=timeout, max_wait=max_wait)
+
+
+def _get(url: str, headers: Optional[Dict[str, str]], timeout: float, cache: Optional[HttpCache],
+         entry: Optional[CacheEntry], max_bytes: int,
+         accept_types: Optional[Sequence[str]]) -> CachedResponse:
+    metrics = get_metrics()
+    host = urlsplit(url).netloc
+    headers = dict(headers or {})
+    if entry is not None:
+        headers.update(cache.conditional_headers(entry))
+    start = time.perf_counter()
+    try:
+        # Com stream=True a chamada retorna após os cabeçalhos (conexão + primeiro byte)
+        response = transport.get(url, headers=headers, timeout=timeout, stream=True)
+        headers_time = time.perf_counter() - start
+        if response.status_code == 304 and entry is not None:
+            discard_response(response)
+            metrics.observe("fetch", headers_time, host)
+            metrics.observe("fetch_headers", headers_time, host)
+            metrics.incr("fetch_not_modified", host=host)
+            cache.touch(url)
+            return CachedResponse(200, entry.body, True, response)
+        if response.status_code == 200:
+            check_response(url, response, max_bytes, accept_types)
+        body, truncated = read_body(response, max_bytes)
+    except UnsupportedContent:
+        metrics.incr("fetch_skipped", host=host)
+        raise
+    except requests.RequestException:
+        metrics.incr("fetch_errors", host=host)
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.observe("fetch", elapsed, host)
+    metrics.observe("fetch_headers", headers_time, host)
+    metrics.observe("fetch_body", elapsed - headers_time, host)
+    metrics.incr("fetch_bytes", len(body), host=host)
+    text = decode_body(body, response.headers.get("Content-Type", ""))
+    if truncated:
+        metrics.incr("fetch_truncated", host=host)
+    elif cache is not None and response.status_code == 200:
+        # Corpos truncados não vão para o cache, para não serem revalidados como completos
+        cache.store(url, response.headers, text)
+    return CachedResponse(response.status_code, text, False, response)
@@ -0,0 +1,208 @@
+"""
+Pontuação de links para o crawl "best-first" focado em vagas.
+
+Cada link descoberto recebe uma nota antes de entrar na fronteira, e as
+URLs de maior nota são baixadas primeiro.  A nota soma:
+
+* palavras-chave de vagas no texto da âncora e no caminho da URL
+  ("product manager", "vagas", "careers", `/jobs/`...);
+* domínios de ATS e formulários (Google Forms, Tally, Typeform,
+  Greenhouse, Lever, Workable, Ashby, Gupy...);
+* penalidades para seções que raramente têm vagas (blog, docs, login...)
+  e para a profundidade em relação às sementes.
+
+Regras de escopo: domínios negados nunca são enfileirados e, se houver
+domínios permitidos, só eles (e os domínios de ATS/formulários) são
+seguidos.
+
+Configuração (variáveis de ambiente, usadas por `scripts/run_crawler.py`):
+
+* `CRAWL_ALLOW_DOMAINS` – domínios permitidos, separados por vírgula.
+* `CRAWL_DENY_DOMAINS` – domínios negados, separados por vírgula.
+* `CRAWL_MAX_DEPTH` – profundidade máxima a partir das sementes.
+* `CRAWL_DEPTH_PENALTY` – nota subtraída por nível de profundidade
+  (padrão 1.0).
+"""
+import os
+import re
+from typing import Iterable, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+# Termos de vagas de produto procurados na âncora e no caminho (peso de cada um)
+JOB_KEYWORDS: Tuple[Tuple[str, float], ...] = (
+    ("product manager", 6.0),
+    ("product owner", 6.0),
+    ("gerente de produto", 6.0),
+    ("analista de produto", 6.0),
+    ("product analyst", 5.0),
+    ("analista de negócios", 4.0),
+    ("business analyst", 4.0),
+    ("produto", 2.0),
+    ("product", 1.5),
+    ("vaga", 4.0),
+    ("vagas", 4.0),
+    ("job", 3.0),
+    ("jobs", 3.0),
+    ("carreira", 3.0),
+    ("carreiras", 3.0),
+    ("career", 3.0),
+    ("careers", 3.0),
+    ("trabalhe conosco", 4.0),
+    ("oportunidades", 3.0),
+    ("opening", 3.0),
+    ("openings", 3.0),
+    ("hiring", 3.0),
+    ("candidatar", 4.0),
+    ("candidate-se", 4.0),
+    ("apply", 3.0),
+    ("processo seletivo", 4.0),
+    ("recrutamento", 3.0),
+)
+
+# Domínios (e sufixos) de ATS e formulários onde as vagas são publicadas
+ATS_DOMAINS: Tuple[Tuple[str, float], ...] = (
+    ("docs.google.com/forms", 10.0),
+    ("forms.gle", 10.0),
+    ("tally.so", 8.0),
+    ("typeform.com", 8.0),
+    ("greenhouse.io", 10.0),
+    ("lever.co", 10.0),
+    ("workable.com", 10.0),
+    ("ashbyhq.com", 10.0),
+    ("gupy.io", 10.0),
+    ("solides.com.br", 8.0),
+    ("inhire.app", 8.0),
+    ("recruitee.com", 8.0),
+    ("breezy.hr", 8.0),
+    ("smartrecruiters.com", 8.0),
+)
+
+# Trechos de caminho que raramente levam a vagas
+LOW_VALUE_PATHS: Tuple[Tuple[str, float], ...] = (
+    ("/blog", 3.0),
+    ("/docs", 3.0),
+    ("/documentation", 3.0),
+    ("/news", 2.0),
+    ("/noticias", 2.0),
+    ("/tag/", 3.0),
+    ("/tags/", 3.0),
+    ("/category/", 3.0),
+    ("/categoria/", 3.0),
+    ("/author/", 3.0),
+    ("/autor/", 3.0),
+    ("/login", 5.0),
+    ("/signin", 5.0),
+    ("/signup", 4.0),
+    ("/cadastro", 4.0),
+    ("/cart", 5.0),
+    ("/checkout", 5.0),
+    ("/privacy", 4.0),
+    ("/privacidade", 4.0),
+    ("/terms", 4.0),
+    ("/termos", 4.0),
+    ("/wp-admin", 5.0),
+    ("/feed", 4.0),
+    ("/page/", 2.0),
+)
+
+# Penalidade por nível de profundidade a partir das sementes
+DEPTH_PENALTY = 1.0
+
+_WORDS = re.compile(r"\w+")
+
+
+def _normalize(text: str) -> str:
+    """Reduz o texto a palavras minúsculas entre espaços, para comparar termos inteiros."""
+    return " " + " ".join(_WORDS.findall(text.lower())) + " "
+
+
+_JOB_TERMS = tuple((_normalize(term), weight) for term, weight in JOB_KEYWORDS)
+
+
+def _domain_list(value: Optional[str]) -> Tuple[str, ...]:
+    if not value:
+        return ()
+    return tuple(d.strip().lower().lstrip(".") for d in value.split(",") if d.strip())
+
+
+def _matches_domain(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class LinkScorer:
+    """Calcula a prioridade de um link e aplica as regras de escopo.
+
+    Args:
+        allow_domains: Se informado, só esses domínios (e subdomínios),
+            além dos de ATS/formulários, são seguidos.
+        deny_domains: Domínios (e subdomínios) nunca seguidos.
+        max_depth: Profundidade máxima a partir das sementes; None não limita.
+        depth_penalty: Nota subtraída por nível de profundidade.
+    """
+
+    def __init__(self, allow_domains: Iterable[str] = (), deny_domains: Iterable[str] = (),
+                 max_depth: Optional[int] = None, depth_penalty: float = DEPTH_PENALTY):
+        self.allow_domains = tuple(d.lower().lstrip(".") for d in allow_domains)
+        self.deny_domains = tuple(d.lower().lstrip(".") for d in deny_domains)
+        self.max_depth = max_depth
+        self.depth_penalty = depth_penalty
+
+    @classmethod
+    def from_env(cls) -> "LinkScorer":
+        """Cria o avaliador com as regras de escopo e a penalidade das variáveis de ambiente."""
+        max_depth = os.getenv("CRAWL_MAX_DEPTH")
+        return cls(
+            allow_domains=_domain_list(os.getenv("CRAWL_ALLOW_DOMAINS")),
+            deny_domains=_domain_list(os.getenv("CRAWL_DENY_DOMAINS")),
+            max_depth=int(max_depth) if max_depth else None,
+            depth_penalty=float(os.getenv("CRAWL_DEPTH_PENALTY", str(DEPTH_PENALTY))),
+        )
+
+    def ats_score(self, host: str, path: str) -> float:
+        location = host + path
+        for domain, weight in ATS_DOMAINS:
+            if "/" in domain:
+                if location.startswith(domain):
+                    return weight
+            elif _matches_domain(host, (domain,)):
+                return weight
+        return 0.0
+
+    def in_scope(self, host: str, path: str = "/") -> bool:
+        """Aplica as regras de domínios negados e permitidos."""
+        if _matches_domain(host, self.deny_domains):
+            return False
+        if self.allow_domains and not _matches_domain(host, self.allow_domains):
+            return self.ats_score(host, path) > 0
+        return True
+
+    def score(self, url: str, anchor: str = "", depth: int = 0) -> Optional[float]:
+        """Nota do link; quanto maior, mais cedo ele é baixado.
+
+        Args:
+            url: URL canônica do link.
+            anchor: Texto da âncora (ou `title`/`aria-label`).
+            depth: Profundidade do link a partir das sementes.
+        Returns:
+            A nota, ou None se o link estiver fora do escopo.
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        path = unquote(parts.path).lower()
+        if not self.in_scope(host, path):
+            return None
+        if self.max_depth is not None and depth > self.max_depth:
+            return None
+        score = self.ats_score(host, path)
+        # Termos comparados como palavras inteiras ("job" não casa com "jobson")
+        text = _normalize(anchor)
+        path_text = _normalize(path + " " + parts.query)
+        for term, weight in _JOB_TERMS:
+            if term in text:
+                score += weight
+            if term in path_text:
+                score += weight
+        for fragment, penalty in LOW_VALUE_PATHS:
+            if fragment in path:
+                score -= penalty
+        return score - self.depth_penalty * depth
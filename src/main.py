@@ -2,69 +2,331 @@
 Script principal para orquestrar o scraping e envio para Supabase.
 
 Uso:
-  python -m pmradar_mvp.src.main <arquivo-de-urls>
+  python -m pmradar_mvp.src.main <arquivo|glob|-> [...] [--concurrency N]
+      [--per-host M] [--unordered] [--shard I/N]
+      [--metrics ARQUIVO] [--metrics-prom ARQUIVO]
 
-O arquivo de URLs deve conter uma URL por linha, podendo incluir
-comentários iniciados por `#`. As vagas são coletadas e inseridas
-no Supabase na tabela configurada no `.env`.
+Os arquivos de URLs devem conter uma URL por linha, podendo incluir
+comentários iniciados por `#`.  Aceitam-se vários arquivos, padrões glob
+(`data/urls/*.txt`) e `-` para ler da entrada padrão.  As URLs são lidas
+sob demanda, normalizadas e deduplicadas à medida que chegam (com um
+conjunto de impressões digitais que cresce até um teto fixo), então a
+memória acompanha o número de URLs distintas, sem passar desse teto.  As vagas são coletadas e inseridas no
+Supabase na tabela configurada no `.env`.
+
+Links de quadros de ATS (Greenhouse, Lever, Workable, Ashby) são
+reduzidos à URL do quadro e coletados pela API JSON do ATS: uma única
+consulta traz todas as vagas abertas da empresa.
+
+Antes do envio, vagas quase duplicadas vindas de fontes diferentes (o
+mesmo anúncio num formulário e na página de carreiras, por exemplo) são
+agrupadas por `dedupe.DuplicateIndex`: só a canônica (a menor URL do
+grupo) é enviada, e as demais URLs entram na coluna `alternate_urls` dela.
+Se uma vaga já enviada deixa de ser a canônica, a linha dela é removida.  Vagas cujo conteúdo
+não mudou desde o último envio não são reenviadas (`delta_sync`); no
+máximo recebem um PATCH em lote na coluna `last_seen_at`.
+
+Com `--shard I/N` (I de 0 a N-1), só as URLs cujo host cai na partição I
+são processadas.  A partição é um hash determinístico do host, então N
+processos (ou jobs de uma matrix do GitHub Actions) dividem a lista sem
+sobreposição e cada host fica inteiro num único processo, que continua
+respeitando o limite por host.  Duplicatas entre fontes ficam em hosts (e
+partições) diferentes, e cada processo teria o seu índice de
+deduplicação; por isso `--shard` exige `DEDUPE=0`.
+
+Com `--concurrency N`, até N páginas são baixadas em paralelo (no máximo
+`--per-host` por domínio).  Os resultados seguem a ordem do arquivo, a não
+ser que `--unordered` seja usado.  Na ordem do arquivo uma página lenta
+segura a janela de leitura e as demais esperam por ela; para listas com
+hosts misturados (como a do CI) use `--unordered`.
+
+Ao final, as métricas de tempo por etapa (download, parse, extração e
+envio ao Supabase) são gravadas em JSON (`--metrics`, padrão
+`artifacts/scraper_metrics.json`) e, opcionalmente, no formato do
+Prometheus (`--metrics-prom`).
 """
 
+import argparse
+import glob
+import hashlib
+import logging
+import os
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
 from tqdm import tqdm
 
-from .scraper import scrape_url
-from .supabase_client import upsert_job
+from . import transport
+from .dedupe import DEDUPE_ENABLED, DuplicateIndex
+from .delta_sync import DeltaSync
+from .fetch_pool import host_of, run_concurrently
+from .http_cache import NotModified
+from .metrics import get_metrics
+from .scraper import board_url, scrape_jobs
+from .supabase_client import BatchUpserter, delete_rows
+from .utils import canonicalize_url
+from .visited import VISITED_EXACT, make_visited_store
+
+# Teto do conjunto usado para deduplicar as URLs de entrada (a memória cresce até ele)
+URLS_DEDUPE_CAPACITY = int(os.getenv("URLS_DEDUPE_CAPACITY", "1000000"))
+URLS_DEDUPE_MODE = os.getenv("URLS_DEDUPE_MODE", VISITED_EXACT)
 
+SHARD_WITH_DEDUPE = ("--shard exige DEDUPE=0: as duplicatas entre fontes ficam em partições diferentes "
+                     "e não seriam agrupadas")
 
-def read_urls(file_path: str) -> List[str]:
-    """Lê um arquivo de texto retornando as URLs (não vazias, ignorando comentários)."""
+
+def read_urls(file_path: str) -> Iterator[str]:
+    """Lê um arquivo de texto (ou `-` para a entrada padrão) linha a linha,
+    gerando as URLs não vazias e ignorando comentários."""
+    if file_path == "-":
+        yield from _read_lines(sys.stdin)
+        return
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"Arquivo não encontrado: {file_path}")
-    urls: List[str] = []
     with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
+        yield from _read_lines(f)
+
+
+def _read_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        yield line
+
+
+def expand_sources(sources: Iterable[str]) -> Iterator[str]:
+    """Expande padrões glob, mantendo a ordem dos argumentos."""
+    for source in sources:
+        if source != "-" and glob.has_magic(source):
+            matches = sorted(glob.glob(source, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"Nenhum arquivo corresponde a: {source}")
+            yield from matches
+        else:
+            yield source
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Interpreta `I/N` (I de 0 a N-1)."""
+    try:
+        index, count = (int(part) for part in value.split("/", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard inválido (use I/N): {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard fora do intervalo (0 <= I < N): {value}")
+    return index, count
+
+
+def shard_of(url: str, count: int) -> int:
+    """Partição do host da URL; estável entre processos e execuções."""
+    digest = hashlib.blake2b(host_of(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def iter_urls(sources: Iterable[str], shard: Optional[Tuple[int, int]] = None,
+              capacity: int = URLS_DEDUPE_CAPACITY) -> Iterator[str]:
+    """Gera as URLs canônicas das fontes, sem repetições e filtradas pelo shard.
+
+    Args:
+        sources: Arquivos, padrões glob ou `-` (entrada padrão).
+        shard: Tupla ``(índice, total)``; None processa todas as URLs.
+        capacity: Número de URLs distintas acompanhadas na deduplicação; a
+            memória cresce com as URLs vistas até esse teto e, acima dele, as
+            URLs passam sem deduplicação.
+    """
+    seen = make_visited_store(URLS_DEDUPE_MODE, capacity)
+    full_warned = False
+    for source in expand_sources(sources):
+        for url in read_urls(source):
+            if "://" not in url:
+                url = "https://" + url
+            # Vagas de um mesmo quadro de ATS viram uma única consulta ao quadro
+            url = board_url(url) or canonicalize_url(url)
+            if shard is not None and shard_of(url, shard[1]) != shard[0]:
                 continue
-            urls.append(line)
-    return urls
+            if len(seen) < seen.capacity:
+                if not seen.add(url):
+                    continue
+            elif url in seen:
+                continue
+            elif not full_warned:
+                logging.warning("Limite de %d URLs distintas atingido; deduplicação parcial a partir daqui.",
+                                seen.capacity)
+                full_warned = True
+            yield url
 
 
-def main(file_path: str) -> None:
-    urls = read_urls(file_path)
-    if not urls:
-        print("Nenhuma URL para processar.")
+def print_metrics(metrics_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+    """Mostra o tempo gasto em cada etapa e exporta as métricas."""
+    metrics = get_metrics()
+    if not metrics.enabled:
         return
-    total, sucessos, falhas = 0, 0, 0
-    for url in tqdm(urls, desc="Processando links"):
-        total += 1
-        try:
+    for stage, summary in metrics.summary()["stages"].items():
+        print(f"⏱️ {stage}: {summary['count']}x, total {summary['sum']:.2f}s, "
+              f"p50 {summary['p50'] * 1000:.0f}ms, p99 {summary['p99'] * 1000:.0f}ms")
+    if metrics_path:
+        metrics.write_json(metrics_path)
+    if prom_path:
+        metrics.write_prometheus(prom_path)
+
+
+def main(sources: Union[str, List[str]], concurrency: int = 1, per_host: int = 2, ordered: bool = True,
+         shard: Optional[Tuple[int, int]] = None,
+         metrics_path: Optional[str] = None, prom_path: Optional[str] = None) -> None:
+    if isinstance(sources, str):
+        sources = [sources]
+    if shard is not None and DEDUPE_ENABLED:
+        raise ValueError(SHARD_WITH_DEDUPE)
+    urls = iter_urls(sources, shard=shard)
+    # Conexões reaproveitadas por host, com folga para todas as threads
+    transport.configure(concurrency)
+    if shard is not None:
+        print(f"🧩 Shard {shard[0]}/{shard[1]}")
+    total, coletadas, duplicadas, falhas = 0, 0, 0, 0
+    deduper = DuplicateIndex() if DEDUPE_ENABLED else None
+    delta = DeltaSync()
+    # Páginas 304 só são extraídas de novo se o último envio delas falhou
+    results = run_concurrently(
+        urls, partial(scrape_jobs, resend=delta.needs_resend),
+        concurrency=concurrency, per_host=per_host, ordered=ordered
+    )
+    # As vagas são acumuladas e enviadas em lotes ao Supabase
+    with BatchUpserter() as upserter:
+        for url, jobs, exc in tqdm(results, desc="Processando links"):
+            total += 1
             print(f"\n🔍 Conectando à fonte: {url}")
-            data = scrape_url(url)
+            if isinstance(exc, NotModified):
+                # Página igual à da última coleta e já enviada: só é marcada como vista
+                print("♻️ Página inalterada desde a última coleta.")
+                delta.mark_seen(url)
+                continue
+            if exc is not None:
+                print(f"❌ Erro ao processar {url}: {exc}")
+                falhas += 1
+                continue
 
-            if not data:
+            is_board = board_url(url) is not None
+            if is_board:
+                # Quadros de ATS trazem todas as vagas abertas numa só chamada
+                print(f"📋 {len(jobs)} vaga(s) aberta(s) no quadro.")
+            elif not jobs or not jobs[0]:
                 print("⚠️ Nenhum dado retornado.")
                 falhas += 1
                 continue
 
-            print(f"✅ Vaga encontrada: {data.get('title', 'sem título')}")
+            scraped_at = datetime.now(timezone.utc).isoformat()
+            for data in jobs:
+                canonical = deduper.check(data) if deduper is not None else None
+                if canonical is not None:
+                    # Mesma vaga de outra fonte: vira URL alternativa da canônica
+                    print(f"🔁 Vaga duplicada de {canonical}: {data.get('url')}")
+                    duplicadas += 1
+                    continue
+                if not delta.check(data):
+                    # Conteúdo igual ao último envio: a linha só é marcada como vista
+                    continue
+                if not is_board:
+                    print(f"✅ Vaga encontrada: {data.get('title', 'sem título')}")
+                data["scraped_at"] = scraped_at
+                try:
+                    upserter.add(data)
+                    coletadas += 1
+                except Exception as exc:
+                    print(f"❌ Erro ao enviar {data.get('url') or url}: {exc}")
+                    falhas += 1
+        if deduper is not None:
+            # Só a coluna alternate_urls das canônicas afetadas é atualizada
+            for row in deduper.alternate_updates():
+                upserter.add(row)
+    failed_urls = upserter.report.failed_urls
+    removed: List[str] = []
+    if deduper is not None:
+        # Vagas que deixaram de ser canônicas saem da tabela (as alternativas ficam na canônica)
+        demoted = deduper.demoted(failed_urls)
+        if demoted:
+            delete_report = delete_rows(demoted)
+            not_deleted = set(delete_report.failed_urls)
+            removed = [url for url in demoted if url not in not_deleted]
+            print(f"🧹 {len(removed)} vaga(s) duplicada(s) removida(s) da tabela")
+            for failure in delete_report.failures:
+                print(f"⚠️ Falha ao remover {len(failure.rows)} vaga(s) duplicada(s): {failure.error}")
+        deduper.save(failed_urls, removed)
+    delta.commit(failed_urls)
+    if removed:
+        delta.forget(removed)
+    touch_report = delta.touch_unchanged()
+    if touch_report is not None:
+        print(f"👆 {touch_report.sent} vaga(s) inalterada(s) marcada(s) como vistas "
+              f"em {touch_report.requests} requisição(ões)")
+        for failure in touch_report.failures:
+            print(f"⚠️ Falha ao marcar {len(failure.rows)} vaga(s) como vistas: {failure.error}")
+    if total == 0:
+        print("Nenhuma URL para processar.")
+        return
+    report = upserter.report
+    for failure in report.failures:
+        print(f"❌ Erro ao enviar {len(failure.rows)} vaga(s) ao Supabase: {failure.error}")
+        for row in failure.rows:
+            print(f"   - {row.get('url')}")
+    sucessos = coletadas - report.failed
+    falhas += report.failed
+    print(f"\n📦 Supabase: {report.sent} vaga(s) enviada(s) em {report.requests} requisição(ões)")
+    print(f"\n📊 Concluído. Total: {total}, Sucessos: {sucessos}, "
+          f"Inalteradas: {delta.unchanged}, Duplicadas: {duplicadas}, Falhas: {falhas}")
+    print_metrics(metrics_path, prom_path)
+
 
-            data["scraped_at"] = datetime.now(timezone.utc).isoformat()
-            upsert_job(data)
-            sucessos += 1
-        except Exception as exc:
-            print(f"❌ Erro ao processar {url}: {exc}")
-            falhas += 1
-    print(f"\n📊 Concluído. Total: {total}, Sucessos: {sucessos}, Falhas: {falhas}")
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Coleta vagas a partir de uma lista de URLs e envia ao Supabase."
+    )
+    parser.add_argument(
+        "sources", nargs="+",
+        help="arquivos com uma URL por linha, padrões glob ou - para a entrada padrão",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1,
+        help="número máximo de páginas baixadas em paralelo (padrão: 1)",
+    )
+    parser.add_argument(
+        "--per-host", type=int, default=2,
+        help="número máximo de requisições simultâneas por domínio (padrão: 2)",
+    )
+    parser.add_argument(
+        "--unordered", action="store_true",
+        help="entrega os resultados assim que ficam prontos, sem manter a ordem do arquivo",
+    )
+    parser.add_argument(
+        "--shard", type=parse_shard, default=os.getenv("SHARD"),
+        help="processa só a partição I de N (por host), no formato I/N",
+    )
+    parser.add_argument(
+        "--metrics", default=os.getenv("METRICS_PATH", "artifacts/scraper_metrics.json"),
+        help="arquivo JSON com as métricas por etapa (padrão: artifacts/scraper_metrics.json)",
+    )
+    parser.add_argument(
+        "--metrics-prom", default=os.getenv("METRICS_PROM_PATH"),
+        help="arquivo de métricas no formato texto do Prometheus (opcional)",
+    )
+    args = parser.parse_args(argv)
+    if args.shard is not None and DEDUPE_ENABLED:
+        parser.error(SHARD_WITH_DEDUPE)
+    return args
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Uso: python -m pmradar_mvp.src.main <arquivo-de-urls>")
-        sys.exit(1)
-    main(sys.argv[1])
+    args = parse_args()
+    main(
+        args.sources,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        ordered=not args.unordered,
+        shard=args.shard,
+        metrics_path=args.metrics,
+        prom_path=args.metrics_prom,
+    )
@@ -0,0 +1,258 @@
+"""
+Métricas de execução: contadores e histogramas de latência por etapa e host.
+
+As etapas instrumentadas são `fetch` (com `fetch_headers`, do envio até o
+fim dos cabeçalhos – conexão, DNS e primeiro byte –, e `fetch_body`, o
+download do corpo), `parse`, `extract`, `politeness_wait` (crawl-delay
+imposto a cada host), `robots` e `upsert`.  Cada observação entra num
+histograma de baldes fixos, global e por host, de modo que o custo é uma
+busca binária e uma soma sob um lock, sem guardar as amostras.
+
+Ao final da execução o resumo pode ser exportado em JSON (`write_json`) e
+no formato texto do Prometheus (`write_prometheus`, compatível com o
+textfile collector do node_exporter).
+
+Configuração (variáveis de ambiente):
+
+* `METRICS` – `0` desativa a coleta (padrão: ativada).
+* `METRICS_MAX_HOSTS` – hosts distintos acompanhados; os demais são
+  agregados em `_other` (padrão: 1000).
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS", "1").lower() not in ("0", "false", "no")
+METRICS_MAX_HOSTS = int(os.getenv("METRICS_MAX_HOSTS", "1000"))
+
+# Limites superiores dos baldes, em segundos (o último balde é +Inf)
+BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+OTHER_HOST = "_other"
+
+
+class Histogram:
+    """Histograma de latências com baldes fixos."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estima o quantil `q` (0–1) interpolando dentro do balde."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = BUCKETS[index] if index < len(BUCKETS) else self.max
+            if count and seen + count >= rank:
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                return min(estimate, self.max)
+            seen += count
+            lower = upper
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.50), 6),
+            "p90": round(self.quantile(0.90), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """Registro de contadores e histogramas, seguro entre threads.
+
+    Args:
+        enabled: Se falso, todas as chamadas são ignoradas.
+        max_hosts: Número máximo de hosts com métricas próprias.
+    """
+
+    def __init__(self, enabled: bool = True, max_hosts: int = METRICS_MAX_HOSTS):
+        self.enabled = enabled
+        self.max_hosts = max_hosts
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._by_host: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, Optional[str]], float] = {}
+        self._hosts: set = set()
+
+    def _host_key(self, host: str) -> str:
+        # Limita a cardinalidade: hosts além do limite são agregados
+        if host in self._hosts:
+            return host
+        if len(self._hosts) < self.max_hosts:
+            self._hosts.add(host)
+            return host
+        return OTHER_HOST
+
+    def observe(self, stage: str, seconds: float, host: Optional[str] = None) -> None:
+        """Registra a duração de uma etapa (global e, se informado, do host)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = Histogram()
+            hist.observe(seconds)
+            if host:
+                key = (stage, self._host_key(host))
+                hist = self._by_host.get(key)
+                if hist is None:
+                    hist = self._by_host[key] = Histogram()
+                hist.observe(seconds)
+
+    def incr(self, name: str, value: float = 1, host: Optional[str] = None) -> None:
+        """Incrementa um contador (global e, se informado, do host)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, None)] = self._counters.get((name, None), 0) + value
+            if host:
+                key = (name, self._host_key(host))
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def timer(self, stage: str, host: Optional[str] = None) -> "_Timer":
+        """Context manager que registra a duração do bloco em `stage`."""
+        return _Timer(self, stage, host)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._by_host.clear()
+            self._counters.clear()
+            self._hosts.clear()
+            self.started = time.time()
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo com os quantis de cada etapa e os contadores, global e por host."""
+        with self._lock:
+            hosts: Dict[str, Dict[str, Any]] = {}
+            for (stage, host), hist in self._by_host.items():
+                hosts.setdefault(host, {"stages": {}, "counters": {}})["stages"][stage] = hist.summary()
+            counters = {}
+            for (name, host), value in self._counters.items():
+                if host is None:
+                    counters[name] = value
+                else:
+                    hosts.setdefault(host, {"stages": {}, "counters": {}})["counters"][name] = value
+            return {
+                "started_at": self.started,
+                "duration": round(time.time() - self.started, 3),
+                "stages": {stage: hist.summary() for stage, hist in sorted(self._stages.items())},
+                "counters": dict(sorted(counters.items())),
+                "hosts": dict(sorted(hosts.items())),
+            }
+
+    def write_json(self, path: str) -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps(self.summary(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    def prometheus_text(self, prefix: str = "pmradar") -> str:
+        """Exporta as métricas no formato texto do Prometheus."""
+        lines: List[str] = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+            by_host = sorted(self._by_host.items())
+            counters = sorted(self._counters.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        name = f"{prefix}_stage_seconds"
+        lines.append(f"# HELP {name} Duração de cada etapa do pipeline.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, hist in stages:
+            lines.extend(_histogram_lines(name, {"stage": stage}, hist))
+        if by_host:
+            name = f"{prefix}_host_stage_seconds"
+            lines.append(f"# HELP {name} Duração de cada etapa do pipeline por host.")
+            lines.append(f"# TYPE {name} histogram")
+            for (stage, host), hist in by_host:
+                lines.extend(_histogram_lines(name, {"stage": stage, "host": host}, hist))
+        declared = set()
+        for (counter, host), value in counters:
+            name = f"{prefix}_{counter}_total"
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            labels = _labels({"host": host}) if host else ""
+            lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "pmradar") -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Grava num arquivo temporário e renomeia, como espera o textfile collector
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_text(self.prometheus_text(prefix), encoding="utf-8")
+        tmp.replace(target)
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "host", "start")
+
+    def __init__(self, metrics: Metrics, stage: str, host: Optional[str]):
+        self.metrics = metrics
+        self.stage = stage
+        self.host = host
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, self.host)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _histogram_lines(name: str, labels: Dict[str, str], hist: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS + (float("inf"),), hist.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {repr(hist.sum)}")
+    lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+    return lines
+
+
+_metrics = Metrics(enabled=METRICS_ENABLED)
+
+
+def get_metrics() -> Metrics:
+    """Retorna o registro de métricas do processo."""
+    return _metrics
@@ -0,0 +1,236 @@
+"""
+Parse das páginas baixadas pelo crawler.
+
+`parse_page` recebe o HTML e devolve apenas dados simples (links e dados
+estruturados), de modo que pode rodar num `ProcessPoolExecutor`: o parse,
+que é CPU e segura o GIL, sai das threads de I/O do crawler.
+
+A extração é feita numa única passada orientada a eventos
+(`html.parser.HTMLParser`), sem construir a árvore do documento: links
+(com o texto das âncoras), blocos JSON-LD e microdados são coletados ao
+mesmo tempo, em tempo linear no tamanho da página.
+
+Os microdados saem no mesmo formato do extrator anterior (baseado em
+`find_all`): um dicionário por item de primeiro nível (`itemscope` sem
+outro `itemscope` acima), com todas as propriedades descendentes, inclusive
+as de itens aninhados, achatadas nele.  Propriedades que são elas mesmas
+itens (`itemprop` com `itemscope`) e propriedades fora de qualquer item são
+ignoradas, e `itemref` não é seguido.
+"""
+import json
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from .utils import canonicalize_url, has_non_html_extension
+
+# Elementos sem tag de fechamento
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+})
+# Elementos cujo texto não entra no valor de uma propriedade
+RAW_TEXT_TAGS = frozenset({"script", "style"})
+# Tamanho máximo guardado do texto de cada âncora
+ANCHOR_MAX_CHARS = 200
+
+
+class _Text:
+    """Valor de uma propriedade de microdados ainda sendo lido."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self):
+        self.parts: List[str] = []
+
+    def value(self) -> str:
+        # Equivale a get_text(strip=True) do BeautifulSoup
+        return "".join(self.parts)
+
+
+class _Item:
+    """Item de microdados de primeiro nível com suas propriedades em ordem."""
+
+    __slots__ = ("type", "props")
+
+    def __init__(self, itemtype: Optional[str]):
+        self.type = itemtype
+        self.props: List[Tuple[str, Union[str, "_Text"]]] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        if self.type is not None:
+            data["type"] = self.type
+        for key, raw in self.props:
+            value = raw.value() if isinstance(raw, _Text) else raw
+            if key in data:
+                if isinstance(data[key], list):
+                    data[key].append(value)
+                else:
+                    data[key] = [data[key], value]
+            else:
+                data[key] = value
+        return data
+
+
+class _PageScanner(HTMLParser):
+    """Percorre o HTML uma vez coletando links, JSON-LD e microdados."""
+
+    def __init__(self, base_url: str, structured: bool):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.structured = structured
+        self.links: List[str] = []
+        # Texto de cada link, na mesma ordem de `links`
+        self.anchors: List[str] = []
+        self._anchor: Optional[List[str]] = None
+        self.json_ld: List[Any] = []
+        self.items: List[_Item] = []
+        # Pilha de elementos abertos: (tag, item de primeiro nível aberto, texto aberto)
+        self._stack: List[Tuple[str, Optional[_Item], Optional[_Text]]] = []
+        # Item de primeiro nível que recebe as propriedades (todas as descendentes)
+        self._owner: Optional[_Item] = None
+        self._texts: List[_Text] = []
+        self._json_ld: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, dict(attrs), void=tag in VOID_TAGS)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, dict(attrs), void=True)
+
+    def _start(self, tag: str, attrs: Dict[str, Optional[str]], void: bool) -> None:
+        if tag == "a" and "href" in attrs:
+            self._close_anchor()
+            if self._add_link(attrs["href"] or ""):
+                label = attrs.get("aria-label") or attrs.get("title") or ""
+                self.anchors.append(label.strip())
+                if not void and not label:
+                    self._anchor = []
+        if not self.structured:
+            return
+        if tag == "script" and attrs.get("type") == "application/ld+json" and not void:
+            self._json_ld = []
+
+        item = None
+        text = None
+        prop = attrs.get("itemprop")
+        if "itemscope" in attrs:
+            # Itens aninhados não viram entradas próprias: suas propriedades
+            # vão para o item de primeiro nível
+            if self._owner is None:
+                item = self._owner = _Item(attrs.get("itemtype"))
+                self.items.append(item)
+        elif prop is not None and self._owner is not None:
+            if tag == "meta" or "content" in attrs:
+                self._owner.props.append((prop, attrs.get("content") or ""))
+            else:
+                text = _Text()
+                self._owner.props.append((prop, text))
+
+        if void:
+            return
+        self._stack.append((tag, item, text))
+        if text is not None:
+            self._texts.append(text)
+
+    def _add_link(self, href: str) -> bool:
+        new_url = urljoin(self.base_url, href)
+        if new_url.startswith("javascript:") or new_url.startswith("mailto:"):
+            return False
+        if not new_url.startswith("http"):
+            return False
+        # PDFs, imagens, arquivos compactados etc. nunca chegam a ser baixados
+        if has_non_html_extension(new_url):
+            return False
+        self.links.append(canonicalize_url(new_url))
+        return True
+
+    def _close_anchor(self) -> None:
+        if self._anchor is None:
+            return
+        self.anchors[-1] = " ".join(" ".join(self._anchor).split())[:ANCHOR_MAX_CHARS]
+        self._anchor = None
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._close_anchor()
+        if not self.structured or tag in VOID_TAGS:
+            return
+        # Fecha também os elementos deixados abertos dentro deste
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                while len(self._stack) > index:
+                    self._pop()
+                return
+
+    def _pop(self) -> None:
+        tag, item, text = self._stack.pop()
+        if item is not None:
+            self._owner = None
+        if text is not None:
+            self._texts.pop()
+        if tag == "script" and self._json_ld is not None:
+            self._close_json_ld()
+
+    def handle_data(self, data):
+        if self._anchor is not None and not (self._stack and self._stack[-1][0] in RAW_TEXT_TAGS):
+            self._anchor.append(data)
+        if not self.structured:
+            return
+        if self._json_ld is not None:
+            self._json_ld.append(data)
+            return
+        if self._texts and not (self._stack and self._stack[-1][0] in RAW_TEXT_TAGS):
+            stripped = data.strip()
+            if stripped:
+                for text in self._texts:
+                    text.parts.append(stripped)
+
+    def _close_json_ld(self) -> None:
+        chunks, self._json_ld = self._json_ld, None
+        if not chunks:
+            return
+        content = "".join(chunks)
+        try:
+            self.json_ld.append(json.loads(content))
+        except Exception:
+            self.json_ld.append(content.strip())
+
+    def close(self):
+        super().close()
+        self._close_anchor()
+        while self._stack:
+            self._pop()
+
+    def microdata(self) -> List[Dict[str, Any]]:
+        """Monta os itens de primeiro nível."""
+        return [item.to_dict() for item in self.items]
+
+
+def parse_page(url: str, html: str, structured: bool = True) -> Dict[str, Any]:
+    """Faz o parse da página e extrai links e, opcionalmente, dados estruturados.
+
+    Args:
+        url: URL da página (base para resolver os links relativos).
+        html: Conteúdo HTML.
+        structured: Se falso, extrai só os links (páginas inalteradas).
+    Returns:
+        Dicionário com `links`, `anchors` (texto de cada link, na mesma
+        ordem), `json_ld` e `microdata`.
+    """
+    scanner = _PageScanner(url, structured)
+    scanner.feed(html)
+    scanner.close()
+    return {
+        "links": scanner.links,
+        "anchors": scanner.anchors,
+        "json_ld": scanner.json_ld,
+        "microdata": scanner.microdata() if structured else [],
+    }
+
+
+def extract_structured_data(html: str) -> Dict[str, List[Any]]:
+    """Extrai blocos JSON-LD e itens de microdados de primeiro nível."""
+    page = parse_page("", str(html))
+    return {"json_ld": page["json_ld"], "microdata": page["microdata"]}
@@ -0,0 +1,267 @@
+"""
+Pipeline crawl → scraping → upsert num único processo.
+
+O crawler descobre as páginas e, pelo gancho `on_page`, entrega ao
+pipeline as que parecem vagas: quadros de ATS, formulários com extrator
+registrado (Google Forms, Tally, Typeform) ou URLs cuja nota no
+`LinkScorer` passa de `PIPELINE_MIN_SCORE`.  Daí em diante três etapas
+rodam em paralelo, ligadas por filas limitadas:
+
+1. o crawler põe `(url, html)` na fila de páginas;
+2. threads de extração aplicam os extratores de `scraper.py` ao HTML já
+   baixado (ou a API do ATS, no caso dos quadros) e põem as vagas na fila
+   de vagas;
+3. uma thread de envio aplica a deduplicação e a sincronização
+   incremental e acumula as vagas no `BatchUpserter`.
+
+Quando o Supabase ou a extração ficam para trás, as filas enchem e quem
+produz espera: o envio lento segura a extração, que segura o crawler.  O
+tempo de espera em cada fila é registrado nas métricas
+(`pipeline_pages_wait` e `pipeline_jobs_wait`).
+
+Configuração (variáveis de ambiente, usadas por `scripts/run_crawler.py`):
+
+* `PIPELINE_WORKERS` – threads de extração (padrão: 4).
+* `PIPELINE_QUEUE_SIZE` – capacidade de cada fila (padrão: 100).
+* `PIPELINE_MIN_SCORE` – nota mínima de uma URL comum para ser tratada
+  como vaga (padrão: 6, ou seja, termos como "product manager" ou "vaga"
+  mais "jobs" no caminho).
+"""
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .link_scoring import LinkScorer
+from .metrics import get_metrics
+from .scraper import board_url, find_board, find_extractor, scrape_board, scrape_default, scrape_html, scrape_url
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+PIPELINE_MIN_SCORE = float(os.getenv("PIPELINE_MIN_SCORE", "6"))
+
+# Marca o fim de uma fila
+_DONE = None
+
+
+def is_job_url(url: str, scorer: Optional[LinkScorer] = None, min_score: float = PIPELINE_MIN_SCORE) -> bool:
+    """Diz se a URL deve passar pelos extratores de vagas.
+
+    Quadros de ATS e hosts com extrator registrado sempre passam; as
+    demais URLs precisam de nota (só pela URL, sem âncora) de ao menos
+    `min_score`.
+    """
+    if find_board(url) is not None or find_extractor(url) is not scrape_default:
+        return True
+    score = (scorer or LinkScorer()).score(url)
+    return score is not None and score >= min_score
+
+
+class JobPipeline:
+    """Extrai e envia as vagas das páginas do crawler, com filas limitadas entre as etapas.
+
+    Uso: `start()`, `on_page` como gancho do `WebCrawler` (ou `submit`
+    diretamente) e, depois do crawl, `close()`.  `flush()` espera as
+    páginas já recebidas chegarem ao Supabase (antes de um checkpoint).
+
+    Args:
+        upserter: `BatchUpserter` que recebe as vagas.
+        deduper: `DuplicateIndex` opcional (duplicatas viram URLs alternativas).
+        delta: `DeltaSync` opcional (vagas inalteradas não são reenviadas).
+        scorer: `LinkScorer` usado em `is_job_url`.
+        workers: Threads de extração.
+        queue_size: Capacidade das filas de páginas e de vagas.
+        min_score: Nota mínima de uma URL comum para ser tratada como vaga.
+    """
+
+    def __init__(self, upserter, deduper=None, delta=None, scorer: Optional[LinkScorer] = None,
+                 workers: int = PIPELINE_WORKERS, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 min_score: float = PIPELINE_MIN_SCORE):
+        self.upserter = upserter
+        self.deduper = deduper
+        self.delta = delta
+        self.scorer = scorer or LinkScorer()
+        self.workers = max(1, workers)
+        self.min_score = min_score
+        # (sequência, url, html ou None) -> extração
+        self.pages: "queue.Queue[Optional[Tuple[int, str, Optional[str]]]]" = queue.Queue(maxsize=max(1, queue_size))
+        # (sequência, url de origem, vagas) -> envio
+        self.jobs: "queue.Queue[Optional[Tuple[int, str, List[Dict[str, Any]]]]]" = queue.Queue(
+            maxsize=max(1, queue_size))
+        self.stats: Counter = Counter()
+        self.metrics = get_metrics()
+        # URLs (ou quadros) já entregues; cada quadro é consultado uma vez
+        self._seen = set()
+        self._lock = threading.Lock()
+        # Sequência das páginas recebidas e ainda não entregues ao upserter
+        self._sequence = itertools.count(1)
+        self._in_flight = set()
+        self._drained = threading.Condition(self._lock)
+        self._scrapers: List[threading.Thread] = []
+        self._sender: Optional[threading.Thread] = None
+
+    def start(self) -> "JobPipeline":
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._scrape_loop, daemon=True)
+            t.start()
+            self._scrapers.append(t)
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+        return self
+
+    def _count(self, key: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def _put(self, q: queue.Queue, item: Any, stage: str) -> None:
+        # Com a fila cheia o produtor espera: é isso que propaga a contrapressão
+        started = time.perf_counter()
+        q.put(item)
+        self.metrics.observe(stage, time.perf_counter() - started)
+
+    def on_page(self, url: str, page: Dict[str, Any], changed: bool) -> None:
+        """Gancho para `WebCrawler(on_page=...)`.
+
+        Páginas inalteradas (304) não são extraídas: a sincronização
+        incremental só as marca como vistas.  O crawler entrega como
+        alteradas as que precisam ser reenviadas (`resend`).  Quadros de ATS
+        são sempre consultados, porque as vagas vêm da API e não do HTML.
+        """
+        if not changed and board_url(url) is None:
+            if self.delta is not None:
+                self.delta.mark_seen(url)
+            return
+        self.submit(url, page.get("html"))
+
+    def submit(self, url: str, html: Optional[str] = None) -> bool:
+        """Põe a URL na fila de extração, se ela parecer uma vaga.
+
+        Args:
+            url: URL da página.
+            html: HTML já baixado; sem ele a página é baixada de novo.
+        Returns:
+            True se a URL foi enfileirada.
+        """
+        board = board_url(url)
+        if board is not None:
+            # Todas as vagas do quadro vêm da API; o HTML não é usado
+            url, html = board, None
+        elif not is_job_url(url, self.scorer, self.min_score):
+            return False
+        with self._lock:
+            if url in self._seen:
+                return False
+            self._seen.add(url)
+            self.stats["submitted"] += 1
+            seq = next(self._sequence)
+            self._in_flight.add(seq)
+        self._put(self.pages, (seq, url, html), "pipeline_pages_wait")
+        return True
+
+    def _finish(self, seq: int) -> None:
+        with self._drained:
+            self._in_flight.discard(seq)
+            self._drained.notify_all()
+
+    def flush(self) -> None:
+        """Espera as páginas já recebidas passarem pela extração e envia o lote pendente.
+
+        Páginas recebidas durante a espera não são aguardadas.
+        """
+        with self._drained:
+            last = next(self._sequence)
+            self._drained.wait_for(lambda: not any(seq < last for seq in self._in_flight))
+        self.upserter.flush()
+
+    def _scrape_loop(self) -> None:
+        while True:
+            item = self.pages.get()
+            if item is _DONE:
+                return
+            seq, url, html = item
+            try:
+                if find_board(url) is not None:
+                    jobs = scrape_board(url)
+                elif html is None:
+                    jobs = [scrape_url(url)]
+                else:
+                    jobs = [scrape_html(url, html)]
+            except Exception as e:
+                logging.warning("Erro ao extrair vagas de %s: %s", url, e)
+                self._count("failed")
+                jobs = []
+            jobs = [job for job in jobs if job]
+            if jobs:
+                self._put(self.jobs, (seq, url, jobs), "pipeline_jobs_wait")
+            else:
+                self._finish(seq)
+
+    def _send_loop(self) -> None:
+        while True:
+            item = self.jobs.get()
+            if item is _DONE:
+                return
+            seq, url, jobs = item
+            scraped_at = datetime.now(timezone.utc).isoformat()
+            for job in jobs:
+                try:
+                    self._send(job, scraped_at)
+                except Exception as e:
+                    logging.error("Erro ao enviar %s: %s", job.get("url") or url, e)
+                    self._count("failed")
+            self._finish(seq)
+
+    def _send(self, job: Dict[str, Any], scraped_at: str) -> None:
+        canonical = self.deduper.check(job) if self.deduper is not None else None
+        if canonical is not None:
+            logging.info("Vaga duplicada de %s: %s", canonical, job.get("url"))
+            self._count("duplicates")
+            return
+        if self.delta is not None and not self.delta.check(job):
+            self._count("unchanged")
+            return
+        logging.info("Vaga encontrada: %s (%s)", job.get("title", "sem título"), job.get("url"))
+        job["scraped_at"] = scraped_at
+        self.upserter.add(job)
+        self._count("collected")
+
+    def close(self):
+        """Espera as filas esvaziarem, envia o último lote e grava os estados.
+
+        Returns:
+            O `UpsertReport` do envio.
+        """
+        for _ in self._scrapers:
+            self.pages.put(_DONE)
+        for t in self._scrapers:
+            t.join()
+        self.jobs.put(_DONE)
+        if self._sender is not None:
+            self._sender.join()
+        if self.deduper is not None:
+            # Só a coluna alternate_urls das canônicas afetadas é atualizada
+            for row in self.deduper.alternate_updates():
+                self.upserter.add(row)
+        report = self.upserter.close()
+        removed: List[str] = []
+        if self.deduper is not None:
+            # Vagas que deixaram de ser canônicas saem da tabela
+            demoted = self.deduper.demoted(report.failed_urls)
+            if demoted:
+                from .supabase_client import delete_rows
+                not_deleted = set(delete_rows(demoted).failed_urls)
+                removed = [url for url in demoted if url not in not_deleted]
+                if not_deleted:
+                    logging.warning("Falha ao remover %d vaga(s) duplicada(s); nova tentativa na próxima execução.",
+                                    len(not_deleted))
+            self.deduper.save(report.failed_urls, removed)
+        if self.delta is not None:
+            self.delta.commit(report.failed_urls)
+            if removed:
+                self.delta.forget(removed)
+        return report
@@ -0,0 +1,131 @@
+"""
+Gravação incremental de resultados em JSON Lines (um registro por linha).
+
+Os registros são serializados assim que chegam e acumulados num buffer
+pequeno, descarregado no arquivo a cada `buffer_records` registros ou
+`buffer_bytes` bytes.  Assim a memória não cresce com o tamanho do crawl e
+um crash perde no máximo o conteúdo do buffer.  Opcionalmente os arquivos
+são comprimidos (gzip, ou zstd se o pacote `zstandard` estiver instalado)
+e rotacionados ao atingir `rotate_bytes`.
+"""
+import gzip
+import json
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_stream(path: Path, compression: Optional[str], append: bool) -> BinaryIO:
+    mode = "ab" if append else "wb"
+    if compression is None:
+        return open(path, mode)
+    if compression == "gzip":
+        # Em modo append o gzip ganha um novo membro, o que continua válido
+        return gzip.open(path, mode)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise RuntimeError("Compressão zstd requer o pacote 'zstandard'") from exc
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode), closefd=True)
+    raise ValueError(f"Compressão desconhecida: {compression}")
+
+
+class JsonlSink:
+    """Grava registros em arquivos `.jsonl` com flush limitado e rotação.
+
+    Args:
+        path: Caminho do primeiro arquivo, sem o sufixo de compressão
+            (por exemplo, `artifacts/crawler_results.jsonl`).
+        compression: None, "gzip" ou "zstd".
+        buffer_records: Número de registros acumulados antes de gravar.
+        buffer_bytes: Bytes acumulados antes de gravar.
+        rotate_bytes: Tamanho (não comprimido) a partir do qual um novo
+            arquivo é iniciado; None desativa a rotação.
+        append: Continua os arquivos existentes em vez de sobrescrevê-los.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None, buffer_records: int = 100,
+                 buffer_bytes: int = 256 * 1024, rotate_bytes: Optional[int] = None,
+                 append: bool = False):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Compressão desconhecida: {compression}")
+        self.base = Path(path)
+        self.compression = compression
+        self.buffer_records = buffer_records
+        self.buffer_bytes = buffer_bytes
+        self.rotate_bytes = rotate_bytes
+        self.append = append
+        self.records = 0
+        self.files: List[Path] = []
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._written = 0
+        self._index = 0
+        self._stream: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+
+    def _path_for(self, index: int) -> Path:
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        if index == 0:
+            return self.base.with_name(self.base.name + suffix)
+        return self.base.with_name(f"{self.base.stem}-{index:04d}{self.base.suffix}{suffix}")
+
+    def _open_next(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._index += 1
+        path = self._path_for(self._index)
+        if self.append:
+            # Ao retomar, continua no último arquivo existente
+            while self._path_for(self._index + 1).exists():
+                self._index += 1
+                path = self._path_for(self._index)
+            self._written = path.stat().st_size if path.exists() and self.compression is None else 0
+        self._stream = _open_stream(path, self.compression, self.append)
+        self.files.append(path)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Adiciona um registro; grava o buffer quando ele atinge o limite."""
+        line = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered += len(line)
+            self.records += 1
+            if len(self._buffer) >= self.buffer_records or self._buffered >= self.buffer_bytes:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        if self._stream is None:
+            self._open_next()
+        for line in self._buffer:
+            if self.rotate_bytes and self._written and self._written + len(line) > self.rotate_bytes:
+                self.append = False
+                self._open_next()
+                self._written = 0
+            self._stream.write(line)
+            self._written += len(line)
+        self._stream.flush()
+        self._buffer, self._buffered = [], 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
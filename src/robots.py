@@ -0,0 +1,128 @@
+"""
+Resolução de robots.txt com timeout e cache persistente entre execuções.
+
+Cada domínio tem seu robots.txt baixado uma única vez (com timeout
+próprio) e o resultado é guardado num arquivo JSON com TTL.  Hosts que não
+responderam também são guardados (cache negativo, com TTL menor), para
+não gastar um timeout inteiro a cada execução.
+
+Configuração (variáveis de ambiente):
+
+* `ROBOTS_CACHE_PATH` – arquivo do cache (padrão: `.cache/robots.json`).
+* `ROBOTS_TTL` – validade, em segundos, de um robots.txt obtido (padrão: 1 dia).
+* `ROBOTS_NEGATIVE_TTL` – validade do registro de host inacessível (padrão: 1 hora).
+* `ROBOTS_TIMEOUT` – timeout do download do robots.txt (padrão: 10s).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from . import transport
+
+ROBOTS_CACHE_PATH = os.getenv("ROBOTS_CACHE_PATH", ".cache/robots.json")
+ROBOTS_TTL = float(os.getenv("ROBOTS_TTL", str(24 * 3600)))
+ROBOTS_NEGATIVE_TTL = float(os.getenv("ROBOTS_NEGATIVE_TTL", "3600"))
+ROBOTS_TIMEOUT = float(os.getenv("ROBOTS_TIMEOUT", "10"))
+
+# Situações possíveis de um robots.txt
+ROBOTS_OK = "ok"                  # arquivo obtido e interpretado
+ROBOTS_ALLOW_ALL = "allow_all"    # 404 e outros 4xx: tudo liberado
+ROBOTS_DISALLOW_ALL = "disallow_all"  # 401/403: nada liberado
+ROBOTS_UNREACHABLE = "unreachable"    # erro de rede ou 5xx
+
+
+def build_parser(status: str, lines: Optional[List[str]] = None) -> RobotFileParser:
+    """Cria um `RobotFileParser` a partir do resultado da resolução."""
+    rp = RobotFileParser()
+    if status == ROBOTS_OK:
+        rp.parse(lines or [])
+    elif status == ROBOTS_ALLOW_ALL:
+        rp.allow_all = True
+    else:
+        # Sem robots.txt confiável nada é liberado, como o RobotFileParser faz
+        rp.disallow_all = True
+    rp.modified()
+    return rp
+
+
+def download_robots(domain: str, user_agent: Optional[str] = None,
+                    timeout: float = ROBOTS_TIMEOUT) -> Tuple[str, List[str]]:
+    """Baixa o robots.txt do domínio.
+
+    Args:
+        domain: Host (com a porta, se houver).
+        user_agent: User-Agent da requisição, se diferente do padrão do transporte.
+        timeout: Timeout do download em segundos.
+    Returns:
+        Tupla ``(situação, linhas)``.
+    """
+    url = f"http://{domain}/robots.txt"
+    try:
+        headers = {"User-Agent": user_agent} if user_agent else None
+        response = transport.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        logging.warning("Não foi possível obter robots.txt de %s: %s", domain, e)
+        return ROBOTS_UNREACHABLE, []
+    if response.status_code in (401, 403):
+        return ROBOTS_DISALLOW_ALL, []
+    if 400 <= response.status_code < 500:
+        return ROBOTS_ALLOW_ALL, []
+    if response.status_code != 200:
+        logging.warning("robots.txt de %s retornou status %s", domain, response.status_code)
+        return ROBOTS_UNREACHABLE, []
+    return ROBOTS_OK, response.text.splitlines()
+
+
+class RobotsCache:
+    """Cache de robots.txt por domínio, persistido num arquivo JSON."""
+
+    def __init__(self, path: Optional[str] = ROBOTS_CACHE_PATH, ttl: float = ROBOTS_TTL,
+                 negative_ttl: float = ROBOTS_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if path and Path(path).exists():
+            try:
+                self._entries = json.loads(Path(path).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logging.warning("Cache de robots.txt ignorado (%s): %s", path, e)
+
+    def get(self, domain: str) -> Optional[Tuple[str, List[str]]]:
+        """Retorna ``(situação, linhas)`` se houver entrada válida para o domínio."""
+        with self._lock:
+            entry = self._entries.get(domain)
+        if entry is None:
+            return None
+        ttl = self.negative_ttl if entry["status"] == ROBOTS_UNREACHABLE else self.ttl
+        if time.time() - entry["fetched_at"] > ttl:
+            return None
+        return entry["status"], entry.get("lines", [])
+
+    def put(self, domain: str, status: str, lines: List[str]) -> None:
+        with self._lock:
+            self._entries[domain] = {"status": status, "lines": lines, "fetched_at": time.time()}
+
+    def save(self) -> None:
+        """Grava o cache em disco, descartando entradas expiradas."""
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = {
+                domain: entry for domain, entry in self._entries.items()
+                if now - entry["fetched_at"] <= max(self.ttl, self.negative_ttl)
+            }
+        path = Path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
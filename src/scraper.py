@@ -3,37 +3,61 @@
 O foco deste MVP é capturar informações básicas de páginas de Google Forms,
 Tally, Typeform e páginas genéricas de vagas.  Ele identifica o tipo de
 fonte com base no domínio e extrai título, descrição/resumo e link.
+
+Os extratores ficam num registro indexado por host (`register_extractor`);
+a busca tenta o host e depois cada domínio pai, então `form.typeform.com`
+usa o extrator de `typeform.com`.  Quadros de vagas de ATS (Greenhouse,
+Lever, Workable, Ashby) são atendidos pelos adaptadores de `ats.py`, que
+trazem todas as vagas da empresa numa única chamada à API JSON
+(`scrape_jobs`).
 """
 
-import os
-from typing import Optional, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
-import requests
 from bs4 import BeautifulSoup
 
-from .utils import strip_html
-
+from .ats import ADAPTERS, BoardAdapter
+from .host_health import get_default_health
+from .http_cache import NotModified, cached_get, get_default_cache
+from .metrics import get_metrics
+from .utils import extract_text, parse_html
 
-# Carrega o User-Agent a partir do .env, ou usa um valor padrão
-USER_AGENT = os.getenv("USER_AGENT", "PMRadarBot/1.0")
 
-
-def fetch_html(url: str) -> str:
+def fetch_html(url: str, resend: Optional[Callable[[str], bool]] = None) -> str:
     """Baixa a página e retorna o HTML como texto.
 
+    Usa o cache HTTP persistente (quando ativo) para fazer uma requisição
+    condicional com os validadores da coleta anterior, e o `HostHealth`
+    compartilhado para repetir erros transitórios e evitar hosts fora do ar.
+    Uma página inalterada (304) é devolvida a partir do cache, a menos que
+    `resend` diga que a vaga não precisa ser reenviada.
+
     Args:
         url: URL do formulário ou página de vaga.
+        resend: Função opcional `resend(url)` (normalmente
+            `DeltaSync.needs_resend`); com ela, uma página inalterada só é
+            devolvida se o último envio da URL falhou.
     Returns:
         HTML da página.
     Raises:
+        NotModified se a página não mudou e `resend(url)` é falso.
+        UnsupportedContent se a resposta não for HTML ou passar do limite
+        de tamanho (o corpo não chega a ser baixado).
+        HostUnavailable se o host estiver com o disjuntor aberto.
         requests.HTTPError se a requisição não for bem sucedida.
     """
-    headers = {"User-Agent": USER_AGENT}
-    resp = requests.get(url, headers=headers, timeout=30)
-    resp.raise_for_status()
+    resp = cached_get(url, timeout=30, cache=get_default_cache(), health=get_default_health())
+    if not resp.from_cache:
+        resp.response.raise_for_status()
+    elif resend is not None and not resend(url):
+        raise NotModified(url)
     return resp.text
 
 
+# Tamanho máximo da descrição extraída do texto da página
+DESCRIPTION_MAX_CHARS = 1000
+
+
 def _extract_title(soup: BeautifulSoup, suffix_to_remove: Optional[str] = None) -> str:
     """Extrai o título da página, removendo sufixos opcionais."""
     if not soup.title:
@@ -44,12 +68,21 @@ def _extract_title(soup: BeautifulSoup, suffix_to_remove: Optional[str] = None)
     return title.strip()
 
 
-def scrape_gforms(html: str, url: str) -> Dict[str, Optional[str]]:
+def _extract_description(soup: BeautifulSoup) -> str:
+    """Extrai o texto da página, parando ao atingir o tamanho da descrição."""
+    return extract_text(soup, limit=DESCRIPTION_MAX_CHARS)
+
+
+def _extract_source(url: str) -> str:
+    """Usa o domínio da URL como fonte da vaga."""
+    return urlparse(url).netloc
+
+
+def scrape_gforms(soup: BeautifulSoup, url: str) -> Dict[str, Optional[str]]:
     """Extrai informações básicas de um Google Forms público."""
-    soup = BeautifulSoup(html, "lxml")
     title = _extract_title(soup, " - Google Forms") or "Formulário (Google Forms)"
     # Descrição é o texto da página inteira truncado
-    description = strip_html(html)[:1000]
+    description = _extract_description(soup)
     return {
         "title": title,
         "company": None,
@@ -59,11 +92,10 @@ def scrape_gforms(html: str, url: str) -> Dict[str, Optional[str]]:
     }
 
 
-def scrape_tally(html: str, url: str) -> Dict[str, Optional[str]]:
+def scrape_tally(soup: BeautifulSoup, url: str) -> Dict[str, Optional[str]]:
     """Extrai informações básicas de um formulário Tally."""
-    soup = BeautifulSoup(html, "lxml")
     title = _extract_title(soup) or "Formulário (Tally)"
-    description = strip_html(html)[:1000]
+    description = _extract_description(soup)
     return {
         "title": title,
         "company": None,
@@ -73,16 +105,15 @@ def scrape_tally(html: str, url: str) -> Dict[str, Optional[str]]:
     }
 
 
-def scrape_typeform(html: str, url: str) -> Dict[str, Optional[str]]:
+def scrape_typeform(soup: BeautifulSoup, url: str) -> Dict[str, Optional[str]]:
     """Extrai informações básicas de um formulário Typeform.
 
     Nota: Typeforms são carregados via JavaScript e podem não ter
     conteúdo legível no HTML inicial.  Este extrator retorna o texto
     bruto da página carregada, que pode ser limitado.
     """
-    soup = BeautifulSoup(html, "lxml")
     title = _extract_title(soup) or "Formulário (Typeform)"
-    description = strip_html(html)[:1000]
+    description = _extract_description(soup)
     return {
         "title": title,
         "company": None,
@@ -92,40 +123,156 @@ def scrape_typeform(html: str, url: str) -> Dict[str, Optional[str]]:
     }
 
 
-def scrape_default(html: str, url: str) -> Dict[str, Optional[str]]:
+def scrape_default(soup: BeautifulSoup, url: str) -> Dict[str, Optional[str]]:
     """Extrai informações básicas de uma página genérica."""
-    soup = BeautifulSoup(html, "lxml")
     title = _extract_title(soup) or "Vaga"
-    description = strip_html(html)[:1000]
-    parsed = urlparse(url)
-    source = parsed.netloc
+    description = _extract_description(soup)
     return {
         "title": title,
         "company": None,
         "description": description,
         "url": url,
-        "source": source,
+        "source": _extract_source(url),
     }
 
 
-def scrape_url(url: str) -> Dict[str, Optional[str]]:
+Extractor = Callable[[BeautifulSoup, str], Dict[str, Optional[str]]]
+
+# host -> [(prefixo do caminho, extrator)], na ordem de registro
+_EXTRACTORS: Dict[str, List[Tuple[str, Extractor]]] = {}
+# host da página pública do quadro -> adaptador da API do ATS
+_BOARDS: Dict[str, BoardAdapter] = {}
+
+
+def register_extractor(host: str, extractor: Extractor, path_prefix: str = "") -> None:
+    """Registra um extrator de HTML para o host (e seus subdomínios).
+
+    Args:
+        host: Domínio atendido, por exemplo ``"tally.so"``.
+        extractor: Função ``(soup, url) -> dict``.
+        path_prefix: Se informado, só URLs cujo caminho começa com ele.
+    """
+    _EXTRACTORS.setdefault(host.lower(), []).append((path_prefix, extractor))
+
+
+def register_board(adapter: BoardAdapter) -> None:
+    """Registra um adaptador de quadro de vagas para os hosts dele."""
+    for host in adapter.hosts:
+        _BOARDS[host] = adapter
+
+
+def _host_candidates(host: str) -> List[str]:
+    """O host e seus domínios pais: ``a.b.com`` -> ``a.b.com``, ``b.com``, ``com``."""
+    labels = host.lower().split(".")
+    return [".".join(labels[i:]) for i in range(len(labels))]
+
+
+def find_extractor(url: str) -> Extractor:
+    """Extrator registrado para a URL, ou `scrape_default`."""
+    parts = urlparse(url)
+    for host in _host_candidates(parts.hostname or ""):
+        for prefix, extractor in _EXTRACTORS.get(host, ()):
+            if parts.path.startswith(prefix):
+                return extractor
+    return scrape_default
+
+
+def find_board(url: str) -> Optional[Tuple[BoardAdapter, str]]:
+    """Adaptador e identificador do quadro de ATS da URL (None se não for um quadro)."""
+    adapter = _BOARDS.get((urlparse(url).hostname or "").lower())
+    if adapter is None:
+        return None
+    token = adapter.board_token(url)
+    return (adapter, token) if token else None
+
+
+def board_url(url: str) -> Optional[str]:
+    """URL canônica do quadro ao qual a URL pertence (None se não for de um ATS).
+
+    Links de vagas diferentes do mesmo quadro resultam na mesma URL, então
+    o quadro é consultado uma única vez.
+    """
+    board = find_board(url)
+    return board[0].board_url(board[1]) if board else None
+
+
+register_extractor("docs.google.com", scrape_gforms, "/forms")
+register_extractor("tally.so", scrape_tally)
+register_extractor("typeform.com", scrape_typeform)
+for _adapter in ADAPTERS:
+    register_board(_adapter)
+
+
+def scrape_url(url: str, resend: Optional[Callable[[str], bool]] = None) -> Dict[str, Optional[str]]:
     """Determina o tipo da URL e aplica o extrator adequado.
 
     Args:
         url: Link para o formulário ou página de vaga.
+        resend: Repassado a `fetch_html`.
+    Returns:
+        Dicionário com os campos extraídos.
+    Raises:
+        Qualquer exceção gerada por `fetch_html` (inclusive `NotModified`,
+        quando a página não mudou e não precisa ser reenviada) ou outras
+        funções será propagada para o chamador.
+    """
+    return scrape_html(url, fetch_html(url, resend))
+
+
+def scrape_html(url: str, html: str) -> Dict[str, Optional[str]]:
+    """Aplica o extrator adequado a um HTML já baixado (pelo crawler, por exemplo).
+
+    Args:
+        url: URL de onde o HTML veio.
+        html: Conteúdo da página.
     Returns:
         Dicionário com os campos extraídos.
+    """
+    metrics = get_metrics()
+    host = _extract_source(url)
+    # O HTML é parseado uma única vez e a árvore é compartilhada pelos extratores
+    with metrics.timer("parse", host):
+        soup = parse_html(html)
+    # Decide com base no domínio (fallback genérico se não houver extrator)
+    extractor = find_extractor(url)
+    with metrics.timer("extract", host):
+        return extractor(soup, url)
+
+
+def scrape_board(url: str) -> List[Dict[str, Any]]:
+    """Coleta todas as vagas abertas de um quadro de ATS pela API JSON.
+
+    Args:
+        url: URL do quadro ou de uma vaga dele.
+    Returns:
+        Lista de vagas (vazia se o quadro não tiver vagas abertas).
+    Raises:
+        ValueError se a URL não for de um quadro conhecido.
+    """
+    board = find_board(url)
+    if board is None:
+        raise ValueError(f"URL não é de um quadro de vagas conhecido: {url}")
+    adapter, token = board
+    metrics = get_metrics()
+    host = _extract_source(url)
+    with metrics.timer("board", host):
+        jobs = adapter.fetch(token)
+    metrics.incr("board_jobs", len(jobs), host=host)
+    for job in jobs:
+        job["description"] = job["description"][:DESCRIPTION_MAX_CHARS]
+        job["url"] = job["url"] or adapter.board_url(token)
+    return jobs
+
+
+def scrape_jobs(url: str, resend: Optional[Callable[[str], bool]] = None) -> List[Dict[str, Any]]:
+    """Coleta as vagas de uma URL: todas as do quadro, se for um ATS, ou a da página.
+
+    `resend` vale só para páginas (veja `fetch_html`): as vagas de um
+    quadro vêm da API e são sempre comparadas pela sincronização incremental.
+
     Raises:
-        Qualquer exceção gerada por `fetch_html` ou
-        outras funções será propagada para o chamador.
+        As mesmas exceções de `scrape_url` e `scrape_board`.
     """
-    html = fetch_html(url)
-    # Decide com base no domínio
-    if "docs.google.com/forms" in url:
-        return scrape_gforms(html, url)
-    if "tally.so" in url:
-        return scrape_tally(html, url)
-    if "typeform.com" in url:
-        return scrape_typeform(html, url)
-    # Fallback genérico
-    return scrape_default(html, url)
+    if find_board(url) is not None:
+        return scrape_board(url)
+    return [scrape_url(url, resend)]
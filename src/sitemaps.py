@@ -0,0 +1,507 @@
+"""
+Descoberta de URLs por sitemaps e feeds, sem percorrer o grafo de links.
+
+Muitos sites de carreiras publicam `sitemap.xml` (às vezes compactado com
+gzip, às vezes como índice de sitemaps com dezenas de milhares de
+entradas) e o anunciam nas linhas `Sitemap:` do robots.txt.  Este módulo
+lê esses arquivos em streaming, com `iterparse`, sem carregá-los inteiros
+na memória, e entende também feeds RSS e Atom.
+
+Um estado em SQLite guarda o `<lastmod>` de cada URL e dos sitemaps já
+lidos, para que cada execução entregue ao crawler apenas as URLs novas ou
+alteradas desde a anterior (e as descobertas antes mas ainda não
+baixadas).  Sitemaps de um índice cujo `<lastmod>` não mudou nem são
+baixados, e os demais são pedidos com `If-None-Match`/`If-Modified-Since`;
+quando um índice responde 304, a lista de sitemaps gravada na leitura
+anterior é usada e cada um deles continua sendo visitado.
+
+Configuração (variáveis de ambiente):
+
+* `SITEMAP_STATE_PATH` – arquivo do estado (padrão: `.cache/sitemaps.sqlite3`).
+* `SITEMAP_MAX_BYTES` – tamanho máximo, já descompactado, de cada sitemap
+  (padrão: 50 MiB, o limite do protocolo).
+* `SITEMAP_MAX_FILES` – número máximo de sitemaps lidos por host em cada
+  execução (padrão: 50).
+* `SITEMAP_TIMEOUT` – timeout de cada download (padrão: 30s).
+"""
+import gzip
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from xml.etree.ElementTree import ParseError, iterparse
+
+import requests
+
+from . import transport
+from .http_cache import discard_response
+from .metrics import get_metrics
+from .utils import canonicalize_url, has_non_html_extension
+
+SITEMAP_STATE_PATH = os.getenv("SITEMAP_STATE_PATH", ".cache/sitemaps.sqlite3")
+SITEMAP_MAX_BYTES = int(os.getenv("SITEMAP_MAX_BYTES", str(50 * 1024 * 1024)))
+SITEMAP_MAX_FILES = int(os.getenv("SITEMAP_MAX_FILES", "50"))
+SITEMAP_TIMEOUT = float(os.getenv("SITEMAP_TIMEOUT", "30"))
+
+# Tipos de entrada produzidos por `iter_sitemap`
+ENTRY_URL = "url"
+ENTRY_SITEMAP = "sitemap"
+
+# Consultas ao estado são feitas em lotes deste tamanho
+STATE_BATCH = 500
+_GZIP_MAGIC = b"\x1f\x8b"
+_PARTIAL_DATE = re.compile(r"^\d{4}(-\d{2})?$")
+
+
+def _local(tag: str) -> str:
+    """Nome do elemento sem o namespace (`{ns}url` -> `url`)."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_lastmod(text: Optional[str]) -> Optional[float]:
+    """Converte um `<lastmod>` (W3C Datetime) ou `<pubDate>` (RFC 822) em timestamp.
+
+    Datas sem fuso são tratadas como UTC.  Retorna None se o valor for
+    vazio ou inválido.
+    """
+    if not text:
+        return None
+    text = text.strip()
+    if _PARTIAL_DATE.match(text):
+        text = (text + "-01-01")[:10]
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _child_text(elem, name: str) -> Optional[str]:
+    for child in elem:
+        if _local(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+
+def _atom_link(entry) -> Optional[str]:
+    for child in entry:
+        if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate":
+            return child.get("href")
+    return None
+
+
+def iter_sitemap(stream) -> Iterator[Tuple[str, str, Optional[float]]]:
+    """Lê um sitemap, índice de sitemaps ou feed em streaming.
+
+    Cada elemento é descartado logo depois de lido, então a memória não
+    cresce com o tamanho do arquivo.
+
+    Args:
+        stream: Objeto com `read()` devolvendo o XML (já descompactado).
+    Yields:
+        Tuplas ``(tipo, url, lastmod)``: `ENTRY_URL` para páginas
+        (`<url>`, itens RSS e entradas Atom) e `ENTRY_SITEMAP` para os
+        sitemaps de um índice.
+    Raises:
+        ParseError: se o XML for inválido (as entradas anteriores ao erro
+            já terão sido produzidas).
+    """
+    # Pilha dos elementos abertos: o pai de cada entrada é esvaziado depois
+    # dela, pois ainda guardaria os elementos já lidos
+    open_elements = []
+    for event, elem in iterparse(stream, events=("start", "end")):
+        if event == "start":
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        name = _local(elem.tag)
+        if name in ("url", "sitemap"):
+            loc = _child_text(elem, "loc")
+            if loc:
+                kind = ENTRY_URL if name == "url" else ENTRY_SITEMAP
+                yield kind, loc, parse_lastmod(_child_text(elem, "lastmod"))
+        elif name == "item":
+            link = _child_text(elem, "link")
+            if link:
+                yield ENTRY_URL, link, parse_lastmod(_child_text(elem, "pubDate") or _child_text(elem, "date"))
+        elif name == "entry":
+            link = _atom_link(elem)
+            if link:
+                yield ENTRY_URL, link, parse_lastmod(_child_text(elem, "updated") or _child_text(elem, "published"))
+        else:
+            continue
+        (open_elements[-1] if open_elements else elem).clear()
+
+
+class _PrefixedReader:
+    """Leitor que devolve `head` (bytes já lidos) antes do restante do `stream`."""
+
+    def __init__(self, head: bytes, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self.head:
+            if size is None or size < 0:
+                data, self.head = self.head + self.stream.read(), b""
+            else:
+                data, self.head = self.head[:size], self.head[size:]
+            return data
+        return self.stream.read(size) or b""
+
+
+class _CappedReader:
+    """Leitor que para de devolver dados após `max_bytes` (protege contra bombas gzip)."""
+
+    def __init__(self, stream, max_bytes: int):
+        self.stream = stream
+        self.remaining = max_bytes
+        self.truncated = False
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            if self.stream.read(1):
+                self.truncated = True
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def open_sitemap(response: requests.Response, max_bytes: int = SITEMAP_MAX_BYTES) -> _CappedReader:
+    """Leitor do corpo de uma resposta em streaming, descompactando gzip.
+
+    O `Content-Encoding` é tratado pelo urllib3; arquivos `.xml.gz` servidos
+    como binário são reconhecidos pelos bytes iniciais.
+    """
+    response.raw.decode_content = True
+    head = response.raw.read(2) or b""
+    stream = _PrefixedReader(head, response.raw)
+    if head == _GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream)
+    return _CappedReader(stream, max_bytes)
+
+
+class SitemapState:
+    """`<lastmod>` das URLs e dos sitemaps vistos, persistido em SQLite.
+
+    Uma URL está *pendente* enquanto não for marcada como baixada com
+    `mark_crawled`; ela volta a ficar pendente quando seu `<lastmod>` muda.
+    Seguro para uso por várias threads.
+    """
+
+    def __init__(self, path: str = SITEMAP_STATE_PATH):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                lastmod REAL,
+                crawled_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS urls_pending ON urls (host) WHERE crawled_at IS NULL;
+            CREATE TABLE IF NOT EXISTS sitemaps (
+                url TEXT PRIMARY KEY,
+                lastmod REAL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sitemap_children (
+                sitemap TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod REAL,
+                PRIMARY KEY (sitemap, url)
+            );
+            """
+        )
+        self._db.commit()
+
+    def sitemap_info(self, url: str) -> Optional[Tuple[Optional[float], Optional[str], Optional[str]]]:
+        """Retorna ``(lastmod, etag, last_modified)`` da última leitura do sitemap."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT lastmod, etag, last_modified FROM sitemaps WHERE url = ?", (url,)
+            ).fetchone()
+
+    def sitemap_children(self, url: str) -> List[Tuple[str, Optional[float]]]:
+        """Sitemaps ``(url, lastmod)`` listados pelo índice na última leitura."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT url, lastmod FROM sitemap_children WHERE sitemap = ?", (url,)
+            ).fetchall()
+
+    def record_sitemap(self, url: str, lastmod: Optional[float], etag: Optional[str],
+                       last_modified: Optional[str],
+                       children: Iterable[Tuple[str, Optional[float]]] = ()) -> None:
+        """Registra um sitemap lido por completo e, se for um índice, seus sitemaps."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sitemaps VALUES (?, ?, ?, ?, ?)",
+                (url, lastmod, etag, last_modified, time.time()),
+            )
+            self._db.execute("DELETE FROM sitemap_children WHERE sitemap = ?", (url,))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sitemap_children VALUES (?, ?, ?)",
+                [(url, child, child_lastmod) for child, child_lastmod in children],
+            )
+            self._db.commit()
+
+    def filter_due(self, host: str,
+                   entries: List[Tuple[str, Optional[float]]]) -> List[Tuple[str, Optional[float]]]:
+        """Separa as entradas novas ou alteradas e as registra como pendentes.
+
+        Uma URL já conhecida só volta quando seu `lastmod` é mais recente
+        que o registrado (ou quando ainda não foi baixada).
+        """
+        if not entries:
+            return []
+        due = []
+        placeholders = ",".join("?" * len(entries))
+        with self._lock:
+            known = {
+                url: (lastmod, crawled_at)
+                for url, lastmod, crawled_at in self._db.execute(
+                    f"SELECT url, lastmod, crawled_at FROM urls WHERE url IN ({placeholders})",
+                    [url for url, _ in entries],
+                )
+            }
+            for url, lastmod in entries:
+                previous = known.get(url)
+                if previous is not None:
+                    old_lastmod, crawled_at = previous
+                    changed = lastmod is not None and (old_lastmod is None or lastmod > old_lastmod)
+                    if crawled_at is not None and not changed:
+                        continue
+                due.append((url, lastmod))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, NULL)",
+                [(url, host, lastmod) for url, lastmod in due],
+            )
+            self._db.commit()
+        return due
+
+    def pending(self, host: str) -> Iterator[Tuple[str, Optional[float]]]:
+        """URLs do host descobertas em execuções anteriores e ainda não baixadas."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, lastmod FROM urls WHERE host = ? AND crawled_at IS NULL", (host,)
+            ).fetchall()
+        return iter(rows)
+
+    def mark_crawled(self, urls: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.executemany("UPDATE urls SET crawled_at = ? WHERE url = ?", [(now, url) for url in urls])
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class SitemapDiscovery:
+    """Lê os sitemaps e feeds de um host e escolhe as URLs a baixar.
+
+    Args:
+        user_agent: User-Agent das requisições, se diferente do padrão do
+            transporte.
+        state: `SitemapState` para filtrar URLs já vistas; sem ele todas as
+            URLs encontradas são entregues.
+        extra_urls: Sitemaps ou feeds adicionais (URLs absolutas), usados
+            para o host de cada um além dos anunciados no robots.txt.
+        timeout: Timeout de cada download, em segundos.
+        max_bytes: Tamanho máximo, já descompactado, de cada arquivo.
+        max_sitemaps: Número máximo de arquivos lidos por host.
+    """
+
+    def __init__(self, user_agent: Optional[str] = None, state: Optional[SitemapState] = None, extra_urls: Iterable[str] = (),
+                 timeout: float = SITEMAP_TIMEOUT, max_bytes: int = SITEMAP_MAX_BYTES,
+                 max_sitemaps: int = SITEMAP_MAX_FILES):
+        self.user_agent = user_agent
+        self.state = state
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_sitemaps = max_sitemaps
+        self.extra_urls: Dict[str, List[str]] = {}
+        for url in extra_urls:
+            self.extra_urls.setdefault(urlsplit(url).netloc, []).append(url)
+        self.metrics = get_metrics()
+        # URLs entregues ao crawler nesta execução, marcadas como baixadas em `flush`
+        self._lock = threading.Lock()
+        self._delivered = set()
+        self._crawled: List[str] = []
+
+    def sitemap_urls(self, host: str, robots_sitemaps: Iterable[str] = ()) -> List[str]:
+        """Sitemaps do host: os do robots.txt e os extras, ou `/sitemap.xml` se não houver nenhum."""
+        urls = list(dict.fromkeys(list(robots_sitemaps) + self.extra_urls.get(host, [])))
+        return urls or [f"https://{host}/sitemap.xml"]
+
+    def discover(self, host: str, robots_sitemaps: Iterable[str] = (),
+                 score: Callable[[str], Optional[float]] = lambda url: 0.0,
+                 limit: int = 1000) -> List[Tuple[float, str]]:
+        """Lê os sitemaps do host e retorna as melhores URLs novas ou alteradas.
+
+        Args:
+            host: Host cujas URLs são procuradas.
+            robots_sitemaps: URLs das linhas `Sitemap:` do robots.txt.
+            score: Nota de cada URL (None descarta a URL, por estar fora
+                do escopo).
+            limit: Número máximo de URLs retornadas; as de maior nota são
+                mantidas num heap, sem guardar o sitemap inteiro.
+        Returns:
+            Lista de ``(nota, url)``, da maior para a menor nota.
+        """
+        if limit <= 0:
+            return []
+        best: List[Tuple[float, str]] = []
+        kept = set()
+
+        def keep(priority: float, url: str) -> None:
+            if url in kept:
+                return
+            if len(best) < limit:
+                heapq.heappush(best, (priority, url))
+            elif priority > best[0][0]:
+                kept.discard(heapq.heapreplace(best, (priority, url))[1])
+            else:
+                return
+            kept.add(url)
+
+        def offer(entries: List[Tuple[str, Optional[float]]]) -> None:
+            # URLs fora do escopo nem chegam ao estado
+            scores = {url: score(url) for url, _ in entries}
+            entries = [(url, lastmod) for url, lastmod in entries if scores[url] is not None]
+            if self.state is not None:
+                entries = self.state.filter_due(host, entries)
+            for url, _ in entries:
+                keep(scores[url], url)
+
+        if self.state is not None:
+            # Descobertas em execuções anteriores que o orçamento não alcançou
+            for url, _ in self.state.pending(host):
+                priority = score(url)
+                if priority is not None:
+                    keep(priority, url)
+
+        queue = [(url, None) for url in self.sitemap_urls(host, robots_sitemaps)]
+        fetched = 0
+        while queue and fetched < self.max_sitemaps:
+            sitemap_url, lastmod = queue.pop(0)
+            if self.state is not None and lastmod is not None:
+                info = self.state.sitemap_info(sitemap_url)
+                if info is not None and info[0] is not None and lastmod <= info[0]:
+                    self.metrics.incr("sitemap_unchanged", host=host)
+                    continue
+            fetched += 1
+            batch: List[Tuple[str, Optional[float]]] = []
+            children = []
+            with self.metrics.timer("sitemap", host):
+                complete = self._read(sitemap_url, lastmod, host, batch, children, offer)
+            if batch:
+                offer(batch)
+            if complete:
+                # Sitemaps de um índice entram na fila (até `max_sitemaps` por host)
+                room = self.max_sitemaps - fetched - len(queue)
+                queue.extend(children[:max(0, room)])
+        if queue:
+            logging.info("Limite de %d sitemap(s) atingido para %s; %d ignorado(s).",
+                         self.max_sitemaps, host, len(queue))
+        result = sorted(best, reverse=True)
+        with self._lock:
+            self._delivered.update(url for _, url in result)
+        logging.info("Sitemaps de %s: %d URL(s) nova(s) ou alterada(s) selecionada(s).", host, len(result))
+        return result
+
+    def _read(self, sitemap_url: str, lastmod: Optional[float], host: str,
+              batch: List[Tuple[str, Optional[float]]], children: List[Tuple[str, Optional[float]]],
+              offer: Callable[[List[Tuple[str, Optional[float]]]], None]) -> bool:
+        """Baixa e lê um sitemap, enviando as URLs em lotes para `offer`.
+
+        Returns:
+            True se o arquivo foi lido por completo (e registrado no estado)
+            ou não mudou desde a última leitura (304); nesse caso `children`
+            recebe os sitemaps do índice gravados no estado, que continuam
+            sendo visitados.
+        """
+        headers = {"User-Agent": self.user_agent} if self.user_agent else {}
+        info = self.state.sitemap_info(sitemap_url) if self.state is not None else None
+        if info is not None:
+            if info[1]:
+                headers["If-None-Match"] = info[1]
+            if info[2]:
+                headers["If-Modified-Since"] = info[2]
+        try:
+            response = transport.get(sitemap_url, headers=headers, timeout=self.timeout, stream=True)
+        except requests.RequestException as e:
+            logging.warning("Não foi possível obter o sitemap %s: %s", sitemap_url, e)
+            return False
+        if response.status_code == 304:
+            discard_response(response)
+            self.metrics.incr("sitemap_not_modified", host=host)
+            children.extend(self.state.sitemap_children(sitemap_url))
+            return True
+        if response.status_code != 200:
+            discard_response(response)
+            logging.info("Sitemap %s retornou status %s", sitemap_url, response.status_code)
+            return False
+        with response:
+            reader = open_sitemap(response, self.max_bytes)
+            try:
+                for kind, loc, entry_lastmod in iter_sitemap(reader):
+                    loc = urljoin(sitemap_url, loc)
+                    if kind == ENTRY_SITEMAP:
+                        children.append((loc, entry_lastmod))
+                        continue
+                    if urlsplit(loc).scheme not in ("http", "https") or has_non_html_extension(loc):
+                        continue
+                    self.metrics.incr("sitemap_urls", host=host)
+                    batch.append((canonicalize_url(loc), entry_lastmod))
+                    if len(batch) >= STATE_BATCH:
+                        offer(batch)
+                        batch.clear()
+            except (ParseError, OSError, EOFError, zlib.error, requests.RequestException) as e:
+                if reader.truncated:
+                    logging.warning("Sitemap %s passou de %d bytes; lido só o início.", sitemap_url, self.max_bytes)
+                else:
+                    logging.warning("Sitemap %s inválido ou incompleto: %s", sitemap_url, e)
+                return False
+            if self.state is not None:
+                self.state.record_sitemap(sitemap_url, lastmod, response.headers.get("ETag"),
+                                          response.headers.get("Last-Modified"), children)
+        return True
+
+    def mark_crawled(self, url: str) -> None:
+        """Anota que uma URL entregue pela descoberta foi baixada (ou tentada)."""
+        with self._lock:
+            if url in self._delivered:
+                self._delivered.discard(url)
+                self._crawled.append(url)
+
+    def flush(self) -> None:
+        """Grava no estado as URLs baixadas desde a última chamada."""
+        with self._lock:
+            crawled, self._crawled = self._crawled, []
+        if crawled and self.state is not None:
+            self.state.mark_crawled(crawled)
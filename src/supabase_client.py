@@ -5,24 +5,56 @@ Carrega as configurações do arquivo `.env` via python-dotenv.  Para
  evitar duplicatas, utiliza o cabeçalho `Prefer: resolution=merge-duplicates`
  dado que a tabela deve possuir uma coluna única (por exemplo, o campo
  `url` ou um índice baseado em `url`).
+
+Os registros são enviados em lotes (limitados por quantidade de linhas e
+por bytes) pela sessão compartilhada de `transport`, reaproveitando a
+conexão keep-alive com o PostgREST.  Lotes que falham com 429/5xx são
+reenviados com backoff exponencial.
+
+Para a sincronização incremental (`delta_sync`), `fetch_column` lê uma
+coluna de todas as linhas num único select paginado e `touch_rows`
+atualiza várias linhas com PATCHes em lote filtrados por `url=in.(...)`.
+Da mesma forma, `delete_rows` remove as linhas das vagas que a
+deduplicação (`dedupe`) transformou em URLs alternativas.
 """
 import os
 import json
-from typing import Dict, Any
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import requests
 from dotenv import load_dotenv
 
+from . import transport
+from .metrics import get_metrics
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPA#BASE_KEY = o(
+SUPABASE_KEY = (
     os.getenv("SUPABASE_ANON_KEY")
     or os.getenv("UPABASE_ANON_KEY")
     or os.getenv("SUPABASE_SERVICE_ROLE")
 )
 SUPABASE_TABLE = os.getenv("SUPABASE_TABLE", "job_postings")
 
+# Limites de cada lote enviado ao PostgREST
+BATCH_MAX_ROWS = int(os.getenv("SUPABASE_BATCH_MAX_ROWS", "500"))
+BATCH_MAX_BYTES = int(os.getenv("SUPABASE_BATCH_MAX_BYTES", str(1024 * 1024)))
+# Política de novas tentativas para erros transitórios
+MAX_RETRIES = int(os.getenv("SUPABASE_MAX_RETRIES", "4"))
+RETRY_BACKOFF = float(os.getenv("SUPABASE_RETRY_BACKOFF", "1.0"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 30
+# Limites de cada PATCH em lote de `touch_rows`
+TOUCH_MAX_URLS = int(os.getenv("SUPABASE_TOUCH_MAX_URLS", "200"))
+# Tamanho da lista de URLs antes da codificação (a URL final fica abaixo de ~8 KB)
+TOUCH_MAX_QUERY_CHARS = 4000
+
 # Cabeçalhos básicos para requisições REST
 HEADERS = {
     "apikey": SUPABASE_KEY,
@@ -32,6 +64,287 @@ HEADERS = {
     "Prefer": "resolution=merge-duplicates",
 }
 
+def _endpoint() -> str:
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("SUPABASE_URL ou SUPABASE_ANON_KEY não definidos no .env")
+    return f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}"
+
+
+@dataclass
+class BatchFailure:
+    """Linhas de um lote que não puderam ser gravadas e o erro correspondente."""
+
+    rows: List[Dict[str, Any]]
+    error: str
+
+
+@dataclass
+class UpsertReport:
+    """Resumo de um envio em lote para o Supabase."""
+
+    sent: int = 0
+    batches: int = 0
+    requests: int = 0
+    failures: List[BatchFailure] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return sum(len(f.rows) for f in self.failures)
+
+    @property
+    def failed_urls(self) -> List[Optional[str]]:
+        return [row.get("url") for f in self.failures for row in f.rows]
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _request(method: str, body: Optional[bytes], report: UpsertReport,
+             params: Optional[Dict[str, str]] = None, stage: str = "upsert") -> Tuple[bool, bool, str]:
+    """Faz uma requisição ao endpoint da tabela, repetindo em erros transitórios.
+
+    Returns:
+        Tupla ``(ok, retryable, mensagem_de_erro)``.  ``retryable`` indica
+        que o erro persistiu após todas as tentativas (429/5xx/rede), e não
+        faz sentido dividir o lote para isolar linhas inválidas.
+    """
+    endpoint = _endpoint()
+    session = transport.get_session()
+    metrics = get_metrics()
+    error = ""
+    for attempt in range(MAX_RETRIES + 1):
+        wait = RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+        report.requests += 1
+        start = time.perf_counter()
+        try:
+            response = session.request(method, endpoint, params=params, data=body, headers=HEADERS,
+                                       timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as exc:
+            metrics.observe(stage, time.perf_counter() - start)
+            error = str(exc)
+        else:
+            metrics.observe(stage, time.perf_counter() - start)
+            if response.ok:
+                return True, False, ""
+            error = f"HTTP {response.status_code}: {response.text}"
+            if response.status_code not in RETRY_STATUS:
+                return False, False, error
+            wait = _retry_after(response) or wait
+        if attempt < MAX_RETRIES:
+            metrics.incr("upsert_retries")
+            logging.warning("Supabase indisponível (%s); nova tentativa em %.1fs", error, wait)
+            time.sleep(wait)
+    return False, True, error
+
+
+def _post(body: bytes, report: UpsertReport) -> Tuple[bool, bool, str]:
+    """Envia um lote de linhas já serializado (upsert)."""
+    return _request("POST", body, report)
+
+
+def _send(batch: List[Tuple[Dict[str, Any], bytes]], report: UpsertReport) -> None:
+    """Envia um lote; em erro de validação divide o lote para isolar as linhas ruins."""
+    body = b"[" + b",".join(encoded for _, encoded in batch) + b"]"
+    ok, retryable, error = _post(body, report)
+    if ok:
+        report.sent += len(batch)
+        get_metrics().incr("upsert_rows", len(batch))
+        return
+    if retryable or len(batch) == 1:
+        get_metrics().incr("upsert_failed_rows", len(batch))
+        report.failures.append(BatchFailure([row for row, _ in batch], error))
+        return
+    middle = len(batch) // 2
+    _send(batch[:middle], report)
+    _send(batch[middle:], report)
+
+
+class BatchUpserter:
+    """Acumula vagas e as envia ao Supabase em lotes limitados.
+
+    O lote é enviado quando atinge ``max_rows`` linhas ou ``max_bytes`` de
+    JSON, e também quando o conjunto de colunas muda (o PostgREST exige que
+    todas as linhas de um insert em lote tenham as mesmas chaves).  Dentro
+    de um lote, linhas com a mesma ``url`` são colapsadas na última, pois o
+    Postgres não aceita atualizar a mesma linha duas vezes num único upsert.
+
+    Pode ser usado como context manager; ao sair, o lote pendente é enviado.
+    """
+
+    def __init__(self, max_rows: int = BATCH_MAX_ROWS, max_bytes: int = BATCH_MAX_BYTES):
+        _endpoint()
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.report = UpsertReport()
+        self._batch: List[Tuple[Dict[str, Any], bytes]] = []
+        self._by_url: Dict[str, int] = {}
+        self._keys: Optional[frozenset] = None
+        self._bytes = 2
+        self._lock = threading.Lock()
+
+    def add(self, job_data: Dict[str, Any]) -> None:
+        """Adiciona uma vaga ao lote atual, enviando-o se necessário."""
+        encoded = json.dumps(job_data, ensure_ascii=False, default=str).encode("utf-8")
+        keys = frozenset(job_data)
+        with self._lock:
+            url = job_data.get("url")
+            if url is not None and url in self._by_url and keys == self._keys:
+                index = self._by_url[url]
+                self._bytes += len(encoded) - len(self._batch[index][1])
+                self._batch[index] = (job_data, encoded)
+                return
+            if self._batch and (
+                keys != self._keys
+                or len(self._batch) >= self.max_rows
+                or self._bytes + len(encoded) + 1 > self.max_bytes
+            ):
+                self._flush_locked()
+            self._keys = keys
+            if url is not None:
+                self._by_url[url] = len(self._batch)
+            self._batch.append((job_data, encoded))
+            self._bytes += len(encoded) + 1
+
+    def flush(self) -> None:
+        """Envia imediatamente o lote pendente, se houver."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._batch:
+            return
+        batch = self._batch
+        self._batch, self._by_url, self._keys, self._bytes = [], {}, None, 2
+        self.report.batches += 1
+        _send(batch, self.report)
+
+    def close(self) -> UpsertReport:
+        self.flush()
+        return self.report
+
+    def __enter__(self) -> "BatchUpserter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def upsert_jobs(jobs: Iterable[Dict[str, Any]], max_rows: int = BATCH_MAX_ROWS,
+                max_bytes: int = BATCH_MAX_BYTES) -> UpsertReport:
+    """Insere ou atualiza várias vagas no Supabase em lotes.
+
+    Args:
+        jobs: Iterável (pode ser um gerador) com os dicionários das vagas.
+        max_rows: Número máximo de linhas por requisição.
+        max_bytes: Tamanho máximo, em bytes, do corpo JSON de cada requisição.
+    Returns:
+        `UpsertReport` com o total enviado e as linhas que falharam por lote.
+    """
+    with BatchUpserter(max_rows=max_rows, max_bytes=max_bytes) as upserter:
+        for job_data in jobs:
+            upserter.add(job_data)
+    return upserter.report
+
+
+def _in_filter(values: Iterable[str]) -> str:
+    """Filtro `in.(...)` do PostgREST, com os valores entre aspas."""
+    quoted = ('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values)
+    return "in.(" + ",".join(quoted) + ")"
+
+
+def fetch_column(column: str, page_size: int = 1000) -> Dict[str, Any]:
+    """Lê a coluna `column` de todas as linhas da tabela, indexada pela `url`.
+
+    É um único select (`select=url,<coluna>`), paginado por `limit`/`offset`
+    para respeitar o limite de linhas por resposta do PostgREST.
+
+    Raises:
+        requests.HTTPError se a leitura falhar.
+    """
+    session = transport.get_session()
+    values: Dict[str, Any] = {}
+    offset = 0
+    while True:
+        with get_metrics().timer("select"):
+            response = session.get(
+                _endpoint(),
+                params={"select": f"url,{column}", "order": "url", "limit": str(page_size),
+                        "offset": str(offset)},
+                headers=HEADERS,
+                timeout=REQUEST_TIMEOUT,
+            )
+        response.raise_for_status()
+        rows = response.json()
+        for row in rows:
+            if row.get("url") is not None:
+                values[row["url"]] = row.get(column)
+        if len(rows) < page_size:
+            return values
+        offset += page_size
+
+
+def _url_batches(urls: Iterable[str], max_urls: int, max_query_chars: int) -> Iterator[List[str]]:
+    """Divide as URLs em grupos que cabem num filtro `url=in.(...)`."""
+    batch: List[str] = []
+    length = 0
+    for url in urls:
+        size = len(url) + 3
+        if batch and (len(batch) >= max_urls or length + size > max_query_chars):
+            yield batch
+            batch, length = [], 0
+        batch.append(url)
+        length += size
+    if batch:
+        yield batch
+
+
+def _by_url(method: str, body: Optional[bytes], urls: Iterable[str], max_urls: int, max_query_chars: int,
+            stage: str) -> UpsertReport:
+    report = UpsertReport()
+    for batch in _url_batches(urls, max_urls, max_query_chars):
+        report.batches += 1
+        ok, _, error = _request(method, body, report, params={"url": _in_filter(batch)}, stage=stage)
+        if ok:
+            report.sent += len(batch)
+        else:
+            report.failures.append(BatchFailure([{"url": url} for url in batch], error))
+    return report
+
+
+def touch_rows(urls: Iterable[str], values: Dict[str, Any], max_urls: int = TOUCH_MAX_URLS,
+               max_query_chars: int = TOUCH_MAX_QUERY_CHARS) -> UpsertReport:
+    """Atualiza as mesmas colunas de várias linhas com PATCHes em lote (`url=in.(...)`).
+
+    Usado para marcar como vistas as vagas inalteradas sem reenviar a linha
+    inteira.  Cada requisição leva no máximo `max_urls` URLs e uma query de
+    até `max_query_chars` caracteres.
+
+    Returns:
+        `UpsertReport` com as linhas atualizadas e as que falharam.
+    """
+    body = json.dumps(values, ensure_ascii=False, default=str).encode("utf-8")
+    return _by_url("PATCH", body, urls, max_urls, max_query_chars, "touch")
+
+
+def delete_rows(urls: Iterable[str], max_urls: int = TOUCH_MAX_URLS,
+                max_query_chars: int = TOUCH_MAX_QUERY_CHARS) -> UpsertReport:
+    """Remove várias linhas com DELETEs em lote (`url=in.(...)`).
+
+    Usado para tirar da tabela as vagas que deixaram de ser canônicas na
+    deduplicação (viraram URLs alternativas de outra linha).
+
+    Returns:
+        `UpsertReport` com as linhas removidas e as que falharam.
+    """
+    return _by_url("DELETE", None, urls, max_urls, max_query_chars, "delete")
+
 
 def upsert_job(job_data: Dict[str, Any]) -> None:
     """Insere ou atualiza uma vaga no Supabase.
@@ -39,16 +352,8 @@ def upsert_job(job_data: Dict[str, Any]) -> None:
     Args:
         job_data: Dicionário com os campos da vaga.
     """
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        raise ValueError("SUPABASE_URL ou SUPABASE_ANON_KEY não definidos no .env")
-
-    endpoint = f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}"
-    # A API espera uma lista de objetos para inserts em lote
-    payload = [job_data]
-    response = requests.post(endpoint, headers=HEADERS, data=json.dumps(payload))
-    try:
-        response.raise_for_status()
-    except requests.HTTPError as err:
+    report = upsert_jobs([job_data])
+    if report.failures:
         # Repassa a mensagem de erro para facilitar depuração
         raise RuntimeError(
-            f"Erro ao inserir dados no Supabase: {response.text}") from err
+            f"Erro ao inserir dados no Supabase: {report.failures[0].error}")
@@ -0,0 +1,171 @@
+"""
+Transporte HTTP compartilhado: conexões keep-alive, cache de DNS e compressão.
+
+Todo o tráfego HTTP do projeto (scraper, crawler, robots.txt, sitemaps,
+APIs de ATS e Supabase) passa por uma única `requests.Session`.  Cada host
+tem seu pool de conexões (até `TRANSPORT_POOL_SIZE` conexões, ou o número
+de workers informado em `configure`), então páginas seguidas do mesmo
+site reaproveitam a conexão TCP/TLS em vez de abrir uma nova a cada
+requisição.  O pool é seguro para uso por várias threads.
+
+As resoluções de DNS ficam em cache no processo por `DNS_CACHE_TTL`
+segundos: a criação de conexões do urllib3 passa a consultar o cache
+antes de chamar `getaddrinfo`.  O `User-Agent` é definido aqui, uma vez,
+nos cabeçalhos da sessão.  A compressão fica com o padrão do `requests`,
+que já pede gzip/deflate (e br ou zstd se os pacotes `brotli` ou
+`zstandard` estiverem instalados) e descomprime de forma transparente.
+
+Configuração (variáveis de ambiente):
+
+* `USER_AGENT` – User-Agent de todas as requisições (padrão:
+  `PMRadarBot/1.0 (+https://founderspm.com.br)`).
+* `TRANSPORT_POOL_SIZE` – conexões mantidas por host (padrão: 10).
+* `TRANSPORT_MAX_HOSTS` – hosts com pool mantido ao mesmo tempo (padrão: 100).
+* `DNS_CACHE_TTL` – validade das resoluções de DNS; `0` desativa o cache
+  (padrão: 300s).
+"""
+import ipaddress
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import connection as urllib3_connection
+
+from .metrics import get_metrics
+
+USER_AGENT = os.getenv("USER_AGENT", "PMRadarBot/1.0 (+https://founderspm.com.br)")
+TRANSPORT_POOL_SIZE = int(os.getenv("TRANSPORT_POOL_SIZE", "10"))
+TRANSPORT_MAX_HOSTS = int(os.getenv("TRANSPORT_MAX_HOSTS", "100"))
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "300"))
+
+_AddrInfo = Tuple[int, int, int, str, Tuple[Any, ...]]
+
+
+class DnsCache:
+    """Cache das resoluções de `getaddrinfo` por (host, porta), com TTL.
+
+    Args:
+        ttl: Segundos de validade de cada resolução.
+    """
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[_AddrInfo]]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> List[_AddrInfo]:
+        key = (host, port)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            get_metrics().incr("dns_cache_hits", host=host)
+            return entry[1]
+        start = time.perf_counter()
+        infos = socket.getaddrinfo(host, port, urllib3_connection.allowed_gai_family(), socket.SOCK_STREAM)
+        get_metrics().observe("dns", time.perf_counter() - start, host)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, infos)
+        return infos
+
+    def forget(self, host: str, port: int) -> None:
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_dns_cache = DnsCache()
+_create_connection = urllib3_connection.create_connection
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
+def _cached_create_connection(address, *args, **kwargs):
+    """`create_connection` do urllib3 com o endereço vindo do cache de DNS.
+
+    Só o IP é trocado: o TLS continua validando o certificado pelo nome do
+    host.  Se nenhum dos endereços em cache aceitar a conexão, a resolução
+    é descartada para que a próxima tentativa consulte o DNS de novo.
+    """
+    host, port = address
+    if not host or _is_ip(host):
+        return _create_connection(address, *args, **kwargs)
+    error: Optional[OSError] = None
+    for _, _, _, _, sockaddr in _dns_cache.resolve(host, port):
+        try:
+            return _create_connection((sockaddr[0], port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    _dns_cache.forget(host, port)
+    raise error or OSError(f"Nenhum endereço para {host}")
+
+
+if DNS_CACHE_TTL > 0:
+    # Vale para todo o processo: qualquer conexão aberta pelo urllib3 usa o cache
+    urllib3_connection.create_connection = _cached_create_connection
+
+
+_session: Optional[requests.Session] = None
+_pool_size = TRANSPORT_POOL_SIZE
+_session_lock = threading.Lock()
+
+
+def _mount(session: requests.Session, pool_size: int) -> None:
+    previous = session.adapters.get("https://")
+    adapter = HTTPAdapter(pool_connections=TRANSPORT_MAX_HOSTS, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if previous is not None:
+        # As conexões ociosas do pool antigo são fechadas; as que estão em uso
+        # são descartadas quando a resposta é liberada
+        previous.close()
+
+
+def get_session() -> requests.Session:
+    """Retorna a sessão HTTP compartilhada do processo (criada sob demanda)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            _mount(session, _pool_size)
+            session.headers["User-Agent"] = USER_AGENT
+            _session = session
+        return _session
+
+
+def configure(workers: int) -> None:
+    """Garante pools com ao menos `workers` conexões por host.
+
+    Chamado no início da execução com o número de threads que fazem
+    requisições; os pools só crescem.
+    """
+    global _pool_size
+    with _session_lock:
+        if workers <= _pool_size:
+            return
+        _pool_size = workers
+        if _session is not None:
+            _mount(_session, workers)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Faz uma requisição pela sessão compartilhada (mesmos argumentos de `requests.request`)."""
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET pela sessão compartilhada (mesmos argumentos de `requests.get`)."""
+    return get_session().get(url, **kwargs)
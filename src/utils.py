@@ -1,14 +1,131 @@
 """
-Funções auxiliares para limpeza de HTML e normalização de texto.
+Funções auxiliares para limpeza de HTML e normalização de texto e URLs.
 """
-from bs4 import BeautifulSoup
+from typing import Iterator, List, Optional
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+# Tags cujo conteúdo não é texto visível da página
+NON_TEXT_TAGS = ("script", "style", "noscript", "template")
+# Tipos de string considerados texto (os mesmos de `stripped_strings`)
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+# Parâmetros de rastreamento removidos na canonicalização de URLs
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "igshid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "mkt_tok",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Extensões de recursos que não são páginas HTML (os links não são seguidos)
+NON_HTML_EXTENSIONS = frozenset({
+    "pdf", "doc", "docx", "xls", "xlsx", "ppt", "pptx", "odt", "ods", "odp", "rtf", "csv",
+    "jpg", "jpeg", "png", "gif", "webp", "svg", "ico", "bmp", "tif", "tiff", "avif", "heic",
+    "mp3", "mp4", "m4a", "m4v", "avi", "mov", "wmv", "mkv", "webm", "ogg", "wav", "flac",
+    "zip", "gz", "tgz", "bz2", "xz", "rar", "7z", "tar", "exe", "msi", "dmg", "apk", "iso", "bin",
+    "css", "js", "json", "xml", "rss", "woff", "woff2", "ttf", "otf", "eot",
+})
+
+
+def parse_html(html: str) -> BeautifulSoup:
+    """Faz o parse do HTML uma única vez, para ser compartilhado pelos extratores."""
+    return BeautifulSoup(html or "", "lxml")
+
+
+def extract_text(soup: BeautifulSoup, limit: Optional[int] = None) -> str:
+    """Extrai o texto visível de uma árvore já parseada, reduzindo espaços.
+
+    Ignora o conteúdo de `script`, `style`, `noscript` e `template` sem
+    alterar a árvore, que continua disponível para os outros extratores.
+    Quando `limit` é informado, para de percorrer a árvore assim que o texto
+    atinge esse tamanho.  O resultado é o mesmo de `strip_html(html)[:limit]`.
+
+    Args:
+        soup: Documento parseado por `parse_html`.
+        limit: Número máximo de caracteres do texto retornado.
+    Returns:
+        Texto com palavras separadas por um único espaço.
+    """
+    words: List[str] = []
+    size = -1
+    for string in _visible_strings(soup):
+        for word in string.split():
+            words.append(word)
+            size += len(word) + 1
+        if limit is not None and size >= limit:
+            break
+    text = " ".join(words)
+    return text if limit is None else text[:limit]
+
+
+def _visible_strings(soup: BeautifulSoup) -> Iterator[str]:
+    """Percorre as strings de texto em ordem, sem descer em `NON_TEXT_TAGS`."""
+    # Pilha explícita: páginas mal formadas podem aninhar milhares de tags
+    stack = [iter(soup.contents)]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                if node.name not in NON_TEXT_TAGS:
+                    stack.append(iter(node.contents))
+                    break
+            elif type(node) in TEXT_STRING_TYPES:
+                text = node.strip()
+                if text:
+                    yield text
+        else:
+            stack.pop()
 
 
 def strip_html(html: str) -> str:
     """Remove tags HTML e reduz espaços."""
     if not html:
         return ""
-    soup = BeautifulSoup(html, "lxml")
-    text = soup.get_text(" ", strip=True)
-    # Remove espaços duplicados
-    return " ".join(text.split())
+    return extract_text(parse_html(html))
+
+
+def has_non_html_extension(url: str) -> bool:
+    """Indica se o caminho da URL termina numa extensão de recurso não-HTML."""
+    segment = urlsplit(url).path.rsplit("/", 1)[-1]
+    if "." not in segment:
+        return False
+    return segment.rsplit(".", 1)[-1].lower() in NON_HTML_EXTENSIONS
+
+
+def _is_tracking_param(pair: str) -> bool:
+    key = unquote(pair.split("=", 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Normaliza uma URL para que variações da mesma página coincidam.
+
+    Esquema e host vão para minúsculas, a porta padrão e o fragmento são
+    removidos, a barra final do caminho é descartada (exceto na raiz) e os
+    parâmetros de rastreamento (`utm_*`, `fbclid`...) saem da query, cujos
+    parâmetros restantes são ordenados sem alterar sua codificação.
+
+    Args:
+        url: URL absoluta.
+    Returns:
+        URL canônica (ainda com esquema, para poder ser baixada).
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, _DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+    query = "&".join(sorted(
+        pair for pair in parts.query.split("&") if pair and not _is_tracking_param(pair)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
@@ -0,0 +1,208 @@
+"""
+Conjunto compacto de URLs visitadas para a fronteira do crawler.
+
+Em vez das strings das URLs, guarda-se uma impressão digital de 64 bits da
+URL canônica sem o esquema (assim `http://` e `https://` coincidem).
+
+* `FingerprintSet` – tabela hash de endereçamento aberto sobre um
+  `array('Q')`, com 8 bytes por posição; exata a menos de colisões de
+  64 bits.
+* `BloomFilter` – filtro de Bloom sobre um `bytearray`, com taxa de falsos
+  positivos configurável; usa bem menos memória, mas pode descartar
+  algumas URLs novas.
+
+Ambos têm capacidade fixa, definida na criação: atingida a capacidade,
+novas URLs são recusadas.  O filtro de Bloom aloca todo o vetor de bits de
+início; o `FingerprintSet` começa pequeno e dobra a tabela conforme enche,
+até o tamanho que a capacidade exige, então a memória acompanha o número
+de URLs guardadas sem passar desse teto.
+"""
+import hashlib
+import math
+from array import array
+from typing import Iterator, Union
+
+from .utils import canonicalize_url
+
+VISITED_EXACT = "exact"
+VISITED_BLOOM = "bloom"
+
+
+def url_fingerprint(url: str) -> int:
+    """Impressão digital de 64 bits da URL canônica, ignorando o esquema."""
+    key = canonicalize_url(url).split("://", 1)[-1]
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class FingerprintSet:
+    """Conjunto exato de impressões digitais com memória limitada.
+
+    Args:
+        capacity: Número máximo de URLs guardadas.
+    """
+
+    LOAD_FACTOR = 0.7
+    INITIAL_SIZE = 1024
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        size = 8
+        while size * self.LOAD_FACTOR < self.capacity:
+            size <<= 1
+        # Tamanho máximo da tabela; ela começa menor e dobra conforme enche
+        self._max_size = size
+        self._count = 0
+        self._allocate(min(size, self.INITIAL_SIZE))
+
+    def _allocate(self, size: int) -> None:
+        old = getattr(self, "_slots", ())
+        self._mask = size - 1
+        # 0 marca posição livre; a impressão 0 é guardada como 1
+        self._slots = array("Q", bytes(8 * size))
+        self._limit = size if size == self._max_size else int(size * self.LOAD_FACTOR)
+        for fp in old:
+            if fp:
+                self._insert(fp)
+
+    def _insert(self, fp: int) -> None:
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while slots[i]:
+            i = (i + 1) & mask
+        slots[i] = fp
+
+    def add_fingerprint(self, fp: int) -> bool:
+        """Adiciona a impressão; retorna False se já existia ou se o conjunto está cheio."""
+        fp = fp or 1
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while True:
+            current = slots[i]
+            if current == fp:
+                return False
+            if current == 0:
+                if self._count >= self.capacity:
+                    return False
+                if self._count >= self._limit:
+                    self._allocate(len(slots) * 2)
+                    self._insert(fp)
+                else:
+                    slots[i] = fp
+                self._count += 1
+                return True
+            i = (i + 1) & mask
+
+    def contains_fingerprint(self, fp: int) -> bool:
+        fp = fp or 1
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while True:
+            current = slots[i]
+            if current == fp:
+                return True
+            if current == 0:
+                return False
+            i = (i + 1) & mask
+
+    def add(self, url: str) -> bool:
+        """Adiciona a URL; retorna True se ela ainda não tinha sido vista."""
+        return self.add_fingerprint(url_fingerprint(url))
+
+    def __contains__(self, url: str) -> bool:
+        return self.contains_fingerprint(url_fingerprint(url))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def fingerprints(self) -> Iterator[int]:
+        return (fp for fp in self._slots if fp)
+
+    def to_bytes(self) -> bytes:
+        """Serializa as impressões guardadas (usado no checkpoint do crawl)."""
+        return array("Q", self.fingerprints()).tobytes()
+
+    def load_bytes(self, data: bytes, count: int = 0) -> None:
+        """Adiciona as impressões serializadas por `to_bytes`."""
+        for fp in array("Q", data):
+            self.add_fingerprint(fp)
+
+    @property
+    def nbytes(self) -> int:
+        return self._slots.itemsize * len(self._slots)
+
+
+class BloomFilter:
+    """Filtro de Bloom de tamanho fixo sobre impressões de 64 bits.
+
+    Args:
+        capacity: Número de URLs para o qual o filtro é dimensionado.
+        error_rate: Taxa de falsos positivos esperada com `capacity` URLs.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self._bits = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._bits / self.capacity * math.log(2)))
+        self._array = bytearray((self._bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, fp: int) -> Iterator[int]:
+        # Duplo hashing (Kirsch–Mitzenmacher) a partir das duas metades da impressão
+        h1, h2 = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        for i in range(self._hashes):
+            yield (h1 + i * h2) % self._bits
+
+    def add_fingerprint(self, fp: int) -> bool:
+        """Adiciona a impressão; retorna False se (provavelmente) já existia ou se o filtro está cheio."""
+        if self._count >= self.capacity:
+            return False
+        new = False
+        for pos in self._positions(fp):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self._array[byte] & bit:
+                self._array[byte] |= bit
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def contains_fingerprint(self, fp: int) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fp))
+
+    def add(self, url: str) -> bool:
+        """Adiciona a URL; retorna True se ela ainda não tinha sido vista."""
+        return self.add_fingerprint(url_fingerprint(url))
+
+    def __contains__(self, url: str) -> bool:
+        return self.contains_fingerprint(url_fingerprint(url))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def to_bytes(self) -> bytes:
+        """Serializa o vetor de bits (usado no checkpoint do crawl)."""
+        return bytes(self._array)
+
+    def load_bytes(self, data: bytes, count: int = 0) -> None:
+        """Restaura o vetor de bits; o filtro precisa ter as mesmas dimensões."""
+        if len(data) != len(self._array):
+            raise ValueError("Filtro de Bloom com dimensões diferentes do checkpoint")
+        self._array[:] = data
+        self._count = count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._array)
+
+
+VisitedStore = Union[FingerprintSet, BloomFilter]
+
+
+def make_visited_store(mode: str, capacity: int, error_rate: float = 1e-4) -> VisitedStore:
+    """Cria o conjunto de visitados no modo `exact` ou `bloom`."""
+    if mode == VISITED_EXACT:
+        return FingerprintSet(capacity)
+    if mode == VISITED_BLOOM:
+        return BloomFilter(capacity, error_rate)
+    raise ValueError(f"Modo de visitados desconhecido: {mode}")
@@ -1,34 +1,168 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import threading
-import queue
 import logging
+import multiprocessing
 import time
-import json
-from urllib.robotparser import RobotFileParser
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import transport
+from .checkpoint import CrawlState
+from .frontier import Frontier
+from .host_health import TRANSIENT_ERRORS, HostUnavailable, is_transient
+from .http_cache import UnsupportedContent, cached_get
+from .link_scoring import LinkScorer
+from .metrics import get_metrics
+from .page_parser import extract_structured_data, parse_page
+from .robots import ROBOTS_TIMEOUT, ROBOTS_UNREACHABLE, RobotsCache, build_parser, download_robots
+from .utils import canonicalize_url
+from .visited import VISITED_BLOOM, VISITED_EXACT, make_visited_store
+
+
+def timed_parse(url, content, structured):
+    """Executa `parse_page` e retorna também sua duração (medida no processo que fez o parse)."""
+    start = time.perf_counter()
+    page = parse_page(url, content, structured=structured)
+    return page, time.perf_counter() - start
+
 
 class WebCrawler:
-    def __init__(self, start_urls, max_pages=100, num_threads=5, user_agent="MyCrawlerBot/1.0"):
+    def __init__(self, start_urls, max_pages=100, num_threads=5, user_agent=None,
+                 http_cache=None, robots_cache=None, robots_threads=4, robots_timeout=ROBOTS_TIMEOUT,
+                 visited_mode=VISITED_EXACT, bloom_error_rate=1e-4,
+                 checkpoint=None, checkpoint_interval=60, resume=False, max_runtime=None,
+                 parse_processes=0, max_pending_parses=None, scorer=None, max_frontier=None,
+                 discovery=None, crawl_links=True, on_page=None, host_health=None,
+                 before_checkpoint=None, resend=None):
         """
         Inicializa o crawler com URLs de início e configurações.
         - start_urls: lista de URLs para começar a raspagem.
-        - max_pages: número máximo de páginas a serem raspadas.
+        - max_pages: número máximo de páginas baixadas nesta execução.
         - num_threads: número de threads para raspar em paralelo.
-        - user_agent: string do User-Agent a ser usada nas requisições HTTP.
+        - user_agent: string do User-Agent usada nas requisições HTTP e nas
+          regras do robots.txt (padrão: o da sessão do transporte,
+          `USER_AGENT`, que não é repetido em cada requisição).
+        - http_cache: instância opcional de `HttpCache` para requisições
+          condicionais; páginas inalteradas não têm os dados estruturados
+          extraídos novamente.
+        - robots_cache: instância opcional de `RobotsCache` para reaproveitar
+          robots.txt entre execuções (sem ela o cache fica só em memória).
+        - robots_threads: threads dedicadas a baixar robots.txt.
+        - robots_timeout: timeout, em segundos, do download de cada robots.txt.
+        - visited_mode: "exact" (impressões de 64 bits) ou "bloom" (filtro de
+          Bloom, menor, com falsos positivos em `bloom_error_rate`).
+        - checkpoint: instância opcional de `CrawlCheckpoint`; o estado é
+          gravado a cada `checkpoint_interval` segundos e ao final.  Páginas
+          em processamento (baixando, aguardando o parse ou em `on_page`)
+          entram no checkpoint como pendentes.
+        - before_checkpoint: função opcional chamada depois de capturar o
+          estado e antes de gravá-lo, para descarregar os resultados das
+          páginas já processadas (arquivos, pipeline, lotes do Supabase).
+          Se ela falhar o checkpoint não é gravado, para que nenhuma página
+          fique marcada como visitada sem que seu resultado tenha sido salvo.
+        - resume: retoma a fronteira, os visitados e o estado por host do
+          último checkpoint antes de começar.
+        - max_runtime: tempo máximo de execução em segundos; ao atingi-lo o
+          crawler para de forma ordenada (e grava o checkpoint).
+        - parse_processes: processos dedicados ao parse do HTML; com 0 o parse
+          é feito na própria thread que baixou a página.  Os processos são
+          criados com "spawn": um fork herdaria as threads e os locks do
+          crawler (pools de conexão, SQLite) num estado inconsistente.
+        - max_pending_parses: páginas baixadas aguardando parse antes de as
+          threads de I/O esperarem (padrão: 2 por processo).
+        - scorer: `LinkScorer` que prioriza os links (vagas, ATS e
+          formulários primeiro) e aplica as regras de escopo; as URLs de
+          maior nota são baixadas antes.
+        - max_frontier: número de URLs descobertas acompanhadas (visitadas
+          mais pendentes); padrão: 10 vezes `max_pages`, para que o
+          orçamento de páginas vá para as melhores candidatas.
+        - discovery: `SitemapDiscovery` opcional; os sitemaps (do robots.txt)
+          dos hosts das sementes são lidos e suas URLs novas ou alteradas
+          entram na fronteira.
+        - crawl_links: com False os links das páginas não são seguidos e só
+          as sementes e as URLs dos sitemaps são baixadas.
+        - on_page: função opcional chamada como `on_page(url, page, changed)`
+          para cada página parseada, depois de os links serem enfileirados;
+          `page["html"]` traz o HTML.  Páginas inalteradas (304, com o corpo
+          do cache HTTP) também são entregues, com `changed` falso e sem os
+          dados estruturados, para que a sincronização incremental as marque
+          como vistas.  É chamada nas threads do crawler, então uma função
+          que bloqueia (uma fila cheia) segura o crawl.
+        - resend: função opcional `resend(url)` (normalmente
+          `DeltaSync.needs_resend`).  Uma página inalterada para a qual ela
+          retorna True é processada como alterada (dados estruturados
+          extraídos e `changed` verdadeiro), para que um envio que falhou
+          seja refeito.
+        - host_health: `HostHealth` opcional (o mesmo do scraper, de
+          preferência).  Falhas transitórias devolvem a URL à fronteira, que
+          só volta a servir o host após o backoff ou o `Retry-After`, até
+          `max_retries` vezes; com o disjuntor aberto a URL é adiada sem
+          gastar o orçamento de páginas, e descartada se o host estiver morto.
         """
         self.start_urls = start_urls
         self.max_pages = max_pages
         self.num_threads = num_threads
-        self.user_agent = user_agent
+        self.user_agent = user_agent or transport.USER_AGENT
+        # Só um User-Agent diferente do da sessão vai em cada requisição
+        self.headers = {"User-Agent": user_agent} if user_agent else None
+        # Um pool de conexões por host com folga para todas as threads
+        transport.configure(num_threads)
+        self.http_cache = http_cache
+        self.robots_cache = robots_cache or RobotsCache(path=None)
+        self.robots_timeout = robots_timeout
+        self.scorer = scorer or LinkScorer()
+        self.max_frontier = max_frontier or 10 * max_pages
+        self.discovery = discovery
+        self.crawl_links = crawl_links
+        self.on_page = on_page
+        self.resend = resend
+        self.host_health = host_health
+        # Falhas transitórias por URL ainda pendente de nova tentativa
+        self.fetch_attempts = {}
+        self.retry_lock = threading.Lock()
+        # Hosts das sementes e hosts cujos sitemaps já foram pedidos
+        self.discovery_hosts = set()
+        self.discovery_started = set()
+        self.discovery_lock = threading.Lock()
+        self.sitemap_executor = ThreadPoolExecutor(max_workers=2) if discovery is not None else None
+        # Páginas já entregues aos workers nesta execução (orçamento de max_pages)
+        self.pages_started = 0
+        self.budget_exhausted = False
+        self.budget_lock = threading.Lock()
 
-        self.visited = set()
-        self.queue = queue.Queue()
+        # Impressões digitais das URLs canônicas; a capacidade é fixa e
+        # limitada por max_frontier, então a memória não cresce durante o crawl
+        self.visited_mode = visited_mode
+        self.bloom_error_rate = bloom_error_rate
+        self.visited = make_visited_store(
+            visited_mode, self.max_frontier + len(start_urls), bloom_error_rate
+        )
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.before_checkpoint = before_checkpoint
+        self.resume = resume
+        self.max_runtime = max_runtime
+        self.parse_pool = ProcessPoolExecutor(
+            max_workers=parse_processes, mp_context=multiprocessing.get_context("spawn")
+        ) if parse_processes > 0 else None
+        self.parse_slots = threading.BoundedSemaphore(max_pending_parses or max(1, 2 * parse_processes))
+        # Páginas já devolvidas à fronteira mas ainda no pool de parse: url -> (host, profundidade)
+        self.parsing = {}
+        self.parsing_lock = threading.Lock()
+        # Filas por host + heap de horários liberados (respeita o crawl-delay)
+        self.frontier = Frontier()
         self.visited_lock = threading.Lock()
         self.robots_parsers = {}
+        # robots.txt é resolvido em threads próprias; enquanto isso as URLs
+        # do domínio ficam estacionadas na fronteira
+        self.robots_lock = threading.Lock()
+        self.robots_pending = set()
+        self.robots_executor = ThreadPoolExecutor(max_workers=robots_threads)
         self.last_fetch_time = {}
         self.crawl_delay = {}
         self.stop_event = threading.Event()
+        self.done_event = threading.Event()
+        self.metrics = get_metrics()
 
         logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
         logging.info("Crawler inicializado com %d threads.", num_threads)
@@ -40,141 +174,419 @@ class WebCrawler:
             parsed = urlparse(url)
         if not parsed.netloc:
             return
+        url = canonicalize_url(url)
+        priority = self.scorer.score(url)
+        if priority is None:
+            logging.warning("Semente fora do escopo configurado: %s", url)
+            return
+        domain = urlparse(url).netloc
         with self.visited_lock:
-            if url not in self.visited:
-                self.visited.add(url)
-                self.queue.put(url)
+            if self.visited.add(url):
+                self.enqueue(domain, url, priority)
                 logging.debug("URL adicionada à fila: %s", url)
+        if self.discovery is not None:
+            with self.discovery_lock:
+                self.discovery_hosts.add(domain)
+            # Ao retomar, a semente pode já estar nos visitados
+            self.request_robots(domain)
+            self.start_discovery(domain)
+
+    def enqueue(self, domain, url, priority=0.0, depth=0):
+        """Coloca a URL na fronteira, disparando a resolução do robots.txt se preciso."""
+        if domain not in self.robots_parsers:
+            self.request_robots(domain)
+        self.frontier.put(domain, url, priority, depth)
+
+    def request_robots(self, domain):
+        """
+        Garante que o robots.txt do domínio seja resolvido sem bloquear a thread.
+        Usa o cache quando possível; caso contrário estaciona o domínio na
+        fronteira e agenda o download.
+        """
+        with self.robots_lock:
+            if domain in self.robots_parsers or domain in self.robots_pending:
+                return
+            cached = self.robots_cache.get(domain)
+            if cached is not None:
+                self.metrics.incr("robots_cache_hits", host=domain)
+                self.set_robots(domain, *cached)
+                return
+            self.robots_pending.add(domain)
+            self.frontier.park(domain)
+        self.robots_executor.submit(self.fetch_robots, domain)
 
     def fetch_robots(self, domain):
-        rp = RobotFileParser()
-        rp.set_url(f"http://{domain}/robots.txt")
+        """Baixa o robots.txt do domínio (com timeout) e libera suas URLs."""
         try:
-            rp.read()
-            logging.info("robots.txt obtido para %s", domain)
+            with self.metrics.timer("robots", domain):
+                status, lines = download_robots(domain, self.headers and self.user_agent, self.robots_timeout)
+            if status != ROBOTS_UNREACHABLE:
+                logging.info("robots.txt obtido para %s", domain)
+            self.robots_cache.put(domain, status, lines)
+            self.set_robots(domain, status, lines)
         except Exception as e:
-            logging.warning("Não foi possível obter robots.txt de %s: %s", domain, e)
-        self.robots_parsers[domain] = rp
+            logging.warning("Erro ao resolver robots.txt de %s: %s", domain, e)
+        finally:
+            with self.robots_lock:
+                self.robots_pending.discard(domain)
+            self.frontier.unpark(domain)
+
+    def set_robots(self, domain, status, lines):
+        rp = build_parser(status, lines)
         delay = rp.crawl_delay(self.user_agent)
         if delay is None:
             delay = 1
         self.crawl_delay[domain] = delay
-        self.last_fetch_time[domain] = 0
+        self.robots_parsers[domain] = rp
+        if self.discovery is not None:
+            self.start_discovery(domain)
+
+    def start_discovery(self, domain):
+        """Lê os sitemaps de um host das sementes, uma vez, assim que o robots.txt é resolvido."""
+        with self.discovery_lock:
+            rp = self.robots_parsers.get(domain)
+            if rp is None or domain not in self.discovery_hosts or domain in self.discovery_started:
+                return
+            self.discovery_started.add(domain)
+        # A fronteira não pode esvaziar enquanto os sitemaps são lidos
+        self.frontier.hold()
+        try:
+            self.sitemap_executor.submit(self.discover_sitemaps, domain, rp.site_maps() or [])
+        except RuntimeError:
+            self.frontier.unhold()
+
+    def discover_sitemaps(self, domain, sitemaps):
+        """Enfileira as URLs novas ou alteradas dos sitemaps, pela nota do `scorer`."""
+        try:
+            with self.visited_lock:
+                room = self.visited.capacity - len(self.visited)
+            entries = self.discovery.discover(domain, sitemaps, lambda url: self.scorer.score(url, "", 1), room)
+            added = 0
+            for priority, url in entries:
+                with self.visited_lock:
+                    if len(self.visited) >= self.visited.capacity:
+                        break
+                    if not self.visited.add(url):
+                        continue
+                    self.enqueue(urlparse(url).netloc, url, priority, 1)
+                added += 1
+            self.metrics.incr("sitemap_enqueued", added, host=domain)
+            logging.info("%d URL(s) de sitemaps enfileirada(s) para %s.", added, domain)
+        except Exception as e:
+            logging.warning("Erro ao ler os sitemaps de %s: %s", domain, e)
+        finally:
+            self.frontier.unhold()
 
     def worker(self):
         while not self.stop_event.is_set():
-            try:
-                url = self.queue.get(timeout=1)
-            except queue.Empty:
+            # Reserva uma página do orçamento antes de pedir uma URL, para não
+            # retirar da fronteira uma URL que não será baixada.  Sem orçamento
+            # o worker só sai: os que ainda esperam em `get` já reservaram a
+            # sua página, e fechar a fronteira a deixaria sem ser baixada
+            with self.budget_lock:
+                if self.pages_started >= self.max_pages:
+                    if not self.budget_exhausted:
+                        self.budget_exhausted = True
+                        logging.info("Limite de %d páginas atingido.", self.max_pages)
+                    break
+                self.pages_started += 1
+            waited = time.perf_counter()
+            item = self.frontier.get()
+            # Tempo ocioso do worker aguardando um host liberado
+            self.metrics.observe("frontier_wait", time.perf_counter() - waited)
+            if item is None:
                 break
+            domain, url, depth = item
             try:
-                self.process_url(url)
+                self.process_url(url, depth)
             except Exception as e:
                 logging.error("Erro ao processar %s: %s", url, e)
             finally:
-                self.queue.task_done()
+                # O domínio só volta a ser servido após o crawl-delay contado
+                # a partir da última requisição feita a ele
+                not_before = self.last_fetch_time.get(domain, 0) + self.crawl_delay.get(domain, 1)
+                if self.host_health is not None:
+                    # Host em backoff ou com o disjuntor aberto espera na fronteira
+                    not_before = max(not_before, self.host_health.available_at(domain))
+                self.metrics.observe("politeness_wait", max(0.0, not_before - time.time()), domain)
+                self.frontier.release(domain, not_before)
         logging.debug("Thread encerrada.")
 
-    def process_url(self, url):
-        domain = urlparse(url).netloc
+    def stop(self):
+        """Interrompe o crawler; os workers terminam a URL atual e saem."""
+        self.stop_event.set()
+        self.frontier.close()
 
-        if domain not in self.robots_parsers:
-            with self.visited_lock:
-                if domain not in self.robots_parsers:
-                    self.fetch_robots(domain)
+    def fetch_page(self, url, depth=0):
+        """
+        Aplica robots.txt e baixa a página.  O crawl-delay já foi respeitado
+        pela fronteira, que só entrega URLs de domínios liberados.
+        Retorna uma tupla (html, alterada) ou None se a página não puder ser obtida.
+        `alterada` é False quando o corpo veio do cache HTTP (304).
+        Com `host_health`, falhas transitórias e hosts indisponíveis devolvem
+        a URL à fronteira (na profundidade `depth`).
+        """
+        domain = urlparse(url).netloc
 
         rp = self.robots_parsers.get(domain)
         if rp and not rp.can_fetch(self.user_agent, url):
             logging.info("URL bloqueada por robots.txt: %s", url)
-            return
-
-        if domain in self.last_fetch_time:
-            elapsed = time.time() - self.last_fetch_time[domain]
-            delay = self.crawl_delay.get(domain, 1)
-            if elapsed < delay:
-                wait_time = delay - elapsed
-                logging.debug("Aguardando %.2fs para respeitar crawl-delay de %s", wait_time, domain)
-                time.sleep(wait_time)
+            self.metrics.incr("robots_blocked", host=domain)
+            return None
 
         logging.info("Buscando: %s", url)
-        headers = {"User-Agent": self.user_agent}
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            # Sem novas tentativas na hora: a fronteira reagenda a URL
+            response = cached_get(url, headers=self.headers, timeout=10, cache=self.http_cache,
+                                  health=self.host_health, retries=0, max_wait=0)
+        except UnsupportedContent as e:
+            logging.info("%s", e)
+            return None
+        except HostUnavailable as e:
+            self.defer(url, domain, depth, e)
+            return None
+        except TRANSIENT_ERRORS as e:
+            logging.warning("Falha ao requisitar %s: %s", url, e)
+            self.retry_later(url, domain, depth)
+            return None
         except Exception as e:
             logging.warning("Falha ao requisitar %s: %s", url, e)
-            return
-
-        self.last_fetch_time[domain] = time.time()
+            return None
+        finally:
+            self.last_fetch_time[domain] = time.time()
 
         if response.status_code != 200:
             logging.warning("URL retornou status %s: %s", response.status_code, url)
+            if is_transient(response):
+                self.retry_later(url, domain, depth)
+            return None
+        if response.from_cache:
+            logging.info("Página inalterada (cache HTTP): %s", url)
+
+        if self.fetch_attempts:
+            with self.retry_lock:
+                self.fetch_attempts.pop(url, None)
+        return response.text, not response.from_cache
+
+    def requeue(self, url, domain, depth):
+        """Devolve à fronteira uma URL já visitada, para uma nova tentativa."""
+        self.frontier.put(domain, url, self.scorer.score(url, "", depth) or 0.0, depth)
+
+    def retry_later(self, url, domain, depth):
+        """Reagenda a URL após uma falha transitória, até `max_retries` vezes."""
+        if self.host_health is None:
             return
+        with self.retry_lock:
+            attempts = self.fetch_attempts.get(url, 0) + 1
+            if attempts > self.host_health.max_retries:
+                self.fetch_attempts.pop(url, None)
+                logging.warning("Desistindo de %s após %d tentativa(s).", url, attempts)
+                return
+            self.fetch_attempts[url] = attempts
+        self.metrics.incr("fetch_retries", host=domain)
+        self.requeue(url, domain, depth)
 
-        content = response.text
-        soup = BeautifulSoup(content, "html.parser")
+    def defer(self, url, domain, depth, error):
+        """Adia (ou descarta, se o host estiver morto) uma URL de host indisponível."""
+        # Nenhuma requisição foi feita: a página volta para o orçamento
+        with self.budget_lock:
+            self.pages_started -= 1
+        if error.dead:
+            logging.info("Descartando %s: %s", url, error)
+            self.metrics.incr("circuit_dropped", host=domain)
+            return
+        self.metrics.incr("fetch_deferred", host=domain)
+        self.requeue(url, domain, depth)
 
-        structured_data = self.extract_structured_data(soup)
-        if structured_data["json_ld"]:
-            logging.info("Dados JSON-LD encontrados em %s", url)
-        if structured_data["microdata"]:
-            logging.info("Microdados encontrados em %s", url)
+    def enqueue_links(self, links, anchors=None, depth=1):
+        """Adiciona à fila os links (já canônicos) ainda não visitados.
 
-        for tag_a in soup.find_all("a", href=True):
-            new_url = urljoin(url, tag_a["href"])
-            if new_url.startswith("javascript:") or new_url.startswith("mailto:"):
-                continue
-            new_url = new_url.split("#")[0]
-            if not new_url.startswith("http"):
+        Cada link é pontuado pelo `scorer` (com o texto da âncora, se houver,
+        e a profundidade); links fora do escopo são descartados.
+        """
+        for index, new_url in enumerate(links):
+            anchor = anchors[index] if anchors and index < len(anchors) else ""
+            priority = self.scorer.score(new_url, anchor, depth)
+            if priority is None:
+                self.metrics.incr("links_out_of_scope")
                 continue
             with self.visited_lock:
-                if new_url in self.visited:
-                    continue
-                if len(self.visited) >= self.max_pages:
-                    self.stop_event.set()
+                if len(self.visited) >= self.visited.capacity:
                     return
-                self.visited.add(new_url)
-                self.queue.put(new_url)
-                logging.debug("Novo link adicionado: %s", new_url)
-
-    def extract_structured_data(self, soup):
-        data = {"json_ld": [], "microdata": []}
-        scripts = soup.find_all("script", type="application/ld+json")
-        for script in scripts:
-            if not script.string:
-                continue
-            try:
-                json_data = json.loads(script.string)
-                data["json_ld"].append(json_data)
-            except Exception:
-                data["json_ld"].append(script.string.strip())
-
-        items = soup.find_all(attrs={"itemscope": True})
-        for item in items:
-            if item.find_parent(attrs={"itemscope": True}):
-                continue
-            item_data = {}
-            if item.has_attr("itemtype"):
-                item_data["type"] = item["itemtype"]
-            props = item.find_all(attrs={"itemprop": True})
-            for prop in props:
-                if prop.has_attr("itemscope"):
+                if not self.visited.add(new_url):
                     continue
-                key = prop["itemprop"]
-                if prop.name.lower() == "meta" or prop.has_attr("content"):
-                    value = prop.get("content", "")
-                else:
-                    value = prop.get_text(strip=True)
-                if key in item_data:
-                    if isinstance(item_data[key], list):
-                        item_data[key].append(value)
-                    else:
-                        item_data[key] = [item_data[key], value]
-                else:
-                    item_data[key] = value
-            data["microdata"].append(item_data)
-        return data
+                self.enqueue(urlparse(new_url).netloc, new_url, priority, depth)
+                logging.debug("Novo link adicionado (nota %.1f): %s", priority, new_url)
+
+    def follow_links(self, page):
+        """Enfileira os links de uma página parseada, um nível abaixo dela."""
+        if not self.crawl_links:
+            return
+        self.enqueue_links(page["links"], page.get("anchors"), page.get("depth", 0) + 1)
+
+    def process_url(self, url, depth=0):
+        page = self.fetch_page(url, depth)
+        if self.discovery is not None:
+            self.discovery.mark_crawled(url)
+        if page is None:
+            return
+        content, changed = page
+        if not changed and self.resend is not None and self.resend(url):
+            # O último envio desta página falhou: ela é extraída de novo
+            changed = True
+        # Páginas inalteradas só são usadas para seguir os links
+        if self.parse_pool is None:
+            page, elapsed = timed_parse(url, content, changed)
+            self.metrics.observe("parse", elapsed, urlparse(url).netloc)
+            page["depth"] = depth
+            page["html"] = content
+            self.handle_parsed(url, page, changed)
+            return
+        # O parse vai para o pool de processos; o semáforo limita as páginas
+        # pendentes e segura as threads de I/O quando o parse fica para trás
+        self.parse_slots.acquire()
+        self.frontier.hold()
+        with self.parsing_lock:
+            self.parsing[url] = (urlparse(url).netloc, depth)
+        try:
+            future = self.parse_pool.submit(timed_parse, url, content, changed)
+        except Exception:
+            with self.parsing_lock:
+                self.parsing.pop(url, None)
+            self.parse_slots.release()
+            self.frontier.unhold()
+            raise
+        future.add_done_callback(lambda f: self.parse_done(url, changed, f, depth, content))
+
+    def parse_done(self, url, changed, future, depth=0, content=None):
+        try:
+            page, elapsed = future.result()
+            self.metrics.observe("parse", elapsed, urlparse(url).netloc)
+            page["depth"] = depth
+            page["html"] = content
+            self.handle_parsed(url, page, changed)
+        except Exception as e:
+            logging.error("Erro ao processar %s: %s", url, e)
+        finally:
+            with self.parsing_lock:
+                self.parsing.pop(url, None)
+            self.parse_slots.release()
+            self.frontier.unhold()
+
+    def handle_parsed(self, url, page, changed):
+        """Recebe o resultado do parse: registra os dados estruturados, segue os links e chama `on_page`."""
+        if changed:
+            if page["json_ld"]:
+                logging.info("Dados JSON-LD encontrados em %s", url)
+            if page["microdata"]:
+                logging.info("Microdados encontrados em %s", url)
+        self.follow_links(page)
+        if self.on_page is not None:
+            self.on_page(url, page, changed)
+
+    def extract_structured_data(self, html):
+        """Extrai JSON-LD e microdados de um HTML (ou de um objeto BeautifulSoup)."""
+        return extract_structured_data(html)
+
+    def checkpoint_state(self):
+        """Captura um retrato consistente do estado do crawl."""
+        # Com visited_lock nenhuma URL entra nos visitados sem entrar na fronteira
+        with self.visited_lock:
+            frontier, next_allowed = self.frontier.snapshot()
+            with self.parsing_lock:
+                parsing = dict(self.parsing)
+            if parsing:
+                # Ainda sem resultado: voltam à fronteira ao retomar
+                pending = {url for _, url, _, _ in frontier}
+                frontier.extend(
+                    (host, url, self.scorer.score(url, "", depth) or 0.0, depth)
+                    for url, (host, depth) in parsing.items() if url not in pending
+                )
+            visited = self.visited.to_bytes()
+            visited_meta = {
+                "mode": self.visited_mode,
+                "capacity": self.visited.capacity,
+                "error_rate": self.bloom_error_rate,
+                "count": len(self.visited),
+            }
+        return CrawlState(
+            frontier=frontier,
+            visited=visited,
+            visited_meta=visited_meta,
+            crawl_delay=dict(self.crawl_delay),
+            last_fetch_time=dict(self.last_fetch_time),
+            next_allowed=next_allowed,
+        )
+
+    def save_checkpoint(self):
+        if self.checkpoint is None:
+            return
+        state = self.checkpoint_state()
+        if self.before_checkpoint is not None:
+            # Tudo o que foi processado até a captura do estado é gravado antes do checkpoint
+            try:
+                self.before_checkpoint()
+            except Exception as e:
+                logging.warning("Checkpoint não salvo: falha ao gravar os resultados: %s", e)
+                return
+        try:
+            self.checkpoint.save(state)
+            self.robots_cache.save()
+            if self.discovery is not None:
+                self.discovery.flush()
+            logging.info("Checkpoint salvo: %d URL(s) pendentes, %d visitadas.",
+                         len(state.frontier), state.visited_meta["count"])
+        except (OSError, sqlite3.Error) as e:
+            logging.warning("Não foi possível salvar o checkpoint: %s", e)
+
+    def restore_checkpoint(self):
+        """Carrega o último checkpoint; retorna False se não houver nenhum."""
+        state = self.checkpoint.load() if self.checkpoint is not None else None
+        if state is None:
+            return False
+        meta = state.visited_meta
+        count = int(meta.get("count", 0))
+        mode = meta.get("mode", self.visited_mode)
+        if mode == VISITED_BLOOM:
+            # O vetor de bits só pode ser restaurado com as mesmas dimensões
+            self.visited = make_visited_store(mode, int(meta["capacity"]), float(meta["error_rate"]))
+            self.bloom_error_rate = float(meta["error_rate"])
+        elif mode != self.visited_mode or count > self.visited.capacity - len(self.start_urls):
+            self.visited = make_visited_store(
+                mode, max(self.visited.capacity, count + len(self.start_urls))
+            )
+        self.visited_mode = mode
+        self.visited.load_bytes(state.visited, count)
+        self.crawl_delay.update(state.crawl_delay)
+        self.last_fetch_time.update(state.last_fetch_time)
+        for host, not_before in state.next_allowed.items():
+            self.frontier.set_not_before(host, not_before)
+        for host, url, priority, depth in state.frontier:
+            self.enqueue(host, url, priority, depth)
+        logging.info("Crawl retomado do checkpoint: %d URL(s) pendentes, %d visitadas.",
+                     len(state.frontier), len(self.visited))
+        return True
+
+    def supervise(self):
+        """Grava checkpoints periódicos e aplica o tempo máximo de execução."""
+        started = time.time()
+        interval = self.checkpoint_interval if self.checkpoint is not None else None
+        while True:
+            timeout = interval
+            if self.max_runtime is not None:
+                remaining = max(0.0, started + self.max_runtime - time.time())
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            if self.done_event.wait(timeout):
+                return
+            if self.max_runtime is not None and time.time() - started >= self.max_runtime:
+                logging.info("Tempo máximo de execução atingido; encerrando o crawler.")
+                self.stop()
+                return
+            self.save_checkpoint()
 
     def start(self):
+        if self.resume:
+            self.restore_checkpoint()
         for url in self.start_urls:
             self.add_url(url)
         logging.info("Iniciando crawler em %d URL(s)...", len(self.start_urls))
@@ -183,6 +595,24 @@ class WebCrawler:
             t = threading.Thread(target=self.worker, daemon=True)
             t.start()
             threads.append(t)
+        if self.checkpoint is not None or self.max_runtime is not None:
+            threading.Thread(target=self.supervise, daemon=True).start()
         for t in threads:
             t.join()
+        if self.parse_pool is not None:
+            # Após um stop() ainda pode haver páginas no pool; seus links entram no checkpoint
+            self.parse_pool.shutdown(wait=True)
+        self.done_event.set()
+        self.save_checkpoint()
+        self.robots_executor.shutdown(wait=False)
+        if self.discovery is not None:
+            self.sitemap_executor.shutdown(wait=False, cancel_futures=True)
+            try:
+                self.discovery.flush()
+            except sqlite3.Error as e:
+                logging.warning("Não foi possível salvar o estado dos sitemaps: %s", e)
+        try:
+            self.robots_cache.save()
+        except OSError as e:
+            logging.warning("Não foi possível salvar o cache de robots.txt: %s", e)
         logging.info("Raspagem concluída. Total de URLs visitadas: %d", len(self.visited))
@@ -0,0 +1,110 @@
+"""Fixtures compartilhadas pelos testes (servidor HTTP local, sem acesso à rede)."""
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pytest
+
+# Os módulos são importados como `src.<módulo>`, como em scripts/run_crawler.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# (status, cabeçalhos, corpo) devolvido por uma rota
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+class LocalServer:
+    """Servidor HTTP/1.1 local com rotas por caminho e registro das requisições.
+
+    Cada rota é uma função ``(cabeçalhos da requisição) -> Response``; rotas
+    de POST/PATCH (`handle`) recebem ``(cabeçalhos, corpo)``.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, Callable[[Dict[str, str]], Response]] = {}
+        self.handlers: Dict[Tuple[str, str], Callable[[Dict[str, str], bytes], Response]] = {}
+        # (caminho, cabeçalhos) de cada requisição recebida
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self.connections = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server.connections += 1
+
+            def do_GET(self):
+                headers = dict(self.headers.items())
+                server.requests.append((self.path, headers))
+                route = server.routes.get(self.path)
+                self.respond(*(route(headers) if route else (404, {}, b"")))
+
+            def do_POST(self):
+                self.handle_body("POST")
+
+            def do_PATCH(self):
+                self.handle_body("PATCH")
+
+            def do_DELETE(self):
+                self.handle_body("DELETE")
+
+            def handle_body(self, method):
+                headers = dict(self.headers.items())
+                data = self.rfile.read(int(headers.get("Content-Length") or 0))
+                server.requests.append((self.path, headers))
+                handler = server.handlers.get((method, self.path.split("?", 1)[0]))
+                self.respond(*(handler(headers, data) if handler else (404, {}, b"")))
+
+            def respond(self, status, extra, body):
+                self.send_response(status)
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                if status != 304:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return self.base + path
+
+    def page(self, path: str, body: str, etag: Optional[str] = None,
+             content_type: str = "text/html; charset=utf-8") -> None:
+        """Serve `body` em `path`; com `etag`, responde 304 a `If-None-Match` igual."""
+
+        def route(headers: Dict[str, str]) -> Response:
+            extra = {"Content-Type": content_type}
+            if etag:
+                extra["ETag"] = etag
+                if headers.get("If-None-Match") == etag:
+                    return 304, {"ETag": etag}, b""
+            return 200, extra, body.encode("utf-8")
+
+        self.routes[path] = route
+
+    def handle(self, method: str, path: str, handler: Callable[[Dict[str, str], bytes], Response]) -> None:
+        """Responde a `method` em `path` (sem a query) com `handler(cabeçalhos, corpo)`."""
+        self.handlers[(method, path)] = handler
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    local = LocalServer()
+    yield local
+    local.close()
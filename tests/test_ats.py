@@ -0,0 +1,33 @@
+from src import ats
+from src.ats import BoardAdapter
+from src.scraper import scrape_html
+
+
+class FakeBoard(BoardAdapter):
+    name = "Fake"
+
+    def jobs(self, token, get_json):
+        yield self.record("Designer", token, None, "", "https://fake.com/1", self.name)
+        yield self.record("Product Manager", token, "São Paulo", "", "https://fake.com/2", self.name)
+        yield self.record("Engenheira", token, "", "", "https://fake.com/3", self.name)
+
+
+def test_location_is_sent_only_when_the_board_provides_it():
+    assert "location" not in BoardAdapter.record("PM", "acme", None, "", "https://a.com/1", "Fake")
+    assert "location" not in BoardAdapter.record("PM", "acme", "", "", "https://a.com/1", "Fake")
+    assert BoardAdapter.record("PM", "acme", "Remoto", "", "https://a.com/1", "Fake")["location"] == "Remoto"
+
+
+def test_board_jobs_are_grouped_by_columns(monkeypatch):
+    monkeypatch.setattr(ats, "get_default_cache", lambda: None)
+    monkeypatch.setattr(ats, "get_default_health", lambda: None)
+
+    jobs = FakeBoard().fetch("acme")
+
+    assert [job["url"] for job in jobs] == ["https://fake.com/2", "https://fake.com/1", "https://fake.com/3"]
+
+
+def test_html_extractors_do_not_send_location():
+    html = "<html><head><title>Vaga: Product Manager</title></head><body><p>Remoto</p></body></html>"
+    for url in ("https://tally.so/r/pm", "https://docs.google.com/forms/d/e/pm/viewform", "https://acme.com/pm"):
+        assert "location" not in scrape_html(url, html)
@@ -0,0 +1,97 @@
+import pytest
+
+from src.checkpoint import CrawlCheckpoint, CrawlState
+from src.web_crawler import WebCrawler
+
+ROBOTS = "User-agent: *\nCrawl-delay: 0\n"
+
+
+def link_page(*paths):
+    links = "".join(f'<a href="{path}">vaga de product manager</a>' for path in paths)
+    return f"<html><head><title>Vagas</title></head><body>{links}</body></html>"
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return CrawlCheckpoint(str(tmp_path / "checkpoint.sqlite3"))
+
+
+def test_checkpoint_round_trip(checkpoint):
+    assert checkpoint.load() is None
+    checkpoint.save(CrawlState(
+        frontier=[("a.com", "https://a.com/jobs", 3.0, 1)],
+        visited=b"\x01\x02",
+        visited_meta={"mode": "exact", "count": 1},
+        crawl_delay={"a.com": 2.0},
+        next_allowed={"a.com": 10.0},
+    ))
+
+    state = checkpoint.load()
+
+    assert state.frontier == [("a.com", "https://a.com/jobs", 3.0, 1)]
+    assert state.visited == b"\x01\x02"
+    assert state.visited_meta == {"mode": "exact", "count": 1}
+    assert state.crawl_delay == {"a.com": 2.0}
+    assert state.next_allowed == {"a.com": 10.0}
+    assert state.last_fetch_time == {}
+
+
+def test_checkpoint_is_saved_after_results_are_flushed(checkpoint):
+    calls = []
+    crawler = WebCrawler([], checkpoint=checkpoint,
+                         before_checkpoint=lambda: calls.append(checkpoint.load()))
+    crawler.frontier.put("a.com", "https://a.com/jobs", 1.0, 0)
+
+    crawler.save_checkpoint()
+
+    # O gancho roda antes da gravação
+    assert calls == [None]
+    assert [url for _, url, _, _ in checkpoint.load().frontier] == ["https://a.com/jobs"]
+
+
+def test_checkpoint_is_not_saved_when_flush_fails(checkpoint):
+    def fail():
+        raise OSError("disco cheio")
+
+    crawler = WebCrawler([], checkpoint=checkpoint, before_checkpoint=fail)
+    crawler.frontier.put("a.com", "https://a.com/jobs", 1.0, 0)
+
+    crawler.save_checkpoint()
+
+    assert checkpoint.load() is None
+
+
+def test_pages_waiting_for_parse_stay_pending(checkpoint):
+    crawler = WebCrawler([], checkpoint=checkpoint)
+    crawler.parsing["https://a.com/jobs/1"] = ("a.com", 2)
+
+    crawler.save_checkpoint()
+
+    assert checkpoint.load().frontier == [("a.com", "https://a.com/jobs/1", pytest.approx(
+        crawler.scorer.score("https://a.com/jobs/1", "", 2)), 2)]
+
+
+def test_resume_fetches_pending_links_only(server, checkpoint):
+    server.page("/robots.txt", ROBOTS, content_type="text/plain")
+    server.page("/", link_page("/jobs/1", "/jobs/2"))
+    server.page("/jobs/1", link_page())
+    server.page("/jobs/2", link_page())
+    seed = server.url("/")
+    flushed = []
+
+    def crawl(max_pages, resume):
+        pages = []
+        crawler = WebCrawler([seed], max_pages=max_pages, num_threads=1, checkpoint=checkpoint,
+                             resume=resume, on_page=lambda url, page, changed: pages.append(url),
+                             before_checkpoint=lambda: flushed.append(list(pages)))
+        crawler.start()
+        return pages
+
+    assert crawl(1, resume=False) == [seed]
+    # Os resultados da primeira execução foram descarregados antes do checkpoint
+    assert flushed[-1] == [seed]
+    assert sorted(url for _, url, _, _ in checkpoint.load().frontier) == [
+        server.url("/jobs/1"), server.url("/jobs/2")]
+
+    assert sorted(crawl(10, resume=True)) == [server.url("/jobs/1"), server.url("/jobs/2")]
+    assert checkpoint.load().frontier == []
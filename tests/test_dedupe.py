@@ -0,0 +1,176 @@
+from src.dedupe import DuplicateIndex, hamming, normalize_tokens, posting_fingerprint, title_similarity
+
+BOILERPLATE = (
+    "A Acme Pagamentos é uma fintech brasileira que simplifica a vida financeira de milhões de pessoas. "
+    "Trabalhamos de forma remota, com horário flexível, plano de saúde, vale refeição, auxílio home office, "
+    "participação nos lucros e um time diverso e colaborativo. Valorizamos autonomia, aprendizado contínuo "
+    "e decisões baseadas em dados. Todas as pessoas candidatas serão consideradas sem distinção de raça, "
+    "gênero, orientação sexual, idade ou deficiência. Venha construir o futuro dos pagamentos conosco. "
+    "Nosso processo seletivo tem uma conversa com recrutamento, um estudo de caso e entrevistas com o time. "
+    "Oferecemos equipamento de trabalho, orçamento anual para cursos e conferências, licença parental "
+    "estendida, gympass e encontros presenciais a cada trimestre em São Paulo com todo o time da empresa."
+)
+
+
+def job(url, title, source, description=BOILERPLATE):
+    return {"url": url, "title": title, "description": description, "source": source}
+
+
+def index(**kwargs):
+    return DuplicateIndex(path=None, **kwargs)
+
+
+def test_same_posting_from_another_source_is_duplicate():
+    dedupe = index()
+    careers = job("https://acme.com/careers/pm", "Product Manager - Pagamentos", "acme.com")
+    form = job("https://tally.so/r/pm", "Vaga: Product Manager - Pagamentos", "Tally",
+               BOILERPLATE + " Inscreva-se pelo formulário.")
+
+    assert dedupe.check(careers) is None
+    assert dedupe.check(form) == careers["url"]
+    assert dedupe.alternate_updates() == [{"url": careers["url"], "alternate_urls": [form["url"]]}]
+
+
+def test_different_roles_with_shared_boilerplate_are_not_duplicates():
+    pm = job("https://acme.com/careers/pm", "Senior Product Manager - Payments", "acme.com")
+    designer = job("https://tally.so/r/design", "Product Designer", "Tally")
+    distance = hamming(posting_fingerprint(pm)[0], posting_fingerprint(designer)[0])
+
+    # Com a distância folgada, só o título separa as duas vagas
+    dedupe = index(max_distance=distance)
+    assert dedupe.check(pm) is None
+    assert dedupe.check(designer) is None
+    assert dedupe.alternate_updates() == []
+
+    without_title = index(max_distance=distance, min_title_similarity=0.0)
+    without_title.check(pm)
+    assert without_title.check(designer) == pm["url"]
+
+
+def test_postings_from_the_same_source_are_never_merged():
+    dedupe = index()
+    first = job("https://acme.com/careers/pm-1", "Product Manager", "acme.com")
+    second = job("https://acme.com/careers/pm-2", "Product Manager", "acme.com")
+
+    assert dedupe.check(first) is None
+    assert dedupe.check(second) is None
+
+
+def test_source_falls_back_to_url_host():
+    dedupe = index()
+    assert dedupe.check({"url": "https://a.com/pm", "title": "Product Manager", "description": BOILERPLATE}) is None
+    assert dedupe.check({"url": "https://a.com/pm2", "title": "Product Manager", "description": BOILERPLATE}) is None
+    assert dedupe.check(job("https://b.com/pm", "Product Manager", None)) == "https://a.com/pm"
+
+
+def test_short_postings_are_ignored():
+    dedupe = index()
+    assert dedupe.check(job("https://a.com/f", "Formulário", "Tally", "Carregando")) is None
+    assert dedupe.check(job("https://b.com/f", "Formulário", "Typeform", "Carregando")) is None
+
+
+def test_title_similarity():
+    pm = frozenset(normalize_tokens("Senior Product Manager - Payments"))
+    assert title_similarity(pm, frozenset(normalize_tokens("Product Manager Sênior - Payments"))) == 1.0
+    assert title_similarity(pm, frozenset(normalize_tokens("Product Designer"))) < 0.6
+    assert title_similarity(pm, frozenset()) == 0.0
+
+
+def test_index_persists_and_reloads(tmp_path):
+    path = str(tmp_path / "dedupe.sqlite3")
+    dedupe = DuplicateIndex(path=path)
+    dedupe.check(job("https://acme.com/careers/pm", "Product Manager", "acme.com"))
+    dedupe.save()
+
+    reloaded = DuplicateIndex(path=path)
+    form = job("https://tally.so/r/pm", "Product Manager", "Tally")
+    assert reloaded.check(form) == "https://acme.com/careers/pm"
+
+
+
+def test_canonical_is_the_smallest_url_in_any_order():
+    careers = job("https://acme.com/careers/pm", "Product Manager", "acme.com")
+    form = job("https://tally.so/r/pm", "Product Manager", "Tally")
+    board = job("https://typeform.com/to/pm", "Product Manager", "Typeform")
+
+    in_order = index()
+    assert [in_order.check(j) for j in (careers, form, board)] == [None, careers["url"], careers["url"]]
+
+    reversed_order = index()
+    # Cada URL menor assume o grupo; as antigas canônicas devem sair da tabela
+    assert [reversed_order.check(j) for j in (board, form, careers)] == [None, None, None]
+    assert reversed_order.demoted() == [form["url"], board["url"]]
+    assert reversed_order.alternate_updates() == in_order.alternate_updates() == [
+        {"url": careers["url"], "alternate_urls": [form["url"], board["url"]]}]
+
+
+def test_canonical_that_meets_a_smaller_url_joins_its_group():
+    careers = job("https://acme.com/careers/pm", "Product Manager", "acme.com")
+    form = job("https://tally.so/r/pm", "Product Manager", "Tally")
+    dedupe = index()
+    dedupe.check(careers)
+    # Com outro título o formulário ainda é uma vaga à parte, e canônica
+    assert dedupe.check(dict(form, title="Product Designer")) is None
+    dedupe.alternate_updates()
+
+    assert dedupe.check(form) == careers["url"]
+    assert dedupe.demoted() == [form["url"]]
+    assert dedupe.alternate_updates() == [{"url": careers["url"], "alternate_urls": [form["url"]]}]
+
+
+def test_demoted_rows_stay_pending_until_removed(tmp_path):
+    path = str(tmp_path / "dedupe.sqlite3")
+    careers = job("https://acme.com/careers/pm", "Product Manager", "acme.com")
+    form = job("https://tally.so/r/pm", "Product Manager", "Tally")
+    dedupe = DuplicateIndex(path=path)
+    dedupe.check(form)
+    dedupe.save()
+    dedupe = DuplicateIndex(path=path)
+    dedupe.check(careers)
+    # A canônica nova falhou: a linha antiga não deve ser removida
+    assert dedupe.demoted([careers["url"]]) == []
+    assert dedupe.demoted() == [form["url"]]
+    dedupe.save()
+
+    reloaded = DuplicateIndex(path=path)
+    assert reloaded.demoted() == [form["url"]]
+    reloaded.save(removed=[form["url"]])
+
+    assert DuplicateIndex(path=path).demoted() == []
+
+
+def test_rows_of_failed_upserts_are_not_saved(tmp_path):
+    path = str(tmp_path / "dedupe.sqlite3")
+    careers = job("https://acme.com/careers/pm", "Product Manager", "acme.com")
+    form = job("https://tally.so/r/pm", "Product Manager", "Tally")
+    other = job("https://acme.com/careers/design", "Product Designer", "acme.com")
+    dedupe = DuplicateIndex(path=path)
+    dedupe.check(careers)
+    dedupe.check(form)
+    dedupe.check(other)
+
+    dedupe.save(failed_urls=[careers["url"]])
+
+    reloaded = DuplicateIndex(path=path)
+    # Nem a canônica que falhou nem a alternativa dela foram gravadas
+    assert len(reloaded) == 1
+    assert reloaded.check(form) is None
+
+
+def test_failed_merge_is_evaluated_again(tmp_path):
+    path = str(tmp_path / "dedupe.sqlite3")
+    careers = job("https://acme.com/careers/pm", "Product Manager", "acme.com")
+    form = job("https://tally.so/r/pm", "Product Manager", "Tally")
+    dedupe = DuplicateIndex(path=path)
+    dedupe.check(form)
+    dedupe.save()
+    dedupe = DuplicateIndex(path=path)
+    dedupe.check(careers)
+    dedupe.save(failed_urls=[careers["url"]])
+
+    # A troca de canônica não foi gravada: o formulário segue canônico e nada fica pendente
+    reloaded = DuplicateIndex(path=path)
+    assert reloaded.demoted() == []
+    assert reloaded.check(form) is None
+    assert reloaded.check(careers) is None
+    assert reloaded.demoted() == [form["url"]]
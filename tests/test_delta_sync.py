@@ -0,0 +1,146 @@
+import pytest
+
+from src import supabase_client
+from src.delta_sync import DeltaSync, content_hash
+from src.http_cache import HttpCache
+from src.supabase_client import UpsertReport
+from src.web_crawler import WebCrawler
+
+JOB = {"url": "https://acme.com/careers/pm", "title": "Product Manager", "description": "Vaga remota"}
+PAGE = ('<html><head><script type="application/ld+json">'
+        '{"@type": "JobPosting", "title": "Product Manager"}</script></head><body></body></html>')
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return str(tmp_path / "manifest.sqlite3")
+
+
+@pytest.fixture
+def touched(monkeypatch):
+    calls = []
+
+    def touch_rows(urls, values):
+        calls.append((list(urls), values))
+        return UpsertReport(sent=len(calls[-1][0]))
+
+    monkeypatch.setattr(supabase_client, "touch_rows", touch_rows)
+    return calls
+
+
+def test_content_hash_ignores_volatile_fields():
+    row = dict(JOB, id="1", scraped_at="2024-01-01T00:00:00Z")
+    assert content_hash(row) == content_hash(dict(JOB, id="2", scraped_at="2024-02-01T00:00:00Z"))
+    assert content_hash(row) != content_hash(dict(JOB, title="Senior Product Manager"))
+
+
+def test_unchanged_record_is_skipped_and_touched(manifest, touched):
+    delta = DeltaSync(mode="manifest", path=manifest)
+    assert delta.check(dict(JOB))
+    delta.commit()
+
+    delta = DeltaSync(mode="manifest", path=manifest)
+    assert not delta.check(dict(JOB, scraped_at="amanhã"))
+    assert delta.check(dict(JOB, title="Senior Product Manager"))
+    assert delta.unchanged == 1
+
+    report = delta.touch_unchanged()
+    assert report.sent == 1
+    assert touched[0][0] == [JOB["url"]] and list(touched[0][1]) == ["last_seen_at"]
+    assert delta.touch_unchanged() is None
+
+
+def test_failed_rows_are_not_committed(manifest):
+    delta = DeltaSync(mode="manifest", path=manifest)
+    assert delta.check(dict(JOB))
+    delta.commit(failed_urls=[JOB["url"]])
+
+    assert DeltaSync(mode="manifest", path=manifest).check(dict(JOB))
+
+
+def test_failed_urls_need_resend_until_synced(manifest):
+    delta = DeltaSync(mode="manifest", path=manifest)
+    assert not delta.needs_resend(JOB["url"])
+    assert delta.check(dict(JOB))
+    delta.commit(failed_urls=[JOB["url"]])
+
+    delta = DeltaSync(mode="manifest", path=manifest)
+    assert delta.needs_resend(JOB["url"])
+    assert delta.check(dict(JOB))
+    delta.commit()
+
+    assert not DeltaSync(mode="manifest", path=manifest).needs_resend(JOB["url"])
+
+
+def test_forgotten_rows_are_sent_again(manifest):
+    delta = DeltaSync(mode="manifest", path=manifest)
+    assert delta.check(dict(JOB))
+    delta.commit()
+    delta.forget([JOB["url"]])
+
+    assert delta.check(dict(JOB))
+    assert DeltaSync(mode="manifest", path=manifest).check(dict(JOB))
+
+
+def test_without_manifest_every_page_needs_resend(manifest):
+    assert DeltaSync(mode="off", path=manifest).needs_resend(JOB["url"])
+
+
+def test_mark_seen_touches_only_synced_urls(manifest, touched):
+    delta = DeltaSync(mode="manifest", path=manifest)
+    delta.check(dict(JOB))
+    delta.commit()
+
+    delta = DeltaSync(mode="manifest", path=manifest)
+    delta.mark_seen(JOB["url"])
+    delta.mark_seen("https://acme.com/nunca-enviada")
+
+    assert delta.unchanged == 1
+    delta.touch_unchanged()
+    assert touched[0][0] == [JOB["url"]]
+
+
+def test_off_mode_sends_everything(manifest):
+    delta = DeltaSync(mode="off", path=manifest)
+    assert delta.check(dict(JOB))
+    delta.commit()
+    assert DeltaSync(mode="off", path=manifest).check(dict(JOB))
+
+
+def test_invalid_mode_is_rejected(manifest):
+    with pytest.raises(ValueError):
+        DeltaSync(mode="always", path=manifest)
+
+
+def test_not_modified_crawler_page_is_reparsed_only_after_failed_upsert(server, manifest, touched, tmp_path):
+    server.page("/robots.txt", "User-agent: *\nCrawl-delay: 0\n", content_type="text/plain")
+    server.page("/vaga", PAGE, etag='"v1"')
+    url = server.url("/vaga")
+    cache = HttpCache(path=str(tmp_path / "http_cache.sqlite3"))
+
+    def crawl(fail=False):
+        delta = DeltaSync(mode="manifest", path=manifest)
+        pages = []
+
+        def on_page(page_url, page, changed):
+            pages.append((changed, len(page["json_ld"])))
+            if not changed:
+                delta.mark_seen(page_url)
+            elif delta.check({"url": page_url, "json_ld": page["json_ld"]}):
+                delta.commit(failed_urls=[page_url] if fail else [])
+
+        WebCrawler([url], max_pages=1, num_threads=1, http_cache=cache, on_page=on_page,
+                   resend=delta.needs_resend).start()
+        return delta, pages
+
+    assert crawl(fail=True)[1] == [(True, 1)]
+    # O envio falhou: a página 304 é extraída de novo e reenviada
+    assert crawl()[1] == [(True, 1)]
+    # Envio confirmado: a página 304 só segue os links e é marcada como vista
+    delta, pages = crawl()
+    cache.close()
+
+    assert pages == [(False, 0)]
+    assert delta.unchanged == 1
+    delta.touch_unchanged()
+    assert touched[0][0] == [url]
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from src.fetch_pool import host_of, run_concurrently
+
+
+def test_ordered_results_follow_input_order():
+    urls = [f"https://h{n % 3}.com/{n}" for n in range(12)]
+
+    def func(url):
+        time.sleep(0.001 * (12 - int(url.rsplit("/", 1)[1])))
+        return url.upper()
+
+    results = list(run_concurrently(urls, func, concurrency=4))
+
+    assert [url for url, _, _ in results] == urls
+    assert all(result == url.upper() and error is None for url, result, error in results)
+
+
+def test_errors_are_delivered_with_their_url():
+    def func(url):
+        if url.endswith("/bad"):
+            raise ValueError(url)
+        return url
+
+    results = {url: error for url, _, error in run_concurrently(
+        ["https://a.com/ok", "https://a.com/bad"], func, concurrency=2)}
+
+    assert results["https://a.com/ok"] is None
+    assert isinstance(results["https://a.com/bad"], ValueError)
+
+
+def test_per_host_limit():
+    lock = threading.Lock()
+    running = {}
+    peak = {}
+
+    def func(url):
+        host = host_of(url)
+        with lock:
+            running[host] = running.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), running[host])
+        time.sleep(0.01)
+        with lock:
+            running[host] -= 1
+
+    urls = [f"https://slow.com/{n}" for n in range(6)] + [f"https://fast.com/{n}" for n in range(6)]
+    list(run_concurrently(urls, func, concurrency=6, per_host=2, ordered=False))
+
+    assert peak == {"slow.com": 2, "fast.com": 2}
+
+
+def test_unordered_results_are_not_held_by_a_slow_url():
+    release = threading.Event()
+
+    def func(url):
+        if "slow" in url:
+            release.wait(5)
+        return url
+
+    urls = ["https://slow.com/1"] + [f"https://h{n}.com/" for n in range(20)]
+    results = run_concurrently(urls, func, concurrency=4, ordered=False, window=4)
+
+    fast = [next(results)[0] for _ in range(20)]
+    release.set()
+
+    assert sorted(fast) == sorted(urls[1:])
+    assert next(results)[0] == "https://slow.com/1"
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from src.frontier import Frontier
+
+
+def test_best_priority_first_and_fifo_on_ties():
+    frontier = Frontier()
+    frontier.put("a.com", "https://a.com/1")
+    frontier.put("a.com", "https://a.com/2")
+    frontier.put("a.com", "https://a.com/vaga", priority=5.0)
+
+    served = []
+    for _ in range(3):
+        host, url, _ = frontier.get()
+        served.append(url)
+        frontier.release(host)
+
+    assert served == ["https://a.com/vaga", "https://a.com/1", "https://a.com/2"]
+    assert frontier.get() is None
+
+
+def test_busy_host_is_not_served_twice():
+    frontier = Frontier()
+    frontier.put("a.com", "https://a.com/1", priority=9.0)
+    frontier.put("a.com", "https://a.com/2", priority=9.0)
+    frontier.put("b.com", "https://b.com/1")
+
+    assert frontier.get()[0] == "a.com"
+    # a.com segue ocupado até o release: o próximo worker recebe outro host
+    assert frontier.get()[0] == "b.com"
+
+
+def test_delayed_host_does_not_block_other_hosts():
+    frontier = Frontier()
+    frontier.put("slow.com", "https://slow.com/1")
+    frontier.put("slow.com", "https://slow.com/2")
+    host, _, _ = frontier.get()
+    frontier.release(host, time.time() + 0.2)
+    frontier.put("fast.com", "https://fast.com/1")
+
+    started = time.monotonic()
+    assert frontier.get()[0] == "fast.com"
+    assert time.monotonic() - started < 0.1
+    frontier.release("fast.com")
+
+    assert frontier.get()[1] == "https://slow.com/2"
+    assert time.monotonic() - started >= 0.15
+
+
+def test_parked_host_waits_for_unpark():
+    frontier = Frontier()
+    frontier.park("a.com")
+    frontier.put("a.com", "https://a.com/1")
+    result = []
+    worker = threading.Thread(target=lambda: result.append(frontier.get()))
+    worker.start()
+    worker.join(0.05)
+    assert worker.is_alive()
+
+    frontier.unpark("a.com")
+    worker.join(1)
+
+    assert result == [("a.com", "https://a.com/1", 0)]
+
+
+def test_hold_keeps_frontier_open_until_unhold():
+    frontier = Frontier()
+    frontier.hold()
+    result = []
+    worker = threading.Thread(target=lambda: result.append(frontier.get()))
+    worker.start()
+    worker.join(0.05)
+    assert worker.is_alive()
+
+    frontier.unhold()
+    worker.join(1)
+
+    assert result == [None]
+
+
+def test_snapshot_includes_busy_urls():
+    frontier = Frontier()
+    frontier.put("a.com", "https://a.com/1", priority=2.0, depth=1)
+    frontier.put("a.com", "https://a.com/2", priority=1.0, depth=2)
+    frontier.get()
+    frontier.set_not_before("b.com", 123.0)
+
+    urls, next_allowed = frontier.snapshot()
+
+    assert urls == [("a.com", "https://a.com/1", 2.0, 1), ("a.com", "https://a.com/2", 1.0, 2)]
+    assert next_allowed == {"b.com": 123.0}
+    assert len(frontier) == 1
+
+
+def test_close_wakes_blocked_workers():
+    frontier = Frontier()
+    frontier.hold()
+    result = []
+    worker = threading.Thread(target=lambda: result.append(frontier.get()))
+    worker.start()
+
+    frontier.close()
+    worker.join(1)
+
+    assert result == [None]
@@ -0,0 +1,173 @@
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+from src.host_health import HostHealth, HostUnavailable, retry_after_seconds
+
+HOST = "a.com"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    monkeypatch.setattr(time, "sleep", lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+
+def breaker(**kwargs):
+    options = dict(failure_threshold=2, cooldown=10, max_trips=3, backoff=0.0)
+    options.update(kwargs)
+    return HostHealth(**options)
+
+
+def fail(health, times=1):
+    for _ in range(times):
+        health.record_failure(HOST, generation=health.acquire(HOST))
+
+
+def test_closed_open_half_open_cycle(clock):
+    health = breaker()
+    fail(health)
+    health.acquire(HOST)
+
+    fail(health)
+    with pytest.raises(HostUnavailable):
+        health.acquire(HOST)
+    assert health.available_at(HOST) == clock[0] + 10
+
+    # Passada a espera, só uma requisição de teste é liberada
+    clock[0] += 10
+    probe = health.acquire(HOST)
+    with pytest.raises(HostUnavailable):
+        health.acquire(HOST)
+
+    # O teste falhou: o disjuntor reabre com o dobro da espera
+    health.record_failure(HOST, generation=probe)
+    assert health.available_at(HOST) == clock[0] + 20
+    assert not health.is_dead(HOST)
+
+    clock[0] += 20
+    health.record_success(HOST, generation=health.acquire(HOST))
+    health.acquire(HOST)
+    health.acquire(HOST)
+    assert health.available_at(HOST) <= clock[0]
+
+
+def test_host_is_dead_after_max_trips(clock):
+    health = breaker(max_trips=2)
+    fail(health, 2)
+    clock[0] += 10
+    fail(health)
+
+    assert health.is_dead(HOST)
+    with pytest.raises(HostUnavailable) as info:
+        health.acquire(HOST)
+    assert info.value.dead
+
+
+def test_failures_of_requests_in_flight_when_the_breaker_opened_are_ignored(clock):
+    health = breaker(failure_threshold=5)
+    generations = [health.acquire(HOST) for _ in range(8)]
+
+    for generation in generations:
+        health.record_failure(HOST, generation=generation)
+
+    assert not health.is_dead(HOST)
+    assert health.available_at(HOST) == clock[0] + 10
+    assert health._hosts[HOST].trips == 1
+
+
+def test_late_results_do_not_decide_the_probe(clock):
+    health = breaker()
+    early = health.acquire(HOST)
+    fail(health, 2)
+    clock[0] += 10
+    probe = health.acquire(HOST)
+
+    # Resultados atrasados de antes da abertura não fecham nem reabrem o disjuntor
+    health.record_success(HOST, 0.1, generation=early)
+    health.release(HOST, early)
+    with pytest.raises(HostUnavailable):
+        health.acquire(HOST)
+    assert health._hosts[HOST].srtt == 0.1
+
+    health.record_success(HOST, generation=probe)
+    health.acquire(HOST)
+
+
+def test_release_frees_the_probe_without_a_verdict(clock):
+    health = breaker()
+    fail(health, 2)
+    clock[0] += 10
+    health.release(HOST, health.acquire(HOST))
+
+    # Outra requisição de teste pode ser feita, e o disjuntor segue aberto até ela
+    probe = health.acquire(HOST)
+    health.record_failure(HOST, generation=probe)
+    assert health._hosts[HOST].trips == 2
+
+
+def test_adaptive_timeout():
+    health = breaker(min_timeout=0.5)
+    assert health.timeout(HOST, 30) == 30
+
+    health.record_success(HOST, 1.0)
+    # srtt + 4 * rttvar = 1 + 4 * 0.5
+    assert health.timeout(HOST, 30) == 3.0
+    assert health.timeout(HOST, 2) == 2
+
+    health.record_failure(HOST, timed_out=True)
+    health.record_failure(HOST, timed_out=True)
+    assert health.timeout(HOST, 30) == 12.0
+    for _ in range(5):
+        health.record_failure(HOST, timed_out=True)
+    assert health.timeout(HOST, 100) == 24.0
+
+    # Uma resposta desfaz a escala dos timeouts
+    health.record_success(HOST, 0.01)
+    assert health.timeout(HOST, 30) == pytest.approx(3.36625)
+    for _ in range(50):
+        health.record_success(HOST, 0.01)
+    assert health.timeout(HOST, 30) == 0.5
+
+
+def test_retry_after_seconds(clock):
+    assert retry_after_seconds({"Retry-After": "120"}) == 120.0
+    assert retry_after_seconds({"Retry-After": "-5"}) == 0.0
+    assert retry_after_seconds({"Retry-After": formatdate(clock[0] + 90, usegmt=True)}) == 90.0
+    assert retry_after_seconds({"Retry-After": "amanhã"}) is None
+    assert retry_after_seconds({}) is None
+
+
+def response(status, **headers):
+    return SimpleNamespace(status_code=status, response=SimpleNamespace(headers=headers))
+
+
+def test_call_waits_for_a_short_retry_after(clock):
+    health = breaker(failure_threshold=5)
+    replies = [response(503, **{"Retry-After": "3"}), response(200)]
+    start = clock[0]
+
+    result = health.call(f"https://{HOST}/vagas", lambda timeout: replies.pop(0))
+
+    assert result.status_code == 200
+    assert clock[0] == start + 3
+
+
+def test_call_gives_up_on_a_long_retry_after(clock):
+    health = breaker(failure_threshold=5, max_wait=30)
+    calls = []
+
+    def fetch(timeout):
+        calls.append(timeout)
+        return response(429, **{"Retry-After": "120"})
+
+    with pytest.raises(HostUnavailable) as info:
+        health.call(f"https://{HOST}/vagas", fetch)
+
+    assert len(calls) == 1
+    assert info.value.until == clock[0] + 120
+    assert not info.value.dead
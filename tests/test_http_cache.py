@@ -0,0 +1,99 @@
+import pytest
+
+from src import scraper
+from src.delta_sync import DeltaSync
+from src.http_cache import HttpCache, NotModified, cached_get
+
+PAGE = "<html><head><title>Product Manager</title></head><body><p>Vaga remota</p></body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(path=str(tmp_path / "http_cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_revalidates_with_etag_and_returns_cached_body(server, cache):
+    server.page("/vaga", PAGE, etag='"v1"')
+
+    first = cached_get(server.url("/vaga"), cache=cache)
+    second = cached_get(server.url("/vaga"), cache=cache)
+
+    assert not first.from_cache and first.text == PAGE
+    assert second.from_cache and second.status_code == 200 and second.text == PAGE
+    assert server.requests[1][1].get("If-None-Match") == '"v1"'
+
+
+def test_changed_page_replaces_entry(server, cache):
+    server.page("/vaga", PAGE, etag='"v1"')
+    cached_get(server.url("/vaga"), cache=cache)
+    server.page("/vaga", PAGE.replace("remota", "presencial"), etag='"v2"')
+
+    response = cached_get(server.url("/vaga"), cache=cache)
+
+    assert not response.from_cache and "presencial" in response.text
+    assert cache.get(server.url("/vaga")).etag == '"v2"'
+
+
+def test_response_without_validators_is_not_stored(server, cache):
+    server.page("/sem-etag", PAGE)
+    cached_get(server.url("/sem-etag"), cache=cache)
+    assert cache.get(server.url("/sem-etag")) is None
+
+
+def test_fresh_entry_skips_request(server, tmp_path):
+    cache = HttpCache(path=str(tmp_path / "fresh.sqlite3"), max_age=3600)
+    server.page("/vaga", PAGE, etag='"v1"')
+    cached_get(server.url("/vaga"), cache=cache)
+
+    response = cached_get(server.url("/vaga"), cache=cache)
+
+    assert response.from_cache and response.text == PAGE
+    assert len(server.requests) == 1
+    cache.close()
+
+
+def test_lru_eviction_respects_max_bytes(tmp_path):
+    cache = HttpCache(path=str(tmp_path / "lru.sqlite3"), max_bytes=250)
+    for n in range(3):
+        cache.store(f"https://example.com/{n}", {"ETag": f'"{n}"'}, "x" * 100)
+    assert cache.get("https://example.com/0") is None
+    assert cache.get("https://example.com/2") is not None
+    cache.close()
+
+
+def test_not_modified_page_is_resent_only_after_failed_upsert(server, cache, tmp_path, monkeypatch):
+    # O cache grava a página no download, antes de o envio dar certo; uma
+    # resposta 304 não pode fazer a vaga deixar de ser reenviada
+    monkeypatch.setattr(scraper, "get_default_cache", lambda: cache)
+    server.page("/vaga", PAGE, etag='"v1"')
+    url = server.url("/vaga")
+    manifest = str(tmp_path / "manifest.sqlite3")
+
+    delta = DeltaSync(mode="manifest", path=manifest, touch=True)
+    assert delta.check(scraper.scrape_url(url, delta.needs_resend))
+    delta.commit(failed_urls=[url])
+
+    delta = DeltaSync(mode="manifest", path=manifest, touch=True)
+    job = scraper.scrape_url(url, delta.needs_resend)
+    assert server.requests[-1][1].get("If-None-Match") == '"v1"'
+    assert delta.check(job)
+    delta.commit()
+
+    # Envio confirmado: a próxima 304 nem chega à extração
+    delta = DeltaSync(mode="manifest", path=manifest, touch=True)
+    with pytest.raises(NotModified):
+        scraper.scrape_url(url, delta.needs_resend)
+    delta.mark_seen(url)
+    assert delta.unchanged == 1
+
+
+def test_not_modified_page_without_resend_returns_cached_body(server, cache, monkeypatch):
+    monkeypatch.setattr(scraper, "get_default_cache", lambda: cache)
+    server.page("/vaga", PAGE, etag='"v1"')
+    url = server.url("/vaga")
+
+    assert scraper.fetch_html(url) == PAGE
+    assert scraper.fetch_html(url) == PAGE
+    assert server.requests[-1][1].get("If-None-Match") == '"v1"'
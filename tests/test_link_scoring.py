@@ -0,0 +1,104 @@
+import pytest
+
+from src.frontier import Frontier
+from src.link_scoring import LinkScorer
+from src.web_crawler import WebCrawler
+
+ROBOTS = "User-agent: *\nCrawl-delay: 0\n"
+
+
+def test_job_anchors_and_paths_score_higher():
+    scorer = LinkScorer()
+
+    job = scorer.score("https://acme.com/vagas/123", "Vaga de Product Manager")
+    neutral = scorer.score("https://acme.com/sobre", "Sobre nós")
+    footer = scorer.score("https://acme.com/privacidade", "Política de privacidade")
+
+    # "vagas" no caminho (4), "vaga" (4) e "product manager" (6) + "product" (1.5) na âncora
+    assert job == 15.5
+    assert neutral == 0.0
+    assert footer == -4.0
+
+
+def test_terms_match_whole_words_only():
+    scorer = LinkScorer()
+    assert scorer.score("https://acme.com/jobson", "Jobson") == 0.0
+    assert scorer.score("https://acme.com/jobs", "") == 3.0
+
+
+def test_ats_and_form_domains():
+    scorer = LinkScorer()
+    assert scorer.score("https://boards.greenhouse.io/acme") == 10.0
+    assert scorer.score("https://docs.google.com/forms/d/abc/viewform") == 10.0
+    assert scorer.score("https://docs.google.com/document/d/abc") == 0.0
+
+
+def test_scope_rules():
+    scorer = LinkScorer(allow_domains=["acme.com"], deny_domains=["blog.acme.com"], max_depth=2)
+
+    assert scorer.score("https://www.acme.com/") == 0.0
+    assert scorer.score("https://blog.acme.com/vagas") is None
+    assert scorer.score("https://other.com/vagas") is None
+    # Domínios de ATS são seguidos mesmo fora dos permitidos
+    assert scorer.score("https://jobs.lever.co/acme") == 10.0
+    assert scorer.score("https://acme.com/", depth=3) is None
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("CRAWL_ALLOW_DOMAINS", " Acme.com, .acme.io ,")
+    monkeypatch.setenv("CRAWL_DENY_DOMAINS", "blog.acme.com")
+    monkeypatch.setenv("CRAWL_MAX_DEPTH", "3")
+    monkeypatch.setenv("CRAWL_DEPTH_PENALTY", "2.5")
+
+    scorer = LinkScorer.from_env()
+
+    assert scorer.allow_domains == ("acme.com", "acme.io")
+    assert scorer.deny_domains == ("blog.acme.com",)
+    assert scorer.max_depth == 3
+    assert scorer.score("https://acme.com/", depth=2) == -5.0
+
+
+def test_from_env_defaults(monkeypatch):
+    for name in ("CRAWL_ALLOW_DOMAINS", "CRAWL_DENY_DOMAINS", "CRAWL_MAX_DEPTH", "CRAWL_DEPTH_PENALTY"):
+        monkeypatch.delenv(name, raising=False)
+
+    scorer = LinkScorer.from_env()
+
+    assert (scorer.allow_domains, scorer.deny_domains, scorer.max_depth) == ((), (), None)
+    assert scorer.depth_penalty == 1.0
+
+
+@pytest.mark.parametrize("depth_penalty, expected", [
+    (1.0, ["https://acme.com/vagas", "https://acme.com/sobre", "https://acme.com/equipe"]),
+    (10.0, ["https://acme.com/sobre", "https://acme.com/vagas", "https://acme.com/equipe"]),
+])
+def test_depth_penalty_orders_the_frontier(depth_penalty, expected):
+    # Um link de vagas dois níveis abaixo só perde para um link neutro mais
+    # raso se a penalidade por nível superar o peso das palavras-chave
+    scorer = LinkScorer(depth_penalty=depth_penalty)
+    frontier = Frontier()
+    for url, depth in (("https://acme.com/equipe", 2), ("https://acme.com/vagas", 2), ("https://acme.com/sobre", 0)):
+        frontier.put("acme.com", url, scorer.score(url, "", depth), depth)
+
+    served = []
+    while (item := frontier.get()) is not None:
+        served.append(item[1])
+        frontier.release(item[0])
+
+    assert served == expected
+
+
+def test_job_link_is_fetched_before_footer_links(server):
+    server.page("/robots.txt", ROBOTS, content_type="text/plain")
+    # No HTML os links de rodapé vêm antes; a nota é que decide a ordem
+    server.page("/", '<html><body><footer><a href="/privacidade">Privacidade</a><a href="/termos">Termos</a>'
+                     '<a href="/sobre">Sobre</a></footer>'
+                     '<a href="/oportunidades/42">Product Manager Sênior</a></body></html>')
+    for path in ("/privacidade", "/termos", "/sobre", "/oportunidades/42"):
+        server.page(path, "<html><body>página</body></html>")
+    pages = []
+
+    WebCrawler([server.url("/")], max_pages=3, num_threads=1,
+               on_page=lambda url, page, changed: pages.append(url)).start()
+
+    assert pages == [server.url("/"), server.url("/oportunidades/42"), server.url("/sobre")]
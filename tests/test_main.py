@@ -0,0 +1,49 @@
+import argparse
+
+import pytest
+
+from src.fetch_pool import host_of
+from src import main
+from src.main import iter_urls, parse_args, parse_shard, shard_of
+
+URLS = [f"https://empresa{n}.com/vagas/{m}" for n in range(40) for m in range(3)]
+
+
+def test_parse_shard():
+    assert parse_shard("0/1") == (0, 1)
+    assert parse_shard("3/4") == (3, 4)
+
+
+@pytest.mark.parametrize("value", ["", "1", "a/b", "1/0", "4/4", "-1/4", "1/2/3"])
+def test_parse_shard_rejects_invalid_specs(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(value)
+
+
+def test_shard_of_is_stable_and_depends_only_on_the_host():
+    # Valor fixo: a partição não pode mudar entre processos nem entre versões do Python
+    assert shard_of("https://acme.com/jobs", 8) == shard_of("http://acme.com/outra", 8) == 7
+    assert all(shard_of(url, 4) == shard_of(f"https://{host_of(url)}/", 4) for url in URLS)
+
+
+def test_shards_are_disjoint_and_cover_the_input(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("\n".join(URLS + URLS[:10]), encoding="utf-8")
+
+    shards = [list(iter_urls([str(path)], shard=(index, 4))) for index in range(4)]
+
+    assert sorted(url for shard in shards for url in shard) == sorted(URLS)
+    assert all(shard for shard in shards)
+    hosts = [{host_of(url) for url in shard} for shard in shards]
+    assert sum(len(h) for h in hosts) == len(set().union(*hosts)) == 40
+
+
+def test_shard_requires_dedupe_off(monkeypatch):
+    monkeypatch.setattr(main, "DEDUPE_ENABLED", True)
+    with pytest.raises(SystemExit):
+        parse_args(["urls.txt", "--shard", "0/2"])
+    with pytest.raises(ValueError):
+        main.main("urls.txt", shard=(0, 2))
+
+    monkeypatch.setattr(main, "DEDUPE_ENABLED", False)
+    assert parse_args(["urls.txt", "--shard", "1/2"]).shard == (1, 2)
@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+from src.metrics import BUCKETS, OTHER_HOST, Histogram, Metrics
+
+
+def histogram(*samples):
+    hist = Histogram()
+    for seconds in samples:
+        hist.observe(seconds)
+    return hist
+
+
+def test_bucket_bounds_are_inclusive():
+    hist = histogram(0.001, 0.0011, 100.0)
+    assert hist.counts[BUCKETS.index(0.001)] == 1
+    assert hist.counts[BUCKETS.index(0.0025)] == 1
+    assert hist.counts[-1] == 1
+
+
+def test_quantiles_interpolate_inside_the_bucket():
+    hist = histogram(*[0.004] * 90, *[2.0] * 10)
+
+    # 90 amostras no balde (0.0025, 0.005] e 10 no balde (1.0, 2.5]
+    assert hist.quantile(0.5) == pytest.approx(0.0025 + 0.0025 * 50 / 90)
+    assert hist.quantile(0.9) == pytest.approx(0.005)
+    # A estimativa nunca passa do maior valor observado
+    assert hist.quantile(0.99) == 2.0
+
+
+def test_quantile_of_overflow_bucket_uses_the_max():
+    hist = histogram(100.0)
+    assert hist.quantile(0.5) == pytest.approx(60.0 + 40.0 * 0.5)
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_summary_of_a_histogram():
+    summary = histogram(0.002, 0.002, 0.002, 0.002).summary()
+    assert summary == {"count": 4, "sum": 0.008, "mean": 0.002,
+                       "p50": 0.00175, "p90": 0.002, "p99": 0.002, "max": 0.002}
+
+
+def test_stages_and_counters_by_host():
+    metrics = Metrics(max_hosts=1)
+    metrics.observe("fetch", 0.2, "a.com")
+    metrics.observe("fetch", 0.4, "b.com")
+    metrics.observe("parse", 0.01)
+    metrics.incr("robots_blocked", host="a.com")
+    metrics.incr("robots_blocked", 2, host="c.com")
+    metrics.incr("pages")
+
+    summary = metrics.summary()
+
+    assert summary["stages"]["fetch"]["count"] == 2
+    assert summary["counters"] == {"pages": 1, "robots_blocked": 3}
+    # Hosts além de max_hosts são agregados em _other
+    assert sorted(summary["hosts"]) == sorted(["a.com", OTHER_HOST])
+    assert summary["hosts"]["a.com"]["stages"]["fetch"]["count"] == 1
+    assert summary["hosts"]["a.com"]["counters"] == {"robots_blocked": 1}
+    assert summary["hosts"][OTHER_HOST]["stages"]["fetch"]["max"] == 0.4
+    assert summary["hosts"][OTHER_HOST]["counters"] == {"robots_blocked": 2}
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.observe("fetch", 0.1, "a.com")
+    metrics.incr("pages")
+    with metrics.timer("parse"):
+        pass
+
+    summary = metrics.summary()
+    assert summary["stages"] == {} and summary["counters"] == {} and summary["hosts"] == {}
+
+
+def test_write_json(tmp_path):
+    metrics = Metrics()
+    metrics.observe("upsert", 0.3)
+    metrics.incr("pages", host="a.com")
+    path = tmp_path / "artifacts" / "metrics.json"
+
+    metrics.write_json(str(path))
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["stages"]["upsert"]["count"] == 1
+    assert data["hosts"]["a.com"]["counters"] == {"pages": 1}
+    assert set(data) == {"started_at", "duration", "stages", "counters", "hosts"}
+
+
+def test_prometheus_histogram_lines():
+    metrics = Metrics()
+    metrics.observe("fetch", 0.003)
+    metrics.observe("fetch", 0.3)
+
+    lines = metrics.prometheus_text().splitlines()
+
+    assert lines[:2] == ["# HELP pmradar_stage_seconds Duração de cada etapa do pipeline.",
+                         "# TYPE pmradar_stage_seconds histogram"]
+    buckets = [line for line in lines if line.startswith("pmradar_stage_seconds_bucket")]
+    assert len(buckets) == len(BUCKETS) + 1
+    assert 'pmradar_stage_seconds_bucket{stage="fetch",le="0.0025"} 0' in buckets
+    assert 'pmradar_stage_seconds_bucket{stage="fetch",le="0.005"} 1' in buckets
+    assert 'pmradar_stage_seconds_bucket{stage="fetch",le="0.25"} 1' in buckets
+    assert 'pmradar_stage_seconds_bucket{stage="fetch",le="0.5"} 2' in buckets
+    assert buckets[-1] == 'pmradar_stage_seconds_bucket{stage="fetch",le="+Inf"} 2'
+    assert 'pmradar_stage_seconds_sum{stage="fetch"} 0.303' in lines
+    assert 'pmradar_stage_seconds_count{stage="fetch"} 2' in lines
+
+
+def test_prometheus_counters_and_label_escaping():
+    metrics = Metrics()
+    host = 'a"b\\c\nd'
+    metrics.observe("fetch", 0.1, host)
+    metrics.incr("fetch_retries", host=host)
+    metrics.incr("fetch_retries", 0.5)
+
+    text = metrics.prometheus_text(prefix="pm")
+
+    assert "# TYPE pm_host_stage_seconds histogram" in text
+    assert 'pm_host_stage_seconds_count{stage="fetch",host="a\\"b\\\\c\\nd"} 1' in text
+    assert text.count("# TYPE pm_fetch_retries_total counter") == 1
+    # O contador global soma também os incrementos por host
+    assert "pm_fetch_retries_total 1.5\n" in text
+    assert 'pm_fetch_retries_total{host="a\\"b\\\\c\\nd"} 1\n' in text
+    assert text.endswith("\n")
+
+
+def test_write_prometheus_replaces_the_file(tmp_path):
+    metrics = Metrics()
+    metrics.incr("pages")
+    path = tmp_path / "textfile" / "pmradar.prom"
+
+    metrics.write_prometheus(str(path))
+
+    assert path.read_text(encoding="utf-8") == metrics.prometheus_text()
+    assert [p.name for p in path.parent.iterdir()] == ["pmradar.prom"]
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+
+from src.page_parser import extract_structured_data, parse_page
+
+
+def baseline_structured_data(html):
+    """Extrator anterior (árvore do BeautifulSoup com find_all/find_parent), usado como referência."""
+    soup = BeautifulSoup(html, "html.parser")
+    data = {"json_ld": [], "microdata": []}
+    for script in soup.find_all("script", type="application/ld+json"):
+        if not script.string:
+            continue
+        try:
+            data["json_ld"].append(json.loads(script.string))
+        except Exception:
+            data["json_ld"].append(script.string.strip())
+    for item in soup.find_all(attrs={"itemscope": True}):
+        if item.find_parent(attrs={"itemscope": True}):
+            continue
+        item_data = {}
+        if item.has_attr("itemtype"):
+            item_data["type"] = item["itemtype"]
+        for prop in item.find_all(attrs={"itemprop": True}):
+            if prop.has_attr("itemscope"):
+                continue
+            key = prop["itemprop"]
+            if prop.name.lower() == "meta" or prop.has_attr("content"):
+                value = prop.get("content", "")
+            else:
+                value = prop.get_text(strip=True)
+            if key in item_data:
+                if isinstance(item_data[key], list):
+                    item_data[key].append(value)
+                else:
+                    item_data[key] = [item_data[key], value]
+            else:
+                item_data[key] = value
+        data["microdata"].append(item_data)
+    return data
+
+
+JSON_LD = """<html><head>
+<script type="application/ld+json">{"@type": "JobPosting", "title": "Product Manager"}</script>
+<script type="application/ld+json">  {inválido  </script>
+<script type="application/ld+json"></script>
+<script type="text/javascript">var x = 1;</script>
+</head><body></body></html>"""
+
+FLAT = """<div itemscope itemtype="https://schema.org/JobPosting">
+  <h1 itemprop="title">Product   Manager</h1>
+  <meta itemprop="datePosted" content="2024-05-01">
+  <span itemprop="employmentType" content="FULL_TIME">Integral</span>
+  <span itemprop="skills">Discovery</span><span itemprop="skills">Roadmap</span><span itemprop="skills">SQL</span>
+  <div itemprop="description"><p>Time de <b>produto</b></p><script>track()</script></div>
+</div>
+<span itemprop="title">fora de qualquer item</span>"""
+
+NESTED = """<div itemscope itemtype="https://schema.org/JobPosting">
+  <span itemprop="title">Product Manager</span>
+  <div itemprop="hiringOrganization" itemscope itemtype="https://schema.org/Organization">
+    <span itemprop="name">Acme</span>
+    <div itemprop="address" itemscope><span itemprop="addressLocality">São Paulo</span></div>
+  </div>
+</div>"""
+
+GRID = """<section itemscope itemtype="https://schema.org/ItemList">
+  <article itemscope itemtype="https://schema.org/JobPosting"><a itemprop="title" href="/1">PM</a></article>
+  <article itemscope itemtype="https://schema.org/JobPosting"><a itemprop="title" href="/2">PO</a></article>
+</section>
+<div itemscope><span itemprop="name">Segundo item</span></div>"""
+
+ITEMREF = """<div itemscope itemtype="https://schema.org/JobPosting" itemref="empresa">
+  <span itemprop="title">Product Manager</span>
+</div>
+<p id="empresa"><span itemprop="hiringOrganization">Acme</span></p>"""
+
+TEXT = """<div itemscope><div itemprop="description">
+  Vaga   <em>remota</em>,&nbsp;com <span itemprop="benefit">VR</span> e<br>plano &amp; saúde
+  <style>.x{}</style><!-- comentário -->
+</div><img itemprop="image" src="/logo.png"><span itemprop="empty"></span></div>"""
+
+
+@pytest.mark.parametrize("html", [JSON_LD, FLAT, NESTED, GRID, ITEMREF, TEXT],
+                         ids=["json_ld", "flat", "nested", "grid", "itemref", "text"])
+def test_matches_baseline_extractor(html):
+    assert extract_structured_data(html) == baseline_structured_data(html)
+
+
+def test_nested_items_are_flattened_into_the_top_level_item():
+    assert extract_structured_data(NESTED)["microdata"] == [{
+        "type": "https://schema.org/JobPosting",
+        "title": "Product Manager",
+        "name": "Acme",
+        "addressLocality": "São Paulo",
+    }]
+
+
+def test_grid_of_cards_is_one_item():
+    assert extract_structured_data(GRID)["microdata"] == [
+        {"type": "https://schema.org/ItemList", "title": ["PM", "PO"]},
+        {"name": "Segundo item"},
+    ]
+
+
+def test_links_and_anchors():
+    page = parse_page("https://acme.com/jobs/", '<a href="1?utm_source=x">Vaga  de <b>PM</b></a>'
+                                                '<a href="/manual.pdf">PDF</a><a href="mailto:rh@acme.com">RH</a>'
+                                                '<a href="/2" title="Product Owner">PO</a>')
+
+    assert page["links"] == ["https://acme.com/jobs/1", "https://acme.com/2"]
+    assert page["anchors"] == ["Vaga de PM", "Product Owner"]
+
+
+def test_unstructured_parse_keeps_only_links():
+    page = parse_page("https://acme.com/", FLAT + '<a href="/vagas">vagas</a>', structured=False)
+
+    assert page["links"] == ["https://acme.com/vagas"]
+    assert page["json_ld"] == [] and page["microdata"] == []
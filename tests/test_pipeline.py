@@ -0,0 +1,89 @@
+import threading
+import time
+
+from src import pipeline
+from src.pipeline import JobPipeline
+from src.supabase_client import UpsertReport
+
+
+class FakeUpserter:
+    def __init__(self):
+        self.pending = []
+        self.sent = []
+
+    def add(self, job):
+        self.pending.append(job)
+
+    def flush(self):
+        self.sent.extend(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        return UpsertReport(sent=len(self.sent))
+
+
+def test_flush_waits_for_pages_already_submitted(monkeypatch):
+    release = threading.Event()
+
+    def slow_scrape(url, html):
+        release.wait(5)
+        return {"url": url, "title": "Product Manager", "description": html}
+
+    monkeypatch.setattr(pipeline, "scrape_html", slow_scrape)
+    upserter = FakeUpserter()
+    jobs = JobPipeline(upserter, workers=2).start()
+    urls = [f"https://tally.so/r/pm{n}" for n in range(3)]
+    for url in urls:
+        assert jobs.submit(url, "<html></html>")
+
+    flushing = threading.Thread(target=jobs.flush)
+    flushing.start()
+    time.sleep(0.05)
+    assert flushing.is_alive() and upserter.sent == []
+
+    release.set()
+    flushing.join(5)
+    assert not flushing.is_alive()
+    assert sorted(job["url"] for job in upserter.sent) == urls
+    jobs.close()
+
+
+def test_flush_does_not_wait_for_failed_pages(monkeypatch):
+    def broken_scrape(url, html):
+        raise ValueError("HTML inválido")
+
+    monkeypatch.setattr(pipeline, "scrape_html", broken_scrape)
+    upserter = FakeUpserter()
+    jobs = JobPipeline(upserter, workers=1).start()
+    assert jobs.submit("https://tally.so/r/pm", "<html></html>")
+
+    jobs.flush()
+
+    assert upserter.sent == []
+    assert jobs.stats["failed"] == 1
+    jobs.close()
+
+
+def test_unchanged_page_is_only_marked_seen(monkeypatch):
+    scraped = []
+    monkeypatch.setattr(pipeline, "scrape_html", lambda url, html: scraped.append(url) or {"url": url})
+    seen = []
+
+    class Delta:
+        def mark_seen(self, url):
+            seen.append(url)
+
+        def check(self, job):
+            return True
+
+        def commit(self, failed_urls=()):
+            pass
+
+    jobs = JobPipeline(FakeUpserter(), delta=Delta(), workers=1).start()
+    jobs.on_page("https://tally.so/r/pm", {"html": "<html></html>"}, changed=False)
+    jobs.on_page("https://tally.so/r/novo", {"html": "<html></html>"}, changed=True)
+    jobs.close()
+
+    assert seen == ["https://tally.so/r/pm"]
+    assert scraped == ["https://tally.so/r/novo"]
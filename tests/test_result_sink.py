@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import pytest
+
+from src.result_sink import JsonlSink
+
+
+def read_lines(path, opener=open):
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_buffered_until_flush(tmp_path):
+    sink = JsonlSink(str(tmp_path / "results.jsonl"), buffer_records=10)
+    sink.write({"url": "https://a.com/1"})
+    assert sink.files == []
+
+    sink.flush()
+    assert read_lines(tmp_path / "results.jsonl") == [{"url": "https://a.com/1"}]
+    sink.close()
+
+
+def test_rotation_starts_new_files(tmp_path):
+    sink = JsonlSink(str(tmp_path / "results.jsonl"), buffer_records=1, rotate_bytes=60)
+    records = [{"url": f"https://acme.com/jobs/{n}", "title": "Product Manager"} for n in range(4)]
+    for record in records:
+        sink.write(record)
+    sink.close()
+
+    assert [path.name for path in sink.files] == [
+        "results.jsonl", "results-0001.jsonl", "results-0002.jsonl", "results-0003.jsonl"]
+    assert [record for path in sink.files for record in read_lines(path)] == records
+    assert sink.records == 4
+
+
+def test_append_continues_the_last_rotated_file(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    sink = JsonlSink(path, buffer_records=1, rotate_bytes=40)
+    for n in range(2):
+        sink.write({"url": f"https://acme.com/jobs/{n}"})
+    sink.close()
+
+    resumed = JsonlSink(path, append=True, rotate_bytes=1000)
+    resumed.write({"url": "https://acme.com/jobs/2"})
+    resumed.close()
+
+    assert resumed.files == [tmp_path / "results-0001.jsonl"]
+    assert read_lines(tmp_path / "results-0001.jsonl") == [
+        {"url": "https://acme.com/jobs/1"}, {"url": "https://acme.com/jobs/2"}]
+
+
+def test_gzip_compression(tmp_path):
+    sink = JsonlSink(str(tmp_path / "results.jsonl"), compression="gzip")
+    sink.write({"title": "Gerente de Produto"})
+    sink.close()
+
+    assert sink.files == [tmp_path / "results.jsonl.gz"]
+    assert read_lines(sink.files[0], gzip.open) == [{"title": "Gerente de Produto"}]
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        JsonlSink(str(tmp_path / "results.jsonl"), compression="lz4")
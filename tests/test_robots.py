@@ -0,0 +1,86 @@
+import socket
+import time
+
+import pytest
+
+from src.robots import (ROBOTS_ALLOW_ALL, ROBOTS_DISALLOW_ALL, ROBOTS_OK, ROBOTS_UNREACHABLE, RobotsCache,
+                        build_parser, download_robots)
+from src.web_crawler import WebCrawler
+
+ROBOTS = "User-agent: *\nDisallow: /admin\nCrawl-delay: 0\nSitemap: https://acme.com/sitemap.xml\n"
+
+
+def host_of(server):
+    return server.base.split("//", 1)[1]
+
+
+def test_build_parser():
+    rp = build_parser(ROBOTS_OK, ROBOTS.splitlines())
+    assert not rp.can_fetch("PMRadarBot", "https://acme.com/admin/users")
+    assert rp.can_fetch("PMRadarBot", "https://acme.com/jobs")
+    assert rp.crawl_delay("PMRadarBot") == 0
+    assert rp.site_maps() == ["https://acme.com/sitemap.xml"]
+
+    assert build_parser(ROBOTS_ALLOW_ALL).can_fetch("PMRadarBot", "https://acme.com/admin")
+    assert not build_parser(ROBOTS_DISALLOW_ALL).can_fetch("PMRadarBot", "https://acme.com/jobs")
+    assert not build_parser(ROBOTS_UNREACHABLE).can_fetch("PMRadarBot", "https://acme.com/jobs")
+
+
+@pytest.mark.parametrize("status, expected", [
+    (404, ROBOTS_ALLOW_ALL), (403, ROBOTS_DISALLOW_ALL), (503, ROBOTS_UNREACHABLE)])
+def test_download_robots_maps_status(server, status, expected):
+    server.routes["/robots.txt"] = lambda headers: (status, {}, b"")
+    assert download_robots(host_of(server)) == (expected, [])
+
+
+def test_download_robots_reads_lines(server):
+    server.page("/robots.txt", ROBOTS, content_type="text/plain")
+    assert download_robots(host_of(server)) == (ROBOTS_OK, ROBOTS.splitlines())
+
+
+def test_download_robots_unreachable_host():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    assert download_robots(f"127.0.0.1:{port}", timeout=1) == (ROBOTS_UNREACHABLE, [])
+
+
+def test_cache_ttl_and_negative_ttl(monkeypatch):
+    cache = RobotsCache(path=None, ttl=100, negative_ttl=10)
+    cache.put("ok.com", ROBOTS_OK, ["User-agent: *"])
+    cache.put("down.com", ROBOTS_UNREACHABLE, [])
+    assert cache.get("ok.com") == (ROBOTS_OK, ["User-agent: *"])
+    assert cache.get("down.com") == (ROBOTS_UNREACHABLE, [])
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 50)
+    assert cache.get("ok.com") is not None
+    assert cache.get("down.com") is None
+
+
+def test_cache_persists_between_runs(tmp_path):
+    path = str(tmp_path / "robots.json")
+    cache = RobotsCache(path=path)
+    cache.put("acme.com", ROBOTS_OK, ["User-agent: *", "Disallow: /admin"])
+    cache.save()
+
+    assert RobotsCache(path=path).get("acme.com") == (ROBOTS_OK, ["User-agent: *", "Disallow: /admin"])
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "robots.json"
+    path.write_text("{", encoding="utf-8")
+    assert RobotsCache(path=str(path)).get("acme.com") is None
+
+
+def test_crawler_skips_disallowed_urls(server):
+    server.page("/robots.txt", ROBOTS, content_type="text/plain")
+    server.page("/", '<html><body><a href="/admin/vagas">vagas</a><a href="/jobs">vagas</a></body></html>')
+    server.page("/jobs", "<html><body>Product Manager</body></html>")
+    pages = []
+
+    WebCrawler([server.url("/")], max_pages=5, num_threads=1,
+               on_page=lambda url, page, changed: pages.append(url)).start()
+
+    assert sorted(pages) == [server.url("/"), server.url("/jobs")]
+    assert "/admin/vagas" not in [path for path, _ in server.requests]
@@ -0,0 +1,50 @@
+import pytest
+
+from src.sitemaps import SitemapDiscovery, SitemapState
+
+
+def urlset(*urls):
+    entries = "".join(f"<url><loc>{url}</loc></url>" for url in urls)
+    return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+
+
+def sitemap_index(*urls):
+    entries = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in urls)
+    return f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+
+
+@pytest.fixture
+def state():
+    state = SitemapState(":memory:")
+    yield state
+    state.close()
+
+
+def test_unchanged_index_still_visits_its_sitemaps(server, state):
+    host = server.base.split("//", 1)[1]
+    index_url = server.url("/sitemap_index.xml")
+    server.page("/sitemap_index.xml", sitemap_index("/jobs.xml"), etag='"index-v1"', content_type="application/xml")
+    server.page("/jobs.xml", urlset(server.url("/jobs/1")), etag='"jobs-v1"', content_type="application/xml")
+    discovery = SitemapDiscovery(state=state)
+
+    assert discovery.discover(host, [index_url]) == [(0.0, server.url("/jobs/1"))]
+    discovery.mark_crawled(server.url("/jobs/1"))
+    discovery.flush()
+
+    # O índice responde 304, mas o sitemap filho mudou
+    server.page("/jobs.xml", urlset(server.url("/jobs/1"), server.url("/jobs/2")), etag='"jobs-v2"',
+                content_type="application/xml")
+    requests_before = len(server.requests)
+
+    assert discovery.discover(host, [index_url]) == [(0.0, server.url("/jobs/2"))]
+    paths = [path for path, _ in server.requests[requests_before:]]
+    assert paths == ["/sitemap_index.xml", "/jobs.xml"]
+    assert server.requests[requests_before][1].get("If-None-Match") == '"index-v1"'
+
+
+def test_index_children_are_replaced_on_each_read(state):
+    state.record_sitemap("https://a.com/index.xml", None, '"v1"', None,
+                         [("https://a.com/1.xml", None), ("https://a.com/2.xml", 10.0)])
+    state.record_sitemap("https://a.com/index.xml", None, '"v2"', None, [("https://a.com/3.xml", None)])
+
+    assert state.sitemap_children("https://a.com/index.xml") == [("https://a.com/3.xml", None)]
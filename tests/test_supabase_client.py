@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from src import supabase_client
+from src.supabase_client import BatchUpserter, delete_rows, touch_rows
+
+TABLE = "/rest/v1/job_postings"
+
+
+@pytest.fixture
+def batches(server, monkeypatch):
+    monkeypatch.setattr(supabase_client, "SUPABASE_URL", server.base)
+    monkeypatch.setattr(supabase_client, "SUPABASE_KEY", "chave")
+    monkeypatch.setattr(supabase_client, "SUPABASE_TABLE", "job_postings")
+    monkeypatch.setattr(supabase_client, "MAX_RETRIES", 2)
+    monkeypatch.setattr(supabase_client, "RETRY_BACKOFF", 0.0)
+    batches = []
+
+    def upsert(headers, body):
+        rows = json.loads(body)
+        if any(row.get("title") == "inválida" for row in rows):
+            return 400, {}, b'{"message": "violates check constraint"}'
+        batches.append(rows)
+        return 201, {}, b""
+
+    server.handle("POST", TABLE, upsert)
+    return batches
+
+
+def job(n, **extra):
+    return {"url": f"https://a.com/{n}", "title": f"Vaga {n}", **extra}
+
+
+def test_rows_are_sent_in_bounded_batches(batches):
+    upserter = BatchUpserter(max_rows=2)
+    for n in range(5):
+        upserter.add(job(n))
+    report = upserter.close()
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert report.sent == 5 and report.batches == 3 and report.failed == 0
+
+
+def test_key_change_starts_a_new_batch(batches):
+    upserter = BatchUpserter()
+    upserter.add(job(1))
+    upserter.add(job(2, location="Remoto"))
+    upserter.close()
+
+    assert [[sorted(row) for row in batch] for batch in batches] == [
+        [["title", "url"]], [["location", "title", "url"]]]
+
+
+def test_same_url_is_collapsed_in_a_batch(batches):
+    upserter = BatchUpserter()
+    upserter.add(job(1))
+    upserter.add(dict(job(1), title="Vaga 1 (atualizada)"))
+    upserter.close()
+
+    assert batches == [[{"url": "https://a.com/1", "title": "Vaga 1 (atualizada)"}]]
+
+
+def test_invalid_rows_are_isolated_by_bisection(batches):
+    upserter = BatchUpserter()
+    for n in range(4):
+        upserter.add(job(n, title="inválida") if n == 2 else job(n))
+    report = upserter.close()
+
+    assert report.sent == 3
+    assert report.failed_urls == ["https://a.com/2"]
+    assert "HTTP 400" in report.failures[0].error
+    assert sorted(row["url"] for batch in batches for row in batch) == [
+        "https://a.com/0", "https://a.com/1", "https://a.com/3"]
+
+
+def test_transient_errors_are_retried(server, batches):
+    responses = [503, 429, 201]
+    server.handle("POST", TABLE, lambda headers, body: (responses.pop(0), {"Retry-After": "0"}, b""))
+
+    upserter = BatchUpserter()
+    upserter.add(job(1))
+    report = upserter.close()
+
+    assert report.sent == 1 and report.requests == 3 and responses == []
+
+
+def test_persistent_transient_errors_fail_without_bisection(server, batches):
+    server.handle("POST", TABLE, lambda headers, body: (503, {}, b"indisponivel"))
+    upserter = BatchUpserter()
+    for n in range(4):
+        upserter.add(job(n))
+    report = upserter.close()
+
+    # Uma tentativa e duas novas para o lote inteiro, sem dividi-lo
+    assert report.requests == 3
+    assert report.failed == 4 and len(report.failures) == 1
+
+
+def test_touch_rows_patches_urls_in_chunks(server, batches):
+    patches = []
+    server.handle("PATCH", TABLE, lambda headers, body: (patches.append(json.loads(body)) or 204, {}, b""))
+
+    report = touch_rows([f"https://a.com/{n}" for n in range(5)], {"last_seen_at": "agora"}, max_urls=2)
+
+    assert report.sent == 5 and report.requests == 3
+    assert patches == [{"last_seen_at": "agora"}] * 3
+    queries = [path for path, _ in server.requests if path.startswith(TABLE)]
+    assert all("url=in." in query for query in queries)
+
+
+def test_delete_rows_reports_failed_chunks(server, batches):
+    calls = []
+
+    def delete(headers, body):
+        calls.append(body)
+        return (204 if len(calls) == 1 else 403), {}, b'{"message": "permission denied"}'
+
+    server.handle("DELETE", TABLE, delete)
+
+    report = delete_rows([f"https://a.com/{n}" for n in range(3)], max_urls=2)
+
+    assert calls == [b"", b""]
+    assert report.sent == 2
+    assert report.failed_urls == ["https://a.com/2"]
@@ -0,0 +1,56 @@
+import pytest
+import requests
+
+from src import transport
+from src.http_cache import HttpCache, UnsupportedContent, cached_get
+
+PAGE = "<html><head><title>Product Manager</title></head><body></body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(path=str(tmp_path / "http_cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_not_modified_responses_reuse_the_connection(server, cache):
+    server.page("/vaga", PAGE, etag='"v1"')
+    for _ in range(3):
+        cached_get(server.url("/vaga"), cache=cache)
+
+    assert [path for path, _ in server.requests] == ["/vaga"] * 3
+    assert server.connections == 1
+
+
+def test_rejected_responses_reuse_the_connection(server, cache):
+    server.page("/edital.pdf", "%PDF-1.4", content_type="application/pdf")
+    server.page("/vaga", PAGE)
+    with pytest.raises(UnsupportedContent):
+        cached_get(server.url("/edital.pdf"), cache=cache)
+    cached_get(server.url("/vaga"), cache=cache)
+
+    assert server.connections == 1
+
+
+def test_session_sends_user_agent_and_default_compression(server):
+    server.page("/vaga", PAGE)
+    transport.get(server.url("/vaga"))
+
+    headers = server.requests[0][1]
+    assert headers["User-Agent"] == transport.USER_AGENT
+    assert headers["Accept-Encoding"] == requests.utils.default_headers()["Accept-Encoding"]
+
+
+def test_configure_closes_the_replaced_adapter(monkeypatch):
+    session = transport.get_session()
+    previous = session.adapters["https://"]
+    closed = []
+    monkeypatch.setattr(previous, "close", lambda: closed.append(True))
+    monkeypatch.setattr(transport, "_pool_size", transport._pool_size)
+
+    transport.configure(transport._pool_size + 1)
+
+    assert closed == [True]
+    assert session.adapters["https://"] is not previous
+    assert session.adapters["http://"] is session.adapters["https://"]
@@ -0,0 +1,33 @@
+import pytest
+
+from src.utils import extract_text, parse_html, strip_html
+
+HTML = """<html><head><title>Vaga</title><style>p { color: red }</style>
+<script type="application/ld+json">{"@type": "JobPosting"}</script></head>
+<body><!-- menu --><h1>Product   Manager</h1><p>Time de <b>produto</b> em São Paulo.</p>
+<noscript>Ative o JavaScript</noscript><template><p>modelo</p></template>
+<ul><li>Roadmap</li><li>Discovery</li></ul><script>track()</script></body></html>"""
+
+
+def test_extract_text_skips_non_text_tags():
+    assert extract_text(parse_html(HTML)) == "Vaga Product Manager Time de produto em São Paulo. Roadmap Discovery"
+
+
+@pytest.mark.parametrize("limit", [None, 0, 1, 4, 5, 12, 30, 1000])
+def test_extract_text_matches_strip_html(limit):
+    expected = strip_html(HTML) if limit is None else strip_html(HTML)[:limit]
+    assert extract_text(parse_html(HTML), limit=limit) == expected
+
+
+def test_extract_text_keeps_the_shared_tree():
+    soup = parse_html(HTML)
+    extract_text(soup, limit=10)
+
+    assert soup.find("script", type="application/ld+json").string == '{"@type": "JobPosting"}'
+    assert [tag.name for tag in soup.find_all(["style", "noscript", "template", "script"])] == [
+        "style", "script", "noscript", "template", "script"]
+
+
+def test_extract_text_of_deeply_nested_page():
+    html = "<div>" * 5000 + "fundo" + "</div>" * 5000
+    assert extract_text(parse_html(html)) == "fundo"
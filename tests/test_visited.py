@@ -0,0 +1,84 @@
+import pytest
+
+from src.utils import canonicalize_url
+from src.visited import BloomFilter, FingerprintSet, make_visited_store, url_fingerprint
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTPS://Acme.COM:443/Jobs/?utm_source=x&b=2&a=1#top") == "https://acme.com/Jobs?a=1&b=2"
+    assert canonicalize_url("http://acme.com:8080") == "http://acme.com:8080/"
+    assert canonicalize_url("https://acme.com/jobs?fbclid=abc") == "https://acme.com/jobs"
+
+
+def test_fingerprint_ignores_scheme_and_variations():
+    assert url_fingerprint("http://acme.com/jobs/") == url_fingerprint("https://ACME.com/jobs?utm_medium=x")
+    assert url_fingerprint("https://acme.com/jobs") != url_fingerprint("https://acme.com/jobs/1")
+
+
+@pytest.mark.parametrize("mode", ["exact", "bloom"])
+def test_store_adds_each_url_once(mode):
+    visited = make_visited_store(mode, 100)
+
+    assert visited.add("https://acme.com/jobs")
+    assert not visited.add("http://acme.com/jobs/")
+    assert "https://acme.com/jobs" in visited
+    assert "https://acme.com/blog" not in visited
+    assert len(visited) == 1
+
+
+def test_exact_store_refuses_urls_past_capacity():
+    visited = FingerprintSet(3)
+    assert all(visited.add(f"https://acme.com/{n}") for n in range(3))
+
+    assert not visited.add("https://acme.com/3")
+    assert len(visited) == 3 and visited.nbytes == 8 * 8
+
+
+def test_exact_store_grows_up_to_capacity():
+    visited = FingerprintSet(1_000_000)
+    assert visited.nbytes == 8 * FingerprintSet.INITIAL_SIZE
+
+    urls = [f"https://acme.com/{n}" for n in range(5000)]
+    assert all(visited.add(url) for url in urls)
+
+    assert len(visited) == 5000 and all(url in visited for url in urls)
+    assert visited.nbytes == 8 * 8192
+
+
+def test_exact_store_round_trip():
+    visited = FingerprintSet(10)
+    urls = [f"https://acme.com/{n}" for n in range(5)]
+    for url in urls:
+        visited.add(url)
+
+    restored = FingerprintSet(10)
+    restored.load_bytes(visited.to_bytes())
+
+    assert len(restored) == 5 and all(url in restored for url in urls)
+
+
+def test_bloom_round_trip_requires_same_dimensions():
+    bloom = BloomFilter(1000, 1e-3)
+    bloom.add("https://acme.com/jobs")
+
+    restored = BloomFilter(1000, 1e-3)
+    restored.load_bytes(bloom.to_bytes(), len(bloom))
+    assert "https://acme.com/jobs" in restored and len(restored) == 1
+
+    with pytest.raises(ValueError):
+        BloomFilter(10, 1e-3).load_bytes(bloom.to_bytes())
+
+
+def test_bloom_false_positive_rate_is_near_target():
+    bloom = BloomFilter(2000, 1e-2)
+    for n in range(2000):
+        bloom.add(f"https://acme.com/jobs/{n}")
+
+    false_positives = sum(f"https://other.com/{n}" in bloom for n in range(10000))
+
+    assert false_positives < 300
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        make_visited_store("set", 10)
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import web_crawler
+from src.web_crawler import WebCrawler
+
+ROBOTS = "User-agent: *\nCrawl-delay: 0\n"
+
+
+def test_parse_processes_follow_links(server):
+    server.page("/robots.txt", ROBOTS, content_type="text/plain")
+    server.page("/", '<html><body><a href="/jobs/1">vaga de product manager</a></body></html>')
+    server.page("/jobs/1", "<html><body>Product Manager</body></html>")
+    pages = []
+
+    crawler = WebCrawler([server.url("/")], max_pages=5, num_threads=2, parse_processes=1,
+                         on_page=lambda url, page, changed: pages.append(url))
+    crawler.start()
+
+    assert sorted(pages) == [server.url("/"), server.url("/jobs/1")]
+    assert crawler.parse_pool._mp_context.get_start_method() == "spawn"
+
+
+def thread_pool_crawler(server, **kwargs):
+    # Mesmo caminho do pool de processos, mas com threads: o parse pode ser
+    # substituído no teste (um processo "spawn" não vê o monkeypatch)
+    crawler = WebCrawler([server.url("/")], parse_processes=1, **kwargs)
+    crawler.parse_pool.shutdown()
+    crawler.parse_pool = ThreadPoolExecutor(max_workers=8)
+    return crawler
+
+
+def site(server, jobs):
+    server.page("/robots.txt", ROBOTS, content_type="text/plain")
+    links = "".join(f'<a href="/jobs/{n}">vaga {n}</a>' for n in range(jobs))
+    server.page("/", f"<html><body>{links}</body></html>")
+    for n in range(jobs):
+        server.page(f"/jobs/{n}", "<html><body>Product Manager</body></html>")
+
+
+def test_page_budget_is_spent_exactly_with_idle_workers(server):
+    # Com um só host, três das quatro threads esperam na fronteira com uma
+    # página do orçamento já reservada; nenhuma URL pode ficar sem download
+    site(server, 8)
+
+    for max_pages, expected in ((20, 9), (5, 5)):
+        pages = []
+        WebCrawler([server.url("/")], max_pages=max_pages, num_threads=4,
+                   on_page=lambda url, page, changed: pages.append(url)).start()
+        assert len(pages) == expected
+
+
+def test_failing_parse_does_not_stop_the_crawl(server, monkeypatch):
+    site(server, 3)
+    parse = web_crawler.timed_parse
+
+    def flaky_parse(url, content, structured):
+        if url.endswith("/jobs/1"):
+            raise ValueError("HTML inválido")
+        return parse(url, content, structured)
+
+    monkeypatch.setattr(web_crawler, "timed_parse", flaky_parse)
+    pages = []
+    crawler = thread_pool_crawler(server, max_pages=10, num_threads=2,
+                                  on_page=lambda url, page, changed: pages.append(url))
+    crawler.start()
+
+    assert sorted(pages) == [server.url("/"), server.url("/jobs/0"), server.url("/jobs/2")]
+    # O slot e o hold da página que falhou foram devolvidos
+    assert crawler.parsing == {}
+    assert crawler.parse_slots.acquire(blocking=False)
+
+
+def test_parse_slots_bound_pages_waiting_for_parse(server, monkeypatch):
+    site(server, 8)
+    parse = web_crawler.timed_parse
+    lock = threading.Lock()
+    peak = [0]
+
+    def slow_parse(url, content, structured):
+        with lock:
+            peak[0] = max(peak[0], len(crawler.parsing))
+        time.sleep(0.02)
+        return parse(url, content, structured)
+
+    monkeypatch.setattr(web_crawler, "timed_parse", slow_parse)
+    pages = []
+    crawler = thread_pool_crawler(server, max_pages=10, num_threads=4, max_pending_parses=2,
+                                  on_page=lambda url, page, changed: pages.append(url))
+    crawler.start()
+
+    assert len(pages) == 9
+    assert 1 <= peak[0] <= 2